@@ -5,7 +5,6 @@ Claude API 연동 AI 마케팅 자동화 솔루션 MVP v2.0
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from datetime import datetime
 import os
 import sys
 
@@ -14,9 +13,15 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from core import (
     data_cache, unified_engine, campaign_db, scheduler, 
-    CATEGORIES, check_api_status, rag_store, add_campaign_to_rag,
-    FilterSpec
+    check_api_status, rag_store, add_campaign_to_rag, FrequencyCap
 )
+from core.target_store import EXPORT_FORMATS
+
+# 예약 목록 페이지 크기
+CAMPAIGN_PAGE_SIZE = 20
+
+# 페이지 rerun마다 예약 발송 처리 (발송 워커 없이 실행할 때)
+INLINE_SCHEDULER = os.getenv('INLINE_SCHEDULER', 'false').lower() == 'true'
 
 # 페이지 설정
 st.set_page_config(
@@ -338,7 +343,6 @@ def render_variants(variants, mode: str = "RULE"):
     )
     
     for variant in variants:
-        is_selected = (variant.variant_id == selected)
         is_recommended = (variant.variant_id == recommended_id)
         
         with st.container():
@@ -378,24 +382,35 @@ def render_campaign_list():
     """예약 목록 렌더링"""
     st.markdown("### 📅 예약 목록")
     
-    campaigns = campaign_db.get_all_campaigns(limit=20)
-    
-    if not campaigns:
+    stats = campaign_db.get_campaign_stats()
+    if not stats['total']:
         st.info("예약된 캠페인이 없습니다.")
         return
     
-    # 상태별 필터
+    # 상태별 필터 (DB에서 필터링)
+    status_labels = {"전체": stats['total'], "scheduled": stats['scheduled'], "sending": stats['sending'],
+                     "sent": stats['sent'], "failed": stats['failed'], "canceled": stats['canceled']}
     status_filter = st.selectbox(
         "상태 필터",
-        ["전체", "scheduled", "sent", "canceled"],
+        list(status_labels),
+        format_func=lambda s: f"{s} ({status_labels[s]})",
         key="status_filter"
     )
     
-    if status_filter != "전체":
-        campaigns = [c for c in campaigns if c.status == status_filter]
+    # 키셋 페이지: 지나온 페이지의 시작 커서 스택 (필터가 바뀌면 처음부터)
+    if st.session_state.get('campaign_page_filter') != status_filter:
+        st.session_state.campaign_page_filter = status_filter
+        st.session_state.campaign_page_cursors = [None]
+    cursors = st.session_state.campaign_page_cursors
+    
+    campaigns, next_cursor = campaign_db.list_campaigns(
+        status=None if status_filter == "전체" else status_filter,
+        limit=CAMPAIGN_PAGE_SIZE,
+        after=cursors[-1]
+    )
     
     for campaign in campaigns:
-        status_text = {"scheduled": "⏰ 대기", "sent": "✅ 발송완료", "canceled": "❌ 취소"}[campaign.status]
+        status_text = {"scheduled": "⏰ 대기", "sending": "📤 발송중", "sent": "✅ 발송완료", "failed": "⚠️ 발송실패", "canceled": "❌ 취소"}[campaign.status]
         
         with st.expander(f"#{campaign.id} | {campaign.send_at.strftime('%Y-%m-%d %H:%M') if campaign.send_at else '-'} | {campaign.total_count:,}명 | {status_text}"):
             col1, col2 = st.columns([3, 1])
@@ -404,9 +419,19 @@ def render_campaign_list():
                 st.markdown(f"**프롬프트:** {campaign.user_prompt[:100]}...")
                 st.markdown(f"**선택 문안:** {campaign.selected_variant_id}안")
                 st.markdown(f"**생성일:** {campaign.created_at.strftime('%Y-%m-%d %H:%M') if campaign.created_at else '-'}")
+                if campaign.projected_done_at and campaign.status in ('scheduled', 'sending'):
+                    st.markdown(f"**예상 완료:** {campaign.projected_done_at.strftime('%Y-%m-%d %H:%M')}")
+                
+                if campaign.status in ('sending', 'sent', 'failed'):
+                    progress = campaign_db.get_send_progress(campaign.id)
+                    st.caption(f"발송 {progress['sent']:,}/{campaign.total_count:,}건 · "
+                               f"{progress['throughput']:,.0f}건/s · 실패 청크 {progress['failed_chunks']}개")
                 
-                if campaign.sms_text:
-                    st.text_area("SMS 문안", campaign.sms_text, height=80, disabled=True, key=f"camp_sms_{campaign.id}")
+                # 문안은 요청한 캠페인만 조회
+                if st.toggle("문안 보기", key=f"detail_{campaign.id}"):
+                    detail = campaign_db.get_campaign(campaign.id)
+                    if detail and detail.sms_text:
+                        st.text_area("SMS 문안", detail.sms_text, height=80, disabled=True, key=f"camp_sms_{campaign.id}")
             
             with col2:
                 if campaign.status == 'scheduled':
@@ -417,19 +442,53 @@ def render_campaign_list():
                     
                     if st.button("🚀 지금 발송", key=f"send_{campaign.id}"):
                         if campaign_db.send_now(campaign.id):
-                            st.success("발송 완료!")
+                            st.success("발송을 시작했습니다. (발송 워커가 처리)")
                             st.rerun()
                 
-                if campaign.targets_csv_path and os.path.exists(campaign.targets_csv_path):
-                    with open(campaign.targets_csv_path, 'r') as f:
-                        csv_data = f.read()
-                    st.download_button(
-                        "📥 타겟 CSV",
-                        csv_data,
-                        f"targets_{campaign.id}.csv",
-                        "text/csv",
+                if campaign.status == 'failed':
+                    if st.button("🔁 이어서 발송", key=f"retry_{campaign.id}"):
+                        if campaign_db.retry_campaign(campaign.id):
+                            st.success("대기열에 다시 등록했습니다.")
+                            st.rerun()
+                
+                # 타겟 파일은 내보내기를 요청한 캠페인만 (형식, 바이트)로 한 번 생성해 세션에 보관
+                # (rerun마다 다시 읽고 변환하지 않음, 형식을 바꾸거나 다운로드하면 해제)
+                export_key = f"export_{campaign.id}"
+                fmt = st.selectbox("형식", list(EXPORT_FORMATS), key=f"export_fmt_{campaign.id}")
+                export = st.session_state.get(export_key)
+                if export is not None and export[0] != fmt:
+                    st.session_state.pop(export_key)
+                    export = None
+                if export is None:
+                    if st.button("📦 타겟 내보내기", key=f"prepare_{campaign.id}"):
+                        chunks = campaign_db.export_targets(campaign.id, fmt)
+                        st.session_state[export_key] = (fmt, None if chunks is None else b''.join(chunks))
+                        st.rerun()
+                elif export[1] is None:
+                    st.caption("타겟 파일 없음")
+                else:
+                    mime, ext = EXPORT_FORMATS[fmt]
+                    if st.download_button(
+                        f"📥 타겟 {ext.upper()}",
+                        export[1],
+                        f"targets_{campaign.id}.{ext}",
+                        mime,
                         key=f"download_{campaign.id}"
-                    )
+                    ):
+                        st.session_state.pop(export_key, None)
+    
+    # 페이지 이동
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if len(cursors) > 1 and st.button("◀ 이전", key="campaign_page_prev"):
+            cursors.pop()
+            st.rerun()
+    with col_page:
+        st.caption(f"{len(cursors)} 페이지")
+    with col_next:
+        if next_cursor is not None and st.button("다음 ▶", key="campaign_page_next"):
+            cursors.append(next_cursor)
+            st.rerun()
 
 
 def render_debug_section(spec, prompt, extra_context=None, mode="RULE"):
@@ -448,7 +507,7 @@ def render_debug_section(spec, prompt, extra_context=None, mode="RULE"):
         st.code(prompt)
 
 
-def save_campaign(prompt, spec, send_at, total_count, customer_ids, selected_variant, variants):
+def save_campaign(prompt, spec, send_at, total_count, customer_keys, selected_variant, variants):
     """캠페인 저장"""
     selected_v = next((v for v in variants if v.variant_id == selected_variant), variants[0])
     
@@ -457,10 +516,11 @@ def save_campaign(prompt, spec, send_at, total_count, customer_ids, selected_var
         send_at=send_at,
         spec=spec,
         total_count=total_count,
-        customer_ids=customer_ids,
+        customer_keys=customer_keys,
         selected_variant_id=selected_v.variant_id,
         sms_text=selected_v.sms_text,
-        lms_text=selected_v.lms_text
+        lms_text=selected_v.lms_text,
+        frequency_cap=FrequencyCap.from_env()
     )
     
     # RAG에 저장 (학습용)
@@ -497,6 +557,11 @@ def main():
     # 프롬프트 입력
     prompt, preview_clicked, save_clicked = render_prompt_input()
     
+    # 입력 중 실시간 근사 모수 (규칙 기반 + 층화 표본, API 호출 없음)
+    if prompt:
+        _, live_count = unified_engine.preview_count(prompt)
+        st.caption(f"👥 예상 타겟 모수: {live_count.format()}")
+    
     # 현재 모드
     use_ai = st.session_state.use_ai and unified_engine.ai_available
     mode = "AI" if use_ai else "RULE"
@@ -505,7 +570,9 @@ def main():
     if preview_clicked and prompt:
         with st.spinner(f"타겟 분석 중... ({mode} 모드)"):
             try:
-                spec, send_at, total_count, sample_df, customer_ids, extra_context = unified_engine.execute(prompt, use_ai=use_ai)
+                spec, send_at, total_count, sample_df, customer_keys, extra_context = unified_engine.execute(
+                    prompt, use_ai=use_ai, frequency_cap=FrequencyCap.from_env()
+                )
                 
                 variants = unified_engine.recommend_messages(
                     prompt, spec, send_at, 
@@ -518,7 +585,7 @@ def main():
                     'send_at': send_at,
                     'total_count': total_count,
                     'sample_df': sample_df,
-                    'customer_ids': customer_ids,
+                    'customer_keys': customer_keys,
                     'prompt': prompt,
                     'extra_context': extra_context,
                     'mode': mode
@@ -546,6 +613,10 @@ def main():
         # 결과
         render_results(result['spec'], result['send_at'], result['total_count'], result['sample_df'])
         
+        capped = (result.get('extra_context') or {}).get('frequency_capped')
+        if capped:
+            st.caption(f"🔁 빈도 제한으로 제외: {capped:,}명")
+        
         # 차트
         render_category_chart(result['sample_df'])
         
@@ -574,12 +645,14 @@ def main():
             result['spec'],
             result['send_at'],
             result['total_count'],
-            result['customer_ids'],
+            result['customer_keys'],
             selected,
             variants
         )
         
-        st.success(f"✅ 캠페인 #{campaign_id} 예약 저장 완료!")
+        saved = campaign_db.get_campaign(campaign_id)
+        done_at = saved.projected_done_at.strftime('%H:%M') if saved and saved.projected_done_at else '-'
+        st.success(f"✅ 캠페인 #{campaign_id} 예약 저장 완료! (예상 발송 완료 {done_at})")
         
         # 상태 초기화
         st.session_state.query_result = None
@@ -591,8 +664,10 @@ def main():
     # 예약 목록
     render_campaign_list()
     
-    # 예정 캠페인 자동 처리 (idempotent)
-    scheduler.process_due_campaigns()
+    # 예정 캠페인 발송은 scripts/run_scheduler.py 워커가 담당
+    # (워커 없이 데모할 때만 INLINE_SCHEDULER=true로 rerun마다 처리)
+    if INLINE_SCHEDULER:
+        scheduler.process_due_campaigns()
 
 
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 """
 TargetUP AI - Core Module
 """
-from .models import FilterSpec, MessageVariant, Campaign, CATEGORIES, REGIONS, SKIN_TYPES
+from .models import FilterSpec, MessageVariant, Campaign, FrequencyCap, CATEGORIES, REGIONS, SKIN_TYPES
 from .data_store import data_cache, load_or_generate_data
 from .query_engine import query_engine, QueryEngine
 from .recommender import message_recommender, MessageRecommender
@@ -17,7 +17,7 @@ from .engine import unified_engine, execute_query, recommend_messages, get_engin
 
 __all__ = [
     # 모델
-    'FilterSpec', 'MessageVariant', 'Campaign',
+    'FilterSpec', 'MessageVariant', 'Campaign', 'FrequencyCap',
     'CATEGORIES', 'REGIONS', 'SKIN_TYPES',
     
     # 데이터
@@ -2,7 +2,6 @@
 TargetUP AI - AI Parser
 Claude API 기반 자연어 → FilterSpec 변환
 """
-import json
 from datetime import datetime, date, timedelta
 from typing import Tuple, Optional, Dict, Any
 
@@ -60,19 +59,26 @@ PARSER_SYSTEM_PROMPT = """당신은 마케팅 캠페인 타겟팅 전문가입
    - "또는", "OR", "하나라도", "합집합" → "ANY"
    - 기본값: "ALL" (2개 이상 카테고리시)
 
-10. **product_name**: 제품명 (문안 생성용)
+10. **category_windows**: 기간이 붙은 카테고리 구매 조건
+   - "최근 3개월 내 눈가케어 구매" → [{"category": "눈가케어", "within_months": 3}]
+   - "3월~5월 선케어 구매" → [{"category": "선케어", "start": "2026-03-01", "end": "2026-05-31"}]
+   - 여기 넣은 카테고리는 categories에 중복으로 넣지 않음
+   - category_mode가 "ANY"면 기간 조건도 categories와 하나라도 만족(OR), "ALL"이면 모두 만족
+   - 없으면 빈 배열 []
+
+11. **product_name**: 제품명 (문안 생성용)
     - 언급된 제품명 추출
     - 없으면 카테고리에서 추정
 
-11. **discount_rate**: 할인율 (숫자만)
+12. **discount_rate**: 할인율 (숫자만)
     - "30% 할인" → 30
     - 없으면 null
 
-12. **event_name**: 이벤트/행사명
+13. **event_name**: 이벤트/행사명
     - "할인행사", "특별 세일" 등
     - 없으면 null
 
-13. **is_one_plus_one**: 1+1 여부
+14. **is_one_plus_one**: 1+1 여부
     - "1+1", "원플원" → true
     - 없으면 false
 
@@ -92,6 +98,7 @@ PARSER_SYSTEM_PROMPT = """당신은 마케팅 캠페인 타겟팅 전문가입
   "not_purchased_within_months": 6,
   "categories": ["눈가케어", "에센스"],
   "category_mode": "ALL",
+  "category_windows": [],
   "product_name": "산뜻크림",
   "discount_rate": 30,
   "event_name": "할인행사",
@@ -179,6 +186,13 @@ class AIParser:
         skin_types = result.get('skin_types', [])
         valid_skin_types = [s for s in skin_types if s in SKIN_TYPES]
         
+        # 기간 카테고리 검증
+        windows = result.get('category_windows') or []
+        valid_windows = [
+            w for w in windows
+            if isinstance(w, dict) and w.get('category') in CATEGORIES
+        ]
+        
         return FilterSpec(
             gender=result.get('gender'),
             age_min=result.get('age_min'),
@@ -189,6 +203,7 @@ class AIParser:
             not_purchased_within_months=result.get('not_purchased_within_months'),
             categories=valid_categories,
             category_mode=result.get('category_mode', 'ALL'),
+            category_windows=valid_windows,
             raw_prompt=prompt
         )
     
@@ -0,0 +1,138 @@
+"""
+TargetUP AI - Approximate Count
+층화 표본 기반 근사 타겟 모수 (입력 중 실시간 미리보기용)
+
+고객을 성별 × 지역 층으로 나눠 비례 배분으로 표본을 뽑고, 필터 계획을
+표본에만 평가해 층별 가중합으로 모수를 추정
+"""
+import os
+import math
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional
+import numpy as np
+
+from . import bitmap
+from .filter_plan import FilterPlan
+
+
+# 표본 크기 (고객 수가 이보다 적으면 전수 = 정확한 값)
+APPROX_SAMPLE_SIZE = int(os.getenv('APPROX_SAMPLE_SIZE', '100000'))
+
+# 95% 신뢰구간
+Z_95 = 1.96
+
+
+@dataclass
+class ApproxCount:
+    """근사 모수 (error = 95% 신뢰구간 반폭, 명)"""
+    estimate: int
+    error: int = 0
+    exact: bool = False
+
+    @property
+    def relative_error(self) -> float:
+        return self.error / self.estimate if self.estimate else 0.0
+
+    def format(self) -> str:
+        """'≈1.23M ± 0.5%' 형태 (정확한 값이면 '12,345명')"""
+        if self.exact:
+            return f"{self.estimate:,}명"
+        if self.estimate >= 1_000_000:
+            value = f"{self.estimate / 1_000_000:.2f}M"
+        elif self.estimate >= 10_000:
+            value = f"{self.estimate / 1_000:.1f}K"
+        else:
+            value = f"{self.estimate:,}"
+        return f"≈{value} ± {self.relative_error:.1%}"
+
+
+class StratifiedSample:
+    """
+    층화 표본 (성별 × 지역 층, 비례 배분)
+
+    표본 고객의 타입 배열 / 카테고리 비트맵 / 구매 이벤트 인덱스를 따로 들고 있어
+    FilterPlan.evaluate를 그대로 표본 위에서 실행
+    """
+
+    def __init__(self,
+                 arrays: Mapping[str, np.ndarray],
+                 category_bitmaps: Mapping[str, np.ndarray],
+                 events: Optional[Mapping[str, np.ndarray]],
+                 sample_size: int = APPROX_SAMPLE_SIZE,
+                 seed: int = 42):
+        n = len(arrays['birth_year'])
+        rng = np.random.default_rng(seed)
+
+        # 층 = (성별 코드, 지역 코드)
+        strata_key = arrays['gender_code'].astype(np.int32) * 256 + arrays['region_code']
+        _, strata = np.unique(strata_key, return_inverse=True)
+        strata = strata.astype(np.int32)
+        self.population = np.bincount(strata).astype(np.int64)
+
+        if sample_size >= n:
+            positions = np.arange(n)
+            self.sizes = self.population.copy()
+        else:
+            # 층별 비례 배분 (층마다 최소 1명)
+            self.sizes = np.minimum(
+                self.population,
+                np.maximum(1, np.round(self.population * sample_size / n).astype(np.int64))
+            )
+            # 무작위 순서에서 층별 앞쪽 sizes[s]명 선택
+            perm = rng.permutation(n)
+            order = perm[np.argsort(strata[perm], kind='stable')]
+            starts = np.concatenate([[0], np.cumsum(self.population)[:-1]])
+            rank = np.arange(n) - np.repeat(starts, self.population)
+            positions = np.sort(order[rank < np.repeat(self.sizes, self.population)])
+
+        self.exact = len(positions) == n
+        self.positions = positions
+        self.strata = strata[positions]
+        m = len(positions)
+
+        # 표본 타입 배열
+        self.arrays = {name: np.ascontiguousarray(col[positions]) for name, col in arrays.items()}
+
+        # 표본 카테고리 비트맵
+        self.category_bitmaps = {
+            cat: bitmap.from_mask(bitmap.to_mask(b, n)[positions])
+            for cat, b in category_bitmaps.items()
+        }
+
+        # 표본 구매 이벤트 인덱스 (정렬 순서 유지, 고객 키 → 표본 위치)
+        self.events = None
+        if events is not None:
+            sample_index = np.full(n, -1, dtype=np.int32)
+            sample_index[positions] = np.arange(m, dtype=np.int32)
+            mapped = sample_index[events['event_keys']]
+            keep = mapped >= 0
+            kept_before = np.concatenate([[0], np.cumsum(keep)])
+            self.events = {
+                'event_keys': mapped[keep],
+                'event_days': events['event_days'][keep],
+                'event_offsets': kept_before[events['event_offsets']].astype(np.int64),
+            }
+
+    def estimate(self, plan: FilterPlan) -> ApproxCount:
+        """필터 계획 근사 모수 (층별 비율 × 층 크기 합)"""
+        mask = plan.evaluate(self.arrays, self.category_bitmaps, self.events)
+        matches = np.bincount(self.strata[mask], minlength=len(self.sizes)).astype(np.int64)
+
+        if self.exact:
+            return ApproxCount(int(matches.sum()), 0, exact=True)
+
+        p = matches / self.sizes
+        estimate = float((self.population * p).sum())
+
+        # 층화 추정량 분산 (유한 모집단 보정 포함)
+        fpc = 1 - self.sizes / self.population
+        variance = (self.population ** 2 * fpc * p * (1 - p) / np.maximum(self.sizes - 1, 1)).sum()
+        return ApproxCount(round(estimate), round(Z_95 * math.sqrt(variance)))
+
+    def stats(self) -> Dict[str, int]:
+        """표본 정보 (진단용)"""
+        return {
+            'population': int(self.population.sum()),
+            'sample_size': len(self.positions),
+            'strata': len(self.sizes),
+        }
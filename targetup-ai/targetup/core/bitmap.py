@@ -0,0 +1,159 @@
+"""
+TargetUP AI - Bitmap
+고객 행 위치(0..n-1) 기반 packed 비트맵 연산
+"""
+from typing import List, Sequence, Tuple
+import numpy as np
+
+
+# 바이트별 1비트 개수 (np.bitwise_count 미지원 NumPy용)
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def empty(n: int) -> np.ndarray:
+    """모든 비트가 0인 비트맵"""
+    return np.zeros((n + 7) // 8, dtype=np.uint8)
+
+
+def full(n: int) -> np.ndarray:
+    """0..n-1 비트가 모두 1인 비트맵"""
+    return from_mask(np.ones(n, dtype=bool))
+
+
+def from_mask(mask: np.ndarray) -> np.ndarray:
+    """불리언 마스크 → 비트맵"""
+    return np.packbits(mask)
+
+
+def from_positions(positions: np.ndarray, n: int) -> np.ndarray:
+    """행 위치 배열 → 비트맵"""
+    mask = np.zeros(n, dtype=bool)
+    mask[positions] = True
+    return np.packbits(mask)
+
+
+def set_positions(bitmap: np.ndarray, positions: np.ndarray):
+    """비트맵에 행 위치 비트 세팅 (in-place)"""
+    positions = np.asarray(positions, dtype=np.int64)
+    bits = (np.uint8(0x80) >> (positions & 7).astype(np.uint8)).astype(np.uint8)
+    np.bitwise_or.at(bitmap, positions >> 3, bits)
+
+
+def to_mask(bitmap: np.ndarray, n: int) -> np.ndarray:
+    """비트맵 → 길이 n 불리언 마스크"""
+    return np.unpackbits(bitmap, count=n).view(bool)
+
+
+def to_positions(bitmap: np.ndarray, n: int) -> np.ndarray:
+    """비트맵 → 정렬된 행 위치 배열"""
+    return np.flatnonzero(to_mask(bitmap, n))
+
+
+def first_positions(bitmap: np.ndarray, n: int, limit: int,
+                    chunk_bytes: int = 4096) -> np.ndarray:
+    """앞에서부터 최대 limit개의 행 위치 (전체를 풀지 않고 청크 단위로 스캔)"""
+    found = []
+    remaining = limit
+    for start in range(0, len(bitmap), chunk_bytes):
+        if remaining <= 0:
+            break
+        chunk = bitmap[start:start + chunk_bytes]
+        if not chunk.any():
+            continue
+        positions = np.flatnonzero(np.unpackbits(chunk))[:remaining] + start * 8
+        positions = positions[positions < n]
+        found.append(positions)
+        remaining -= len(positions)
+    if not found:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate(found)
+
+
+def and_all(bitmaps: Sequence[np.ndarray]) -> np.ndarray:
+    """비트맵 교집합 (ALL)"""
+    result = bitmaps[0].copy()
+    for b in bitmaps[1:]:
+        np.bitwise_and(result, b, out=result)
+    return result
+
+
+def or_all(bitmaps: Sequence[np.ndarray]) -> np.ndarray:
+    """비트맵 합집합 (ANY)"""
+    result = bitmaps[0].copy()
+    for b in bitmaps[1:]:
+        np.bitwise_or(result, b, out=result)
+    return result
+
+
+def popcount(bitmap: np.ndarray) -> int:
+    """1인 비트 수"""
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(bitmap).sum(dtype=np.int64))
+    return int(_POPCOUNT_TABLE[bitmap].sum(dtype=np.int64))
+
+
+def build_index(positions: np.ndarray, codes: np.ndarray,
+                n_codes: int, n: int) -> List[np.ndarray]:
+    """
+    (행 위치, 코드) 쌍 → 코드별 비트맵 목록
+
+    Args:
+        positions: 행 위치 배열
+        codes: 같은 길이의 코드 배열 (0..n_codes-1, 음수는 무시)
+        n_codes: 코드 개수
+        n: 전체 행 수
+    """
+    valid = (codes >= 0) & (positions >= 0)
+    positions, codes = positions[valid], codes[valid]
+    
+    # 코드순 정렬 후 구간별로 비트 세팅 (메모리: 길이 n 마스크 1개)
+    order = np.argsort(codes, kind='stable')
+    positions, codes = positions[order], codes[order]
+    bounds = np.searchsorted(codes, np.arange(n_codes + 1))
+    
+    mask = np.zeros(n, dtype=bool)
+    result = []
+    for c in range(n_codes):
+        mask[:] = False
+        mask[positions[bounds[c]:bounds[c + 1]]] = True
+        result.append(np.packbits(mask))
+    return result
+
+
+def _popcount_rows(words: np.ndarray) -> np.ndarray:
+    """2차원 uint64 배열 행별 1비트 수 (행 길이 < 2^26 워드)"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.uint32)
+    return _POPCOUNT_TABLE[words.view(np.uint8)].sum(axis=1, dtype=np.uint32)
+
+
+def overlap_counts(bitmaps: Sequence[np.ndarray],
+                   chunk_words: int = 4096) -> Tuple[np.ndarray, int]:
+    """
+    비트맵 쌍별 교집합 크기 행렬 + 전체 합집합 크기
+
+    64비트 워드 단위로 묶고 열 방향 청크(행당 chunk_words 워드)별로
+    모든 쌍을 계산해 캐시 안에서 처리
+    Returns: (k×k int64 행렬 - 대각선은 각 비트맵 크기, 합집합 크기)
+    """
+    k = len(bitmaps)
+    if k == 0:
+        return np.zeros((0, 0), dtype=np.int64), 0
+
+    n_bytes = len(bitmaps[0])
+    stacked = np.zeros((k, (n_bytes + 7) // 8 * 8), dtype=np.uint8)
+    for i, b in enumerate(bitmaps):
+        stacked[i, :n_bytes] = b
+    words = stacked.view(np.uint64)
+
+    matrix = np.zeros((k, k), dtype=np.int64)
+    union = 0
+    for start in range(0, words.shape[1], chunk_words):
+        block = words[:, start:start + chunk_words]
+        for i in range(k):
+            matrix[i, i:] += _popcount_rows(block[i] & block[i:])
+        union += int(_popcount_rows(np.bitwise_or.reduce(block, axis=0)[np.newaxis])[0])
+
+    # 상삼각 → 대칭 행렬
+    matrix += np.triu(matrix, 1).T
+    return matrix, union
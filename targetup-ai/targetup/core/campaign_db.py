@@ -3,20 +3,63 @@ TargetUP AI - Campaign Database
 SQLite 기반 캠페인/예약 영구 저장
 """
 import sqlite3
-import csv
 import os
-from datetime import datetime
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Optional, Tuple
-import json
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import zlib
+import numpy as np
+import pandas as pd
 
-from .models import Campaign, FilterSpec
+from .models import Campaign, FilterSpec, FrequencyCap
+from .data_store import data_cache
+from .filter_plan import to_day_number
+from . import target_store
+from . import pacing
 
 
 # DB 경로
 DB_DIR = Path(__file__).parent.parent / "data"
-DB_PATH = DB_DIR / "campaigns.db"
-TARGETS_DIR = DB_DIR / "targets"
+DB_PATH = Path(os.getenv('CAMPAIGN_DB_PATH', DB_DIR / "campaigns.db"))
+TARGETS_DIR = Path(os.getenv('CAMPAIGN_TARGETS_DIR', DB_DIR / "targets"))
+
+# 빈도 제한 집계 대상 상태
+COUNTED_STATUSES = ('scheduled', 'sending', 'sent', 'failed')
+
+# 연결별 PRAGMA (WAL: 읽기와 쓰기가 서로 막지 않음, NORMAL: WAL에서 안전한 fsync 수준)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,           # KiB 단위 음수 = 16MB
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,           # ms, 쓰기 잠금 대기
+}
+
+# 연결당 prepared statement 캐시 크기
+STATEMENT_CACHE_SIZE = 256
+
+# 발송 작업 청크당 고객 수 (캠페인 선점 시 이 크기로 send_chunks 작업 생성)
+SEND_CHUNK_SIZE = int(os.getenv('SEND_CHUNK_SIZE', '1000'))
+
+# 참조 없는 타겟 파일 정리 시 남겨 둘 최근 파일 기준(초) - 트랜잭션 전에 미리 저장된 파일 보호
+TARGET_GC_MIN_AGE_SECONDS = 600
+
+# 목록 조회 컬럼 (문안/스펙 같은 큰 텍스트는 상세 조회 시에만)
+LIST_COLUMNS = (
+    'id', 'created_at', 'user_prompt', 'send_at', 'as_of_date', 'total_count',
+    'targets_csv_path', 'targets_path', 'targets_hash', 'selected_variant_id', 'status', 'sent_at',
+    'projected_done_at'
+)
+
+# 캠페인 상태 (통계 키)
+CAMPAIGN_STATUSES = ('scheduled', 'sending', 'sent', 'failed', 'canceled')
+
+# 목록 페이지 커서 (send_at ISO 문자열, id) - 이 행 다음(더 과거)부터 조회
+PageCursor = Tuple[str, int]
 
 
 def ensure_dirs():
@@ -26,18 +69,86 @@ def ensure_dirs():
 
 
 class CampaignDB:
-    """캠페인 데이터베이스"""
+    """
+    캠페인 데이터베이스
     
-    def __init__(self):
+    스레드별 연결(Streamlit 세션 스레드마다 1개)을 autocommit 모드로 열고,
+    쓰기는 transaction() 블록에서 BEGIN IMMEDIATE ~ COMMIT으로 묶음
+    종료된 스레드의 연결은 새 연결을 열 때 닫음 (rerun마다 스레드가 바뀌어도 연결이 쌓이지 않음)
+    """
+    
+    def __init__(self, db_path: Optional[Path] = None, targets_dir: Optional[Path] = None):
         ensure_dirs()
-        self.conn = sqlite3.connect(str(DB_PATH), check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
+        self.db_path = Path(db_path or DB_PATH)
+        self.targets_dir = Path(targets_dir or TARGETS_DIR)
+        self.targets_dir.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connections: Dict[int, Tuple[threading.Thread, sqlite3.Connection]] = {}
+        self._connections_lock = threading.Lock()
+        self._send_counts_checked = False
         self._create_tables()
     
+    def _connect(self) -> sqlite3.Connection:
+        """새 연결 (PRAGMA 적용, autocommit, statement 캐시)"""
+        conn = sqlite3.connect(
+            str(self.db_path),
+            isolation_level=None,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        for name, value in SQLITE_PRAGMAS.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        thread = threading.current_thread()
+        with self._connections_lock:
+            self._close_dead_connections()
+            self._connections[thread.ident] = (thread, conn)
+        return conn
+    
+    def _close_dead_connections(self):
+        """종료된 스레드의 연결 닫기 (_connections_lock 안에서 호출)"""
+        for ident, (thread, conn) in list(self._connections.items()):
+            if not thread.is_alive():
+                conn.close()
+                del self._connections[ident]
+    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """현재 스레드 연결 (없으면 생성)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+    
+    @contextmanager
+    def transaction(self):
+        """
+        쓰기 트랜잭션 (BEGIN IMMEDIATE로 시작 시점에 쓰기 잠금 확보)
+        
+        이미 트랜잭션 안이면 바깥 트랜잭션에 합류
+        """
+        conn = self.conn
+        if conn.in_transaction:
+            yield conn
+            return
+        
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    
     def _create_tables(self):
         """테이블 생성"""
-        cursor = self.conn.cursor()
-        
+        with self.transaction() as conn:
+            self._create_schema(conn.cursor())
+    
+    def _create_schema(self, cursor: sqlite3.Cursor):
+        """스키마 생성 + 컬럼 추가 마이그레이션"""
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS campaigns (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -48,17 +159,32 @@ class CampaignDB:
                 spec_json TEXT,
                 total_count INTEGER DEFAULT 0,
                 targets_csv_path TEXT,
+                targets_path TEXT,
+                targets_hash TEXT,
                 selected_variant_id TEXT,
                 sms_text TEXT,
                 lms_text TEXT,
                 status TEXT DEFAULT 'scheduled',
-                sent_at TEXT
+                sent_at TEXT,
+                projected_done_at TEXT
             )
         """)
         
+        # 컬럼 추가 마이그레이션 (기존 DB)
+        columns = {row['name'] for row in cursor.execute("PRAGMA table_info(campaigns)")}
+        if 'targets_path' not in columns:
+            # 압축 고객 키 파일 (기존 캠페인은 targets_csv_path 유지)
+            cursor.execute("ALTER TABLE campaigns ADD COLUMN targets_path TEXT")
+        if 'targets_hash' not in columns:
+            cursor.execute("ALTER TABLE campaigns ADD COLUMN targets_hash TEXT")
+        if 'projected_done_at' not in columns:
+            cursor.execute("ALTER TABLE campaigns ADD COLUMN projected_done_at TEXT")
+        
+        # 상태별 목록 키셋 페이지 (status, send_at, rowid) - 상태 단독 인덱스 대체
+        cursor.execute("DROP INDEX IF EXISTS idx_campaigns_status")
         cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_campaigns_status 
-            ON campaigns(status)
+            CREATE INDEX IF NOT EXISTS idx_campaigns_status_send_at 
+            ON campaigns(status, send_at)
         """)
         
         cursor.execute("""
@@ -66,41 +192,129 @@ class CampaignDB:
             ON campaigns(send_at)
         """)
         
-        self.conn.commit()
+        # 내용 주소 타겟 파일 (고객 키 해시 → 참조 캠페인 수)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS target_objects (
+                hash TEXT PRIMARY KEY,
+                n_keys INTEGER NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                refcount INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL
+            )
+        """)
+        
+        # 일자별 고객 발송 수 (빈도 제한용, zlib 압축 uint8 배열)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS send_counts (
+                day INTEGER PRIMARY KEY,
+                n_customers INTEGER NOT NULL,
+                counts BLOB NOT NULL
+            )
+        """)
+        
+        # 발송 작업 (캠페인 청크 단위, 리스 기반)
+        # status: pending → leased(owner, lease_expires_at) → done / failed
+        # 리스가 만료된 작업은 다른 워커가 다시 가져감 (attempts로 시도 횟수 제한)
+        # not_before 이후에만, priority가 작은 작업부터 가져감 (pacing)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS send_chunks (
+                campaign_id INTEGER NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                chunk_size INTEGER NOT NULL,
+                n_messages INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                started_at REAL,
+                finished_at REAL,
+                error TEXT,
+                owner TEXT,
+                lease_expires_at REAL,
+                not_before REAL NOT NULL DEFAULT 0,
+                priority INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (campaign_id, chunk_index)
+            )
+        """)
+        chunk_columns = {row['name'] for row in cursor.execute("PRAGMA table_info(send_chunks)")}
+        if 'owner' not in chunk_columns:
+            cursor.execute("ALTER TABLE send_chunks ADD COLUMN owner TEXT")
+            cursor.execute("ALTER TABLE send_chunks ADD COLUMN lease_expires_at REAL")
+        if 'not_before' not in chunk_columns:
+            # 분산 발송: 청크별 발송 가능 시각 + 우선순위 (작을수록 먼저)
+            cursor.execute("ALTER TABLE send_chunks ADD COLUMN not_before REAL NOT NULL DEFAULT 0")
+            cursor.execute("ALTER TABLE send_chunks ADD COLUMN priority INTEGER NOT NULL DEFAULT 0")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_send_chunks_status 
+            ON send_chunks(status, lease_expires_at)
+        """)
     
     def save_campaign(self, 
                       user_prompt: str,
                       send_at: datetime,
                       spec: FilterSpec,
                       total_count: int,
-                      customer_ids: List[str],
+                      customer_keys: np.ndarray,
                       selected_variant_id: str,
                       sms_text: str,
-                      lms_text: str) -> int:
+                      lms_text: str,
+                      frequency_cap: Optional[FrequencyCap] = None) -> int:
         """
         캠페인 저장
+        
+        customer_keys: 내부 고객 키 배열 (같은 타겟은 같은 파일 공유, ID 변환은 내보내기 시점에)
+        frequency_cap: 지정 시 한도에 도달한 고객을 제외하고 저장 (total_count도 갱신)
         Returns: 캠페인 ID
         """
-        cursor = self.conn.cursor()
         now = datetime.now()
         
-        # 타겟 CSV 저장
-        csv_filename = f"targets_{now.strftime('%Y%m%d_%H%M%S')}.csv"
-        csv_path = TARGETS_DIR / csv_filename
+        # 타겟 파일(압축 + 쓰기)은 쓰기 잠금 밖에서 미리 저장 (고객 키 해시 파일명 - 이미 있으면 재사용)
+        if frequency_cap is not None:
+            version = self.data_version()
+            target_keys = self.apply_frequency_cap(customer_keys, send_at, frequency_cap)
+        else:
+            target_keys = customer_keys
+        targets_hash, targets_path, n_keys, size_bytes = target_store.save_keys(
+            self.targets_dir, target_keys
+        )
         
-        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(['customer_id'])
-            for cid in customer_ids:
-                writer.writerow([cid])
+        # 빈도 제한 확인 ~ 발송 수 증가를 한 트랜잭션으로 (동시 저장이 같은 빈자리를 함께 쓰지 않도록)
+        with self.transaction() as conn:
+            if frequency_cap is not None:
+                # 미리 계산한 뒤 다른 연결의 커밋이 있었으면 잠금 안에서 다시 확인
+                if self.data_version() != version:
+                    rechecked = self.apply_frequency_cap(customer_keys, send_at, frequency_cap)
+                    if not np.array_equal(rechecked, target_keys):
+                        # 드문 경우만 잠금 안에서 다시 저장 (먼저 저장한 파일은 gc_targets가 정리)
+                        target_keys = rechecked
+                        targets_hash, targets_path, n_keys, size_bytes = target_store.save_keys(
+                            self.targets_dir, target_keys
+                        )
+                total_count = len(target_keys)
+            
+            projected_done_at = self._project_completion(conn, n_keys, send_at)
+            campaign_id = self._insert_campaign(
+                conn, now, user_prompt, send_at, spec, total_count,
+                targets_path, targets_hash, n_keys, size_bytes, selected_variant_id, sms_text, lms_text,
+                projected_done_at
+            )
+            self._add_send_counts(send_at, target_keys, +1)
         
-        # DB 저장
-        cursor.execute("""
+        # 저장 직전 다른 캠페인 삭제/정리로 같은 파일이 지워졌으면 다시 기록
+        if not targets_path.exists():
+            target_store.save_keys(self.targets_dir, target_keys)
+        return campaign_id
+    
+    def _insert_campaign(self, conn: sqlite3.Connection, now: datetime,
+                         user_prompt: str, send_at: datetime, spec: FilterSpec,
+                         total_count: int, targets_path: Path, targets_hash: str,
+                         n_keys: int, size_bytes: int, selected_variant_id: str,
+                         sms_text: str, lms_text: str, projected_done_at: datetime) -> int:
+        """캠페인 행 + 타겟 참조 수 증가 (트랜잭션 안에서 호출)"""
+        cursor = conn.execute("""
             INSERT INTO campaigns (
                 created_at, user_prompt, send_at, as_of_date, spec_json,
-                total_count, targets_csv_path, selected_variant_id,
-                sms_text, lms_text, status
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                total_count, targets_path, targets_hash, selected_variant_id,
+                sms_text, lms_text, status, projected_done_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             now.isoformat(),
             user_prompt,
@@ -108,15 +322,37 @@ class CampaignDB:
             spec.as_of_date.isoformat() if spec.as_of_date else None,
             spec.to_json(),
             total_count,
-            str(csv_path),
+            str(targets_path),
+            targets_hash,
             selected_variant_id,
             sms_text,
             lms_text,
-            'scheduled'
+            'scheduled',
+            projected_done_at.isoformat()
         ))
+        campaign_id = cursor.lastrowid
+        
+        conn.execute("""
+            INSERT INTO target_objects (hash, n_keys, size_bytes, refcount, created_at)
+            VALUES (?, ?, ?, 1, ?)
+            ON CONFLICT(hash) DO UPDATE SET refcount = refcount + 1
+        """, (targets_hash, n_keys, size_bytes, now.isoformat()))
+        return campaign_id
+    
+    def _project_completion(self, conn: sqlite3.Connection, n_messages: int,
+                            send_at: datetime) -> datetime:
+        """
+        예상 발송 완료 시각 (트랜잭션 안에서 호출)
         
-        self.conn.commit()
-        return cursor.lastrowid
+        같은 분산 구간 안에 발송될 더 작은(우선순위가 높은) 대기 캠페인을 앞선 물량으로 봄
+        """
+        window = timedelta(minutes=pacing.SEND_SMOOTHING_MINUTES)
+        ahead = conn.execute("""
+            SELECT COALESCE(SUM(total_count), 0) FROM campaigns
+            WHERE status IN ('scheduled', 'sending') AND total_count <= ?
+              AND send_at BETWEEN ? AND ?
+        """, (n_messages, (send_at - window).isoformat(), (send_at + window).isoformat())).fetchone()[0]
+        return pacing.projected_completion(n_messages, send_at, ahead)
     
     def get_campaign(self, campaign_id: int) -> Optional[Campaign]:
         """캠페인 조회"""
@@ -131,25 +367,59 @@ class CampaignDB:
     def get_all_campaigns(self, 
                           status: Optional[str] = None,
                           limit: int = 100) -> List[Campaign]:
-        """캠페인 목록 조회"""
+        """캠페인 목록 조회 (전체 컬럼 - 화면 목록은 list_campaigns 사용)"""
         cursor = self.conn.cursor()
         
         if status:
             cursor.execute("""
                 SELECT * FROM campaigns 
                 WHERE status = ?
-                ORDER BY send_at DESC
+                ORDER BY send_at DESC, id DESC
                 LIMIT ?
             """, (status, limit))
         else:
             cursor.execute("""
                 SELECT * FROM campaigns 
-                ORDER BY send_at DESC
+                ORDER BY send_at DESC, id DESC
                 LIMIT ?
             """, (limit,))
         
         return [self._row_to_campaign(row) for row in cursor.fetchall()]
     
+    def list_campaigns(self,
+                       status: Optional[str] = None,
+                       limit: int = 20,
+                       after: Optional[PageCursor] = None) -> Tuple[List[Campaign], Optional[PageCursor]]:
+        """
+        캠페인 목록 한 페이지 (send_at 최신순, 키셋 페이지)
+        
+        문안/스펙 컬럼은 비워서 반환 (펼칠 때 get_campaign으로 조회)
+        after: 이전 페이지가 반환한 커서 (None이면 첫 페이지)
+        Returns: (캠페인 목록, 다음 페이지 커서 - 마지막 페이지면 None)
+        """
+        conditions, params = [], []
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if after is not None:
+            conditions.append("(send_at, id) < (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        rows = self.conn.execute(f"""
+            SELECT {', '.join(LIST_COLUMNS)} FROM campaigns
+            {where}
+            ORDER BY send_at DESC, id DESC
+            LIMIT ?
+        """, (*params, limit + 1)).fetchall()
+        
+        campaigns = [self._row_to_campaign(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = (last['send_at'], last['id'])
+        return campaigns, next_cursor
+    
     def get_due_campaigns(self) -> List[Campaign]:
         """발송 예정 캠페인 조회 (status=scheduled AND send_at <= now)"""
         cursor = self.conn.cursor()
@@ -163,100 +433,588 @@ class CampaignDB:
         
         return [self._row_to_campaign(row) for row in cursor.fetchall()]
     
-    def update_status(self, campaign_id: int, status: str, sent_at: Optional[datetime] = None):
-        """캠페인 상태 업데이트"""
-        cursor = self.conn.cursor()
+    def get_schedule(self) -> List[Tuple[datetime, int]]:
+        """발송 대기 캠페인 (send_at, id) 목록 - 스케줄러 힙 구성용"""
+        rows = self.conn.execute(
+            "SELECT send_at, id FROM campaigns WHERE status = 'scheduled'"
+        ).fetchall()
+        return [(datetime.fromisoformat(row['send_at']), row['id']) for row in rows]
+    
+    def data_version(self) -> int:
+        """
+        다른 연결의 커밋마다 바뀌는 DB 버전 (PRAGMA data_version)
+        
+        같은 연결(현재 스레드)의 커밋으로는 바뀌지 않음
+        """
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+    
+    def claim_due_campaigns(self, now: Optional[datetime] = None,
+                            campaign_id: Optional[int] = None,
+                            due_only: bool = True,
+                            chunk_size: int = SEND_CHUNK_SIZE) -> List[Campaign]:
+        """
+        발송 시각이 된 캠페인을 scheduled → sending으로 선점하고 청크 작업 생성
+        
+        UPDATE 한 문장으로 상태를 바꾸므로 여러 워커가 동시에 호출해도
+        한 캠페인은 한 워커에게만 반환됨 (청크 작업은 모든 워커가 나눠 처리)
+        campaign_id: 지정 시 해당 캠페인만 선점 시도
+        due_only: False면 발송 시각과 무관하게 선점 (즉시 발송)
+        """
+        now = now or datetime.now()
+        conditions, params = ["status = 'scheduled'"], []
+        if due_only:
+            conditions.append("send_at <= ?")
+            params.append(now.isoformat())
+        if campaign_id is not None:
+            conditions.append("id = ?")
+            params.append(campaign_id)
+        
+        with self.transaction() as conn:
+            rows = conn.execute(
+                f"UPDATE campaigns SET status = 'sending' WHERE {' AND '.join(conditions)} RETURNING *",
+                params
+            ).fetchall()
+            for row in rows:
+                self._create_send_chunks(conn, row, chunk_size, urgent=not due_only)
+        return sorted((self._row_to_campaign(row) for row in rows), key=lambda c: c.send_at)
+    
+    def update_status(self, campaign_id: int, status: str,
+                      sent_at: Optional[datetime] = None,
+                      expected: Optional[Sequence[str]] = None) -> bool:
+        """
+        캠페인 상태 업데이트
         
+        expected: 지정 시 현재 상태가 이 중 하나일 때만 변경 (다른 워커와 경합 방지)
+        Returns: 변경 여부
+        """
+        sql = "UPDATE campaigns SET status = ?"
+        params: list = [status]
         if sent_at:
-            cursor.execute("""
-                UPDATE campaigns 
-                SET status = ?, sent_at = ?
-                WHERE id = ?
-            """, (status, sent_at.isoformat(), campaign_id))
-        else:
-            cursor.execute("""
-                UPDATE campaigns 
-                SET status = ?
-                WHERE id = ?
-            """, (status, campaign_id))
+            sql += ", sent_at = ?"
+            params.append(sent_at.isoformat())
+        sql += " WHERE id = ?"
+        params.append(campaign_id)
+        if expected:
+            sql += f" AND status IN ({', '.join('?' * len(expected))})"
+            params.extend(expected)
         
-        self.conn.commit()
+        with self.transaction() as conn:
+            cursor = conn.execute(sql, params)
+        return cursor.rowcount == 1
     
     def cancel_campaign(self, campaign_id: int) -> bool:
         """캠페인 취소"""
         campaign = self.get_campaign(campaign_id)
-        if campaign and campaign.status == 'scheduled':
-            self.update_status(campaign_id, 'canceled')
-            return True
-        return False
+        if not campaign or campaign.status != 'scheduled':
+            return False
+        
+        # 타겟 파일은 트랜잭션(쓰기 잠금) 밖에서 읽기
+        keys = self.get_target_keys(campaign_id)
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE campaigns SET status = 'canceled' WHERE id = ? AND status = 'scheduled'",
+                (campaign_id,)
+            )
+            if cursor.rowcount == 0:
+                return False
+            if keys is not None and campaign.send_at:
+                self._add_send_counts(campaign.send_at, keys, -1)
+        return True
+    
+    def retry_campaign(self, campaign_id: int) -> bool:
+        """발송 실패 캠페인의 실패 청크를 다시 대기시킴 (완료된 청크는 건너뛰고 이어서 발송)"""
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE campaigns SET status = 'sending' WHERE id = ? AND status = 'failed'",
+                (campaign_id,)
+            )
+            if cursor.rowcount == 0:
+                return False
+            conn.execute("""
+                UPDATE send_chunks
+                SET status = 'pending', attempts = 0, error = NULL, owner = NULL, lease_expires_at = NULL
+                WHERE campaign_id = ? AND status = 'failed'
+            """, (campaign_id,))
+            self._finalize_campaign(conn, campaign_id)
+        return True
     
     def send_now(self, campaign_id: int) -> bool:
-        """캠페인 즉시 발송 (시뮬레이션)"""
-        campaign = self.get_campaign(campaign_id)
-        if campaign and campaign.status == 'scheduled':
-            self.update_status(campaign_id, 'sent', datetime.now())
-            return True
-        return False
+        """캠페인 즉시 발송 (발송 시각과 무관하게 선점 → 워커가 청크 발송)"""
+        return bool(self.claim_due_campaigns(campaign_id=campaign_id, due_only=False))
     
     def delete_campaign(self, campaign_id: int) -> bool:
         """캠페인 삭제"""
         campaign = self.get_campaign(campaign_id)
         if campaign:
-            # CSV 파일 삭제
-            if campaign.targets_csv_path and os.path.exists(campaign.targets_csv_path):
-                os.remove(campaign.targets_csv_path)
+            keys = self.get_target_keys(campaign_id) if campaign.status in COUNTED_STATUSES else None
+            
+            removable = [campaign.targets_csv_path]
+            with self.transaction() as conn:
+                cursor = conn.execute("DELETE FROM campaigns WHERE id = ?", (campaign_id,))
+                if cursor.rowcount == 0:
+                    return False
+                conn.execute("DELETE FROM send_chunks WHERE campaign_id = ?", (campaign_id,))
+                if keys is not None and campaign.send_at:
+                    self._add_send_counts(campaign.send_at, keys, -1)
+                
+                # 타겟 파일: 내용 주소 파일은 마지막 참조가 사라질 때만 삭제
+                if campaign.targets_hash:
+                    conn.execute(
+                        "UPDATE target_objects SET refcount = refcount - 1 WHERE hash = ?",
+                        (campaign.targets_hash,)
+                    )
+                    cursor = conn.execute(
+                        "DELETE FROM target_objects WHERE hash = ? AND refcount <= 0",
+                        (campaign.targets_hash,)
+                    )
+                    if cursor.rowcount:
+                        removable.append(campaign.targets_path)
+                else:
+                    removable.append(campaign.targets_path)
             
-            cursor = self.conn.cursor()
-            cursor.execute("DELETE FROM campaigns WHERE id = ?", (campaign_id,))
-            self.conn.commit()
+            for path in removable:
+                if not path or not os.path.exists(path):
+                    continue
+                # 그사이 같은 타겟이 다시 저장됐으면 유지
+                if campaign.targets_hash and path == campaign.targets_path and self.conn.execute(
+                    "SELECT 1 FROM target_objects WHERE hash = ?", (campaign.targets_hash,)
+                ).fetchone():
+                    continue
+                os.remove(path)
             return True
         return False
     
+    def gc_targets(self, min_age_seconds: float = TARGET_GC_MIN_AGE_SECONDS) -> int:
+        """
+        참조 없는 타겟 파일 정리 (저장 취소/중단으로 남은 파일, 임시 파일)
+        
+        쓰기 잠금 안에서 참조를 확인하고 삭제하며, min_age_seconds 안에 기록/재사용된 파일은
+        트랜잭션 전에 미리 저장한 진행 중 저장일 수 있어 남겨 둠
+        Returns: 삭제한 파일 수
+        """
+        removed = 0
+        with self.transaction() as conn:
+            cutoff = time.time() - min_age_seconds
+            conn.execute("DELETE FROM target_objects WHERE refcount <= 0")
+            live = {row['hash'] for row in conn.execute("SELECT hash FROM target_objects")}
+            
+            for path in self.targets_dir.iterdir():
+                orphan = path.suffix == target_store.KEYS_SUFFIX and path.stem not in live
+                if not (orphan or path.name.endswith('.tmp')):
+                    continue
+                try:
+                    if path.stat().st_mtime >= cutoff:
+                        continue
+                    path.unlink()
+                except FileNotFoundError:
+                    continue
+                removed += 1
+        return removed
+    
+    def get_target_storage_stats(self) -> dict:
+        """타겟 저장소 통계 (파일 수, 참조 수, 디스크 사용량)"""
+        row = self.conn.execute("""
+            SELECT COUNT(*) AS objects,
+                   COALESCE(SUM(refcount), 0) AS refs,
+                   COALESCE(SUM(size_bytes), 0) AS bytes,
+                   COALESCE(SUM(size_bytes * refcount), 0) AS logical_bytes
+            FROM target_objects
+        """).fetchone()
+        return dict(row)
+    
     def get_targets_csv(self, campaign_id: int) -> Optional[str]:
-        """타겟 CSV 경로 반환"""
+        """타겟 CSV 경로 반환 (CSV로 저장된 기존 캠페인만)"""
         campaign = self.get_campaign(campaign_id)
         if campaign and campaign.targets_csv_path:
             return campaign.targets_csv_path
         return None
     
-    def get_campaign_stats(self) -> dict:
-        """캠페인 통계"""
-        cursor = self.conn.cursor()
+    def get_target_keys(self, campaign_id: int) -> Optional[np.ndarray]:
+        """저장된 타겟 → 정렬된 내부 고객 키 배열 (캠페인/파일 없으면 None)"""
+        campaign = self.get_campaign(campaign_id)
+        if campaign is None:
+            return None
+        if campaign.targets_path and os.path.exists(campaign.targets_path):
+            return target_store.load_keys(campaign.targets_path)
+        if campaign.targets_csv_path and os.path.exists(campaign.targets_csv_path):
+            customer_ids = pd.read_csv(campaign.targets_csv_path, dtype=str)['customer_id']
+            return data_cache.keys_for_ids(customer_ids)
+        return None
+    
+    def export_targets(self, campaign_id: int, fmt: str = 'csv') -> Optional[Iterator[bytes]]:
+        """
+        타겟 내보내기 (다운로드 요청 시에만 호출)
+        
+        Returns: CSV/Parquet 바이트 청크 생성기 (타겟 없으면 None)
+        """
+        keys = self.get_target_keys(campaign_id)
+        if keys is None:
+            return None
+        return target_store.iter_export(keys, fmt)
+    
+    # ==================== 발송 작업 (리스) ====================
+    
+    def _create_send_chunks(self, conn: sqlite3.Connection, row: sqlite3.Row,
+                            chunk_size: int, urgent: bool = False):
+        """
+        선점한 캠페인의 청크 작업 생성 (이미 있는 청크는 유지, 트랜잭션 안에서 호출)
+        
+        대형 캠페인은 분산 구간에 걸친 청크별 발송 가능 시각을 매기고,
+        앞선 우선순위 작업 물량으로 예상 완료 시각을 다시 계산
+        """
+        n_keys = row['total_count']
+        if row['targets_hash']:
+            target = conn.execute(
+                "SELECT n_keys FROM target_objects WHERE hash = ?", (row['targets_hash'],)
+            ).fetchone()
+            if target:
+                n_keys = target['n_keys']
+        
+        existing = conn.execute(
+            "SELECT chunk_size FROM send_chunks WHERE campaign_id = ? LIMIT 1", (row['id'],)
+        ).fetchone()
+        if existing:
+            chunk_size = existing['chunk_size']
         
-        stats = {}
-        for status in ['scheduled', 'sent', 'canceled']:
-            cursor.execute(
-                "SELECT COUNT(*) FROM campaigns WHERE status = ?", 
-                (status,)
+        priority = pacing.send_priority(n_keys, urgent)
+        ahead = conn.execute("""
+            SELECT COALESCE(SUM(chunk_size), 0) FROM send_chunks
+            WHERE status IN ('pending', 'leased') AND priority < ?
+        """, (priority,)).fetchone()[0]
+        now = datetime.now()
+        conn.execute(
+            "UPDATE campaigns SET projected_done_at = ? WHERE id = ?",
+            (pacing.projected_completion(n_keys, now, ahead, urgent).isoformat(), row['id'])
+        )
+        
+        release_times = pacing.chunk_release_times(n_keys, chunk_size, now.timestamp(), urgent)
+        conn.executemany("""
+            INSERT OR IGNORE INTO send_chunks (
+                campaign_id, chunk_index, chunk_size, n_messages, status, not_before, priority
+            ) VALUES (?, ?, ?, 0, 'pending', ?, ?)
+        """, [(row['id'], i, chunk_size, t, priority) for i, t in enumerate(release_times)])
+        self._finalize_campaign(conn, row['id'])
+    
+    def _finalize_campaign(self, conn: sqlite3.Connection, campaign_id: int) -> Optional[str]:
+        """
+        남은 청크가 없으면 sending → sent / failed (트랜잭션 안에서 호출)
+        Returns: 바뀐 상태 (아직 남은 청크가 있으면 None)
+        """
+        row = conn.execute("""
+            UPDATE campaigns
+            SET status = CASE WHEN EXISTS (
+                    SELECT 1 FROM send_chunks WHERE campaign_id = :id AND status = 'failed'
+                ) THEN 'failed' ELSE 'sent' END,
+                sent_at = :now
+            WHERE id = :id AND status = 'sending' AND NOT EXISTS (
+                SELECT 1 FROM send_chunks WHERE campaign_id = :id AND status IN ('pending', 'leased')
             )
-            stats[status] = cursor.fetchone()[0]
+            RETURNING status
+        """, {'id': campaign_id, 'now': datetime.now().isoformat()}).fetchone()
+        return row['status'] if row else None
+    
+    def claim_send_chunks(self, owner: str, limit: int, lease_seconds: float,
+                          max_attempts: int, campaign_id: Optional[int] = None) -> List[dict]:
+        """
+        발송 가능 시각이 된 대기 작업이나 리스가 만료된 작업을 owner에게 리스
+        (우선순위 → 발송 가능 시각 순)
+        
+        시도 횟수를 다 쓴 만료 작업은 failed로 정리 (멈춘 워커의 작업 회수)
+        Returns: 리스한 작업 목록 (campaign_id, chunk_index 순)
+        """
+        now = time.time()
+        scope, params = "", [owner, now + lease_seconds, now, now, now]
+        if campaign_id is not None:
+            scope = "AND campaign_id = ?"
+            params.append(campaign_id)
+        params.append(limit)
         
-        cursor.execute("SELECT COUNT(*) FROM campaigns")
-        stats['total'] = cursor.fetchone()[0]
+        with self.transaction() as conn:
+            expired = conn.execute("""
+                UPDATE send_chunks
+                SET status = 'failed', owner = NULL, error = '리스 만료 (시도 횟수 초과)'
+                WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= ?
+                RETURNING campaign_id
+            """, (now, max_attempts)).fetchall()
+            for expired_campaign in {row['campaign_id'] for row in expired}:
+                self._finalize_campaign(conn, expired_campaign)
+            
+            rows = conn.execute(f"""
+                UPDATE send_chunks
+                SET status = 'leased', owner = ?, lease_expires_at = ?,
+                    attempts = attempts + 1, started_at = COALESCE(started_at, ?)
+                WHERE rowid IN (
+                    SELECT rowid FROM send_chunks
+                    WHERE ((status = 'pending' AND not_before <= ?)
+                           OR (status = 'leased' AND lease_expires_at < ?)) {scope}
+                    ORDER BY priority, not_before, campaign_id, chunk_index
+                    LIMIT ?
+                )
+                RETURNING *
+            """, params).fetchall()
+        return sorted((dict(row) for row in rows), key=lambda r: (r['campaign_id'], r['chunk_index']))
+    
+    def count_send_workers(self) -> int:
+        """지금 리스를 가진 발송 워커 수 (게이트웨이 속도 한도 배분용)"""
+        return self.conn.execute("""
+            SELECT COUNT(DISTINCT owner) FROM send_chunks
+            WHERE status = 'leased' AND lease_expires_at >= ?
+        """, (time.time(),)).fetchone()[0]
+    
+    def renew_send_chunks(self, owner: str, chunks: Sequence[Tuple[int, int]],
+                          lease_seconds: float) -> List[Tuple[int, int]]:
+        """
+        리스 연장 (chunks: (campaign_id, chunk_index) 목록)
+        Returns: 연장하지 못한 (다른 워커에게 넘어간) 청크
+        """
+        lost = []
+        with self.transaction() as conn:
+            for campaign_id, chunk_index in chunks:
+                cursor = conn.execute("""
+                    UPDATE send_chunks SET lease_expires_at = ?
+                    WHERE campaign_id = ? AND chunk_index = ? AND owner = ? AND status = 'leased'
+                """, (time.time() + lease_seconds, campaign_id, chunk_index, owner))
+                if cursor.rowcount == 0:
+                    lost.append((campaign_id, chunk_index))
+        return lost
+    
+    def release_send_chunk(self, owner: str, campaign_id: int, chunk_index: int,
+                           n_messages: int, max_attempts: int,
+                           error: Optional[str] = None, retryable: bool = True) -> Tuple[bool, Optional[str]]:
+        """
+        리스한 청크 작업 반납
+        
+        성공(error 없음) → done, 실패 → 시도 횟수가 남고 재시도 가능하면 pending (다른 워커도 가져감), 아니면 failed
+        owner는 마지막 처리 워커로 남겨 둠
+        마지막 청크였으면 캠페인을 sent / failed로 마무리
+        Returns: (반납 여부 - 리스를 잃었으면 False, 캠페인 최종 상태 또는 None)
+        """
+        if error is None:
+            status_sql, params = "'done'", []
+        else:
+            status_sql = "CASE WHEN ? AND attempts < ? THEN 'pending' ELSE 'failed' END"
+            params = [int(retryable), max_attempts]
         
+        with self.transaction() as conn:
+            cursor = conn.execute(f"""
+                UPDATE send_chunks
+                SET status = {status_sql}, n_messages = ?, finished_at = ?, error = ?,
+                    lease_expires_at = NULL
+                WHERE campaign_id = ? AND chunk_index = ? AND owner = ? AND status = 'leased'
+            """, (*params, n_messages, time.time(), error, campaign_id, chunk_index, owner))
+            if cursor.rowcount == 0:
+                return False, None
+            return True, self._finalize_campaign(conn, campaign_id)
+    
+    def get_send_chunks(self, campaign_id: int) -> List[dict]:
+        """캠페인 청크 작업 목록 (chunk_index 순)"""
+        rows = self.conn.execute(
+            "SELECT * FROM send_chunks WHERE campaign_id = ? ORDER BY chunk_index",
+            (campaign_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+    
+    def get_send_progress(self, campaign_id: int) -> dict:
+        """
+        발송 진행 현황 (완료/실패 청크, 발송 건수, 처리량)
+        
+        throughput: 첫 청크 시작 ~ 마지막 청크 완료 구간의 초당 발송 건수
+        """
+        row = self.conn.execute("""
+            SELECT COALESCE(SUM(CASE WHEN status = 'done' THEN n_messages END), 0) AS sent,
+                   COUNT(CASE WHEN status = 'done' THEN 1 END) AS done_chunks,
+                   COUNT(CASE WHEN status = 'failed' THEN 1 END) AS failed_chunks,
+                   COUNT(CASE WHEN status IN ('pending', 'leased') THEN 1 END) AS remaining_chunks,
+                   MIN(started_at) AS started_at,
+                   MAX(finished_at) AS finished_at
+            FROM send_chunks WHERE campaign_id = ?
+        """, (campaign_id,)).fetchone()
+        progress = dict(row)
+        elapsed = (row['finished_at'] - row['started_at']) if row['started_at'] else 0.0
+        progress['elapsed'] = elapsed
+        progress['throughput'] = row['sent'] / elapsed if elapsed > 0 else 0.0
+        return progress
+    
+    # ==================== 빈도 제한 ====================
+    
+    def _read_send_counts(self, day: int) -> Optional[np.ndarray]:
+        """
+        일자별 발송 수 배열 (없으면 None)
+        
+        고객이 추가돼 저장 당시보다 고객 수가 늘었으면 기존 발송 수를 유지한 채 0으로 확장
+        """
+        row = self.conn.execute(
+            "SELECT n_customers, counts FROM send_counts WHERE day = ?", (day,)
+        ).fetchone()
+        if row is None:
+            return None
+        counts = np.frombuffer(zlib.decompress(row['counts']), dtype=np.uint8)
+        n_customers = data_cache.n_customers
+        if len(counts) > n_customers:
+            raise ValueError(
+                f"발송 수 인덱스({len(counts):,}명)가 현재 고객 수({n_customers:,}명)보다 큽니다. "
+                f"rebuild_send_counts()로 재구성하세요."
+            )
+        resized = np.zeros(n_customers, dtype=np.uint8)
+        resized[:len(counts)] = counts
+        return resized
+    
+    def _add_send_counts(self, send_at: datetime, customer_keys: np.ndarray, delta: int):
+        """
+        발송일 발송 수 증감 (호출자 트랜잭션 안에서 읽기-수정-쓰기)
+        
+        customer_keys는 중복 없는 고객 키, 발송 수는 0..255로 포화
+        """
+        day = to_day_number(send_at.date())
+        counts = self._read_send_counts(day)
+        if counts is None:
+            counts = np.zeros(data_cache.n_customers, dtype=np.uint8)
+        
+        keys = np.asarray(customer_keys, dtype=np.int64)
+        current = counts[keys]
+        if delta > 0:
+            counts[keys] = current + (current < 255)
+        else:
+            counts[keys] = current - (current > 0)
+        
+        self.conn.execute(
+            "INSERT OR REPLACE INTO send_counts (day, n_customers, counts) VALUES (?, ?, ?)",
+            (day, len(counts), zlib.compress(counts.tobytes(), 1))
+        )
+    
+    def rebuild_send_counts(self):
+        """저장된 타겟으로 발송 수 인덱스 재구성 (고객 데이터 재생성 후 등)"""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM send_counts")
+            placeholders = ', '.join('?' * len(COUNTED_STATUSES))
+            rows = conn.execute(
+                f"SELECT id, send_at FROM campaigns WHERE status IN ({placeholders})",
+                COUNTED_STATUSES
+            ).fetchall()
+            for row in rows:
+                keys = self.get_target_keys(row['id'])
+                if keys is not None:
+                    self._add_send_counts(datetime.fromisoformat(row['send_at']), keys, +1)
+    
+    def _send_counts_stale(self) -> bool:
+        """인덱스 재구성 필요 여부 (고객 수 변경, 또는 인덱스 도입 전 캠페인만 있음)"""
+        mismatched = self.conn.execute(
+            "SELECT 1 FROM send_counts WHERE n_customers != ? LIMIT 1",
+            (data_cache.n_customers,)
+        ).fetchone()
+        if mismatched:
+            return True
+        if self._send_counts_checked:
+            return False
+        self._send_counts_checked = True
+        
+        has_counts = self.conn.execute("SELECT 1 FROM send_counts LIMIT 1").fetchone()
+        placeholders = ', '.join('?' * len(COUNTED_STATUSES))
+        has_campaigns = self.conn.execute(
+            f"SELECT 1 FROM campaigns WHERE status IN ({placeholders}) LIMIT 1",
+            COUNTED_STATUSES
+        ).fetchone()
+        return bool(has_campaigns) and not has_counts
+    
+    def get_send_counts(self, start_day: int, end_day: int) -> np.ndarray:
+        """[start_day, end_day] 구간 고객별 발송 수 합계"""
+        total = np.zeros(data_cache.n_customers, dtype=np.uint16)
+        for counts in self._read_send_counts_range(start_day, end_day).values():
+            total += counts
+        return total
+    
+    def _read_send_counts_range(self, start_day: int, end_day: int) -> dict:
+        """[start_day, end_day] 구간 일자 → 발송 수 배열 (발송 없는 날은 빠짐)"""
+        if self._send_counts_stale():
+            self.rebuild_send_counts()
+        
+        rows = self.conn.execute(
+            "SELECT day FROM send_counts WHERE day BETWEEN ? AND ?",
+            (start_day, end_day)
+        ).fetchall()
+        return {row['day']: self._read_send_counts(row['day']) for row in rows}
+    
+    def get_window_send_counts(self, day: int, window_days: int) -> np.ndarray:
+        """
+        day를 포함하는 window_days일 구간들의 고객별 발송 수 합계 중 최댓값
+        
+        [day-window_days+1, day+window_days-1] 일자별 발송 수에 window_days일 슬라이딩 합
+        """
+        daily = self._read_send_counts_range(day - window_days + 1, day + window_days - 1)
+        window = np.zeros(data_cache.n_customers, dtype=np.uint16)
+        for d in range(day - window_days + 1, day + 1):
+            if d in daily:
+                window += daily[d]
+        peak = window.copy()
+        
+        # 구간을 하루씩 뒤로 밀며 최댓값 갱신
+        for start in range(day - window_days + 2, day + 1):
+            added, removed = daily.get(start + window_days - 1), daily.get(start - 1)
+            if added is None and removed is None:
+                continue
+            if added is not None:
+                window += added
+            if removed is not None:
+                window -= removed
+            np.maximum(peak, window, out=peak)
+        return peak
+    
+    def apply_frequency_cap(self,
+                            customer_keys: np.ndarray,
+                            send_at: datetime,
+                            cap: FrequencyCap) -> np.ndarray:
+        """
+        빈도 제한 적용 → 발송 가능한 고객 키만 반환
+        
+        발송일을 포함하는 모든 window_days일 구간에서 기존 예약/발송 건수 + 1이
+        max_messages 이하인 고객만 남김 (저장 시에는 잠금 밖에서 미리 계산하고 save_campaign 트랜잭션 안에서 재확인)
+        """
+        day = to_day_number(send_at.date())
+        counts = self.get_window_send_counts(day, cap.window_days)
+        keys = np.asarray(customer_keys)
+        return keys[counts[keys] + 1 <= cap.max_messages]
+    
+    def get_campaign_stats(self) -> dict:
+        """캠페인 통계 (상태별 건수 + 전체)"""
+        stats = dict.fromkeys(CAMPAIGN_STATUSES, 0)
+        for row in self.conn.execute("SELECT status, COUNT(*) AS n FROM campaigns GROUP BY status"):
+            stats[row['status']] = row['n']
+        stats['total'] = sum(stats.values())
         return stats
     
     def _row_to_campaign(self, row) -> Campaign:
-        """Row를 Campaign 객체로 변환"""
+        """Row를 Campaign 객체로 변환 (조회하지 않은 컬럼은 None)"""
+        values = dict(row)
+        
+        def as_datetime(name):
+            return datetime.fromisoformat(values[name]) if values.get(name) else None
+        
         return Campaign(
-            id=row['id'],
-            created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None,
-            user_prompt=row['user_prompt'],
-            send_at=datetime.fromisoformat(row['send_at']) if row['send_at'] else None,
-            as_of_date=datetime.fromisoformat(row['as_of_date']).date() if row['as_of_date'] else None,
-            spec_json=row['spec_json'],
-            total_count=row['total_count'],
-            targets_csv_path=row['targets_csv_path'],
-            selected_variant_id=row['selected_variant_id'],
-            sms_text=row['sms_text'],
-            lms_text=row['lms_text'],
-            status=row['status'],
-            sent_at=datetime.fromisoformat(row['sent_at']) if row['sent_at'] else None
+            id=values['id'],
+            created_at=as_datetime('created_at'),
+            user_prompt=values.get('user_prompt', ''),
+            send_at=as_datetime('send_at'),
+            as_of_date=as_datetime('as_of_date').date() if values.get('as_of_date') else None,
+            spec_json=values.get('spec_json'),
+            total_count=values.get('total_count', 0),
+            targets_csv_path=values.get('targets_csv_path'),
+            targets_path=values.get('targets_path'),
+            targets_hash=values.get('targets_hash'),
+            selected_variant_id=values.get('selected_variant_id'),
+            sms_text=values.get('sms_text'),
+            lms_text=values.get('lms_text'),
+            status=values.get('status'),
+            sent_at=as_datetime('sent_at'),
+            projected_done_at=as_datetime('projected_done_at')
         )
     
     def close(self):
-        """연결 종료"""
-        self.conn.close()
+        """모든 스레드 연결 종료"""
+        with self._connections_lock:
+            for _, conn in self._connections.values():
+                conn.close()
+            self._connections = {}
+        self._local = threading.local()
 
 
 # 싱글톤 인스턴스
@@ -0,0 +1,136 @@
+"""
+TargetUP AI - Column Store
+타겟팅용 컬럼을 .npy 파일로 저장하고 메모리 매핑으로 로드
+
+여러 Streamlit 워커 프로세스가 같은 파일을 mmap하므로
+OS 페이지 캐시를 공유하고, 콜드 스타트 시 parquet 파싱이 없음
+"""
+import os
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+import numpy as np
+
+
+# 컬럼 저장 경로
+COLUMNS_DIR = Path(__file__).parent.parent / "data" / "columns"
+MANIFEST_PATH = COLUMNS_DIR / "manifest.json"
+
+# 포맷 변경 시 증가 (기존 컬럼 스토어 자동 재빌드)
+FORMAT_VERSION = 2
+
+
+def ensure_columns_dir():
+    """컬럼 디렉토리 생성"""
+    COLUMNS_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def source_signature(paths: List[Path]) -> Dict[str, List[int]]:
+    """원본 parquet 파일 시그니처 (mtime_ns, size)"""
+    signature = {}
+    for path in paths:
+        stat = path.stat()
+        signature[path.name] = [stat.st_mtime_ns, stat.st_size]
+    return signature
+
+
+def read_manifest() -> Optional[Dict[str, Any]]:
+    """매니페스트 읽기 (없거나 손상 시 None)"""
+    if not MANIFEST_PATH.exists():
+        return None
+    try:
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def is_fresh(sources: List[Path]) -> bool:
+    """컬럼 스토어가 원본 parquet과 일치하는지 확인"""
+    manifest = read_manifest()
+    if manifest is None or manifest.get('format_version') != FORMAT_VERSION:
+        return False
+    if not all(path.exists() for path in sources):
+        return False
+    return manifest.get('sources') == source_signature(sources)
+
+
+def _save_array(name: str, array: np.ndarray):
+    """배열 저장 (임시 파일 → rename, mmap 중인 기존 파일은 그대로 유지)"""
+    path = COLUMNS_DIR / f"{name}.npy"
+    tmp_path = COLUMNS_DIR / f"{name}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, np.ascontiguousarray(array))
+    os.replace(tmp_path, path)
+
+
+def _write_manifest(manifest: Dict[str, Any]):
+    """매니페스트 저장 (임시 파일 → rename)"""
+    tmp_path = COLUMNS_DIR / f"manifest.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def write_column_store(columns: Dict[str, np.ndarray],
+                       sources: List[Path],
+                       extra: Optional[Dict[str, Any]] = None):
+    """
+    컬럼 스토어 저장
+
+    Args:
+        columns: 컬럼명 → 배열 (object 배열 불가, 고정폭 타입만)
+        sources: 원본 parquet 경로 (신선도 확인용)
+        extra: 매니페스트에 함께 기록할 메타데이터
+    """
+    ensure_columns_dir()
+
+    for name, array in columns.items():
+        _save_array(name, array)
+
+    # 매니페스트는 마지막에 기록 (존재 = 모든 컬럼 저장 완료)
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'columns': {name: {'dtype': str(a.dtype), 'shape': list(a.shape)} for name, a in columns.items()},
+        'sources': source_signature(sources),
+    }
+    if extra:
+        manifest.update(extra)
+
+    _write_manifest(manifest)
+
+
+def update_columns(columns: Dict[str, np.ndarray], sources: List[Path],
+                   extra: Optional[Dict[str, Any]] = None):
+    """
+    일부 컬럼만 교체 (증분 갱신용)
+
+    기존 매니페스트를 유지하면서 교체한 컬럼 정보와 원본 시그니처(+ extra)만 갱신
+    """
+    manifest = read_manifest()
+    if manifest is None:
+        raise FileNotFoundError(f"컬럼 스토어가 없습니다: {COLUMNS_DIR}")
+
+    for name, array in columns.items():
+        _save_array(name, array)
+        manifest['columns'][name] = {'dtype': str(array.dtype), 'shape': list(array.shape)}
+    manifest['sources'] = source_signature(sources)
+    if extra:
+        manifest.update(extra)
+
+    _write_manifest(manifest)
+
+
+def open_column_store() -> Dict[str, np.ndarray]:
+    """컬럼 스토어를 읽기 전용 메모리 매핑으로 열기"""
+    manifest = read_manifest()
+    if manifest is None:
+        raise FileNotFoundError(f"컬럼 스토어가 없습니다: {COLUMNS_DIR}")
+    return {
+        name: np.load(COLUMNS_DIR / f"{name}.npy", mmap_mode='r')
+        for name in manifest['columns']
+    }
+
+
+def to_fixed_width(values: np.ndarray) -> np.ndarray:
+    """문자열 배열 → 고정폭 UTF-8 바이트 배열 (npy 저장용)"""
+    return np.char.encode(np.asarray(values, dtype=str), 'utf-8')
@@ -0,0 +1,150 @@
+"""
+TargetUP AI - Count Cube
+성별 × 출생연도 × 지역 × 피부타입 고객 수 큐브 (조건이 큐브 축만 쓰면 즉시 모수 응답)
+
+- 기본 큐브: 위 4개 축 × 최근 구매 개월 버킷
+- 카테고리 큐브: 카테고리별로 위 4개 축 (구매 기간 조건 없는 단일 카테고리용)
+"""
+from datetime import date
+from typing import Dict, List, Mapping, Optional
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+from . import bitmap
+from .filter_plan import FilterPlan, CODE_COLUMNS, to_day_number
+
+
+# 최근 구매 버킷 (0~N개월, 그보다 오래됐거나 미구매는 마지막 버킷)
+RECENCY_MONTHS = 36
+
+
+def _masked_sum(cube: np.ndarray, selections: List[np.ndarray]) -> int:
+    """축별 선택 마스크 적용 후 합계 (선택 비율이 작은 축부터 줄여 복사량 최소화)"""
+    order = sorted(range(len(selections)), key=lambda axis: selections[axis].mean())
+    for axis in order:
+        if not selections[axis].all():
+            cube = cube.compress(selections[axis], axis=axis)
+    return int(cube.sum(dtype=np.int64))
+
+
+class CountCube:
+    """
+    고객 수 큐브
+
+    축 순서: recency(누적합), gender_code, birth_year, region_code, skin_type_code
+    recency 버킷 r = cutoff[m] > last_order_day 인 m의 개수
+    (cutoff[m] = 기준일 - m개월) → '최근 N개월 구매'는 r ≤ N, '최근 N개월 미구매'는 r > N
+    """
+    AXES = ('gender_code', 'birth_year', 'region_code', 'skin_type_code')
+
+    def __init__(self,
+                 arrays: Mapping[str, np.ndarray],
+                 category_bitmaps: Mapping[str, np.ndarray],
+                 reference_date: Optional[date] = None):
+        n = len(arrays['birth_year'])
+        reference_date = reference_date or date.today()
+        self.reference_date = reference_date
+
+        # 코드 → 축 인덱스 (알 수 없는 코드는 마지막 칸)
+        self._code_index: Dict[str, np.ndarray] = {}
+        axis_indexes: List[np.ndarray] = []
+        self.shape: List[int] = []
+
+        for column in self.AXES:
+            values = arrays[column]
+            if column in CODE_COLUMNS:
+                size = len(CODE_COLUMNS[column][1]) + 1
+                lut = np.full(256, size - 1, dtype=np.int64)
+                lut[:size - 1] = np.arange(size - 1)
+                self._code_index[column] = lut
+                axis_indexes.append(lut[values])
+            else:
+                self.birth_year_min = int(values.min()) if n else 0
+                size = (int(values.max()) - self.birth_year_min + 1) if n else 1
+                axis_indexes.append(values.astype(np.int64) - self.birth_year_min)
+            self.shape.append(size)
+
+        # 최근 구매 버킷
+        self.recency_cutoffs = np.array(
+            [to_day_number(reference_date - relativedelta(months=m)) for m in range(RECENCY_MONTHS + 1)],
+            dtype=np.int64
+        )
+        ascending = self.recency_cutoffs[::-1]
+        recency = len(ascending) - np.searchsorted(ascending, arrays['last_order_day'], side='right')
+
+        cell = np.ravel_multi_index(axis_indexes, self.shape)
+        n_cells = int(np.prod(self.shape))
+
+        cube = np.bincount(
+            recency * n_cells + cell, minlength=(RECENCY_MONTHS + 2) * n_cells
+        ).reshape([RECENCY_MONTHS + 2] + self.shape)
+        # recency 축(맨 앞) 누적합 → 버킷 구간 [lo, hi) 합 = cube[hi] - cube[lo]
+        self.cube = np.concatenate(
+            [np.zeros([1] + self.shape, dtype=np.int64), np.cumsum(cube, axis=0)]
+        ).astype(np.int32)
+
+        self.category_cubes = {
+            category: np.bincount(
+                cell[bitmap.to_mask(b, n)], minlength=n_cells
+            ).astype(np.int32).reshape(self.shape)
+            for category, b in category_bitmaps.items()
+        }
+
+    def count(self, plan: FilterPlan) -> Optional[int]:
+        """
+        큐브로 계산 가능한 계획이면 모수, 아니면 None
+
+        불가: 카테고리별 구매 기간 조건, 카테고리 2개 이상,
+              카테고리 + 구매 기간 조건, 기준일과 맞지 않는 구매 기간
+        """
+        if plan.windows or len(set(plan.categories)) > 1:
+            return None
+
+        selections = [np.ones(size, dtype=bool) for size in self.shape]
+        recency = np.ones(RECENCY_MONTHS + 2, dtype=bool)
+        buckets = np.arange(RECENCY_MONTHS + 2)
+        uses_recency = False
+
+        for p in plan.predicates:
+            if p.column in self._code_index:
+                axis = self.AXES.index(p.column)
+                codes = np.zeros(256, dtype=bool)
+                codes[list(p.value)] = True
+                selected = np.zeros(self.shape[axis], dtype=bool)
+                selected[self._code_index[p.column][codes]] = True
+                selections[axis] &= selected
+            elif p.column == 'birth_year':
+                years = np.arange(self.shape[1]) + self.birth_year_min
+                selections[1] &= (years >= p.value) if p.op == 'ge' else (years <= p.value)
+            elif p.column == 'last_order_day':
+                matches = np.flatnonzero(self.recency_cutoffs == p.value)
+                if len(matches) == 0:
+                    return None
+                m = int(matches[0])
+                recency &= (buckets <= m) if p.op == 'ge' else (buckets > m)
+                uses_recency = True
+            else:
+                return None
+
+        if plan.categories:
+            if uses_recency:
+                return None
+            cube = self.category_cubes.get(plan.categories[0])
+            if cube is None:
+                return 0
+            return _masked_sum(cube, selections)
+
+        # 최근 구매 조건은 항상 연속 구간 (r ≤ N 과 r > M의 교집합)
+        buckets = np.flatnonzero(recency)
+        if len(buckets) == 0:
+            return 0
+        in_window = self.cube[buckets[-1] + 1] - self.cube[buckets[0]]
+        return _masked_sum(in_window, selections)
+
+    def stats(self) -> Dict[str, int]:
+        """큐브 크기 (진단용)"""
+        return {
+            'cells': int(self.cube[1:].size),
+            'category_cells': sum(int(c.size) for c in self.category_cubes.values()),
+            'bytes': int(self.cube.nbytes + sum(c.nbytes for c in self.category_cubes.values())),
+        }
@@ -3,14 +3,22 @@ TargetUP AI - Data Store
 고객 50만명 + 구매 200만건 데이터 생성 및 로드
 """
 import os
-import hashlib
-from datetime import datetime, timedelta, date
-from typing import Tuple, Optional, Set
+import json
+import shutil
+import threading
+from datetime import datetime
+from typing import Tuple, Optional, Dict, List, Any
 import pandas as pd
 import numpy as np
+import pyarrow.parquet as pq
 from pathlib import Path
 
 from .models import CATEGORIES, REGIONS, SKIN_TYPES, GRADES, STAGES, CONCERNS
+from . import bitmap
+from .filter_plan import build_customer_arrays, build_event_index, merge_event_index
+from . import column_store
+from .approx_count import StratifiedSample
+from .count_cube import CountCube
 
 # 데이터 저장 경로
 DATA_DIR = Path(__file__).parent.parent / "data"
@@ -25,59 +33,55 @@ def ensure_data_dir():
     DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def generate_customers(n: int = 500_000, seed: int = 42) -> pd.DataFrame:
-    """고객 데이터 생성"""
+def generate_customers(n: int = 500_000, seed: int = 42, scale: float = 1.0) -> pd.DataFrame:
+    """
+    고객 데이터 생성 (전체 배열 연산)
+    
+    Args:
+        n: 기준 고객 수
+        seed: 난수 시드
+        scale: 규모 배수 (1 → 50만, 10 → 500만, 100 → 5,000만)
+    """
+    n = int(n * scale)
     print(f"고객 {n:,}명 데이터 생성 중...")
-    np.random.seed(seed)
+    rng = np.random.default_rng(seed)
     
     # 기준일
-    today = datetime.now().date()
+    today = np.datetime64(datetime.now().date(), 'D')
     
     # 고객 ID
-    customer_ids = [f"C{str(i).zfill(7)}" for i in range(1, n + 1)]
+    customer_ids = _format_ids('C', np.arange(1, n + 1), 7)
     
     # 성별 (여성 70%, 남성 30% - 화장품 특성)
-    genders = np.random.choice(['F', 'M'], n, p=[0.7, 0.3])
+    genders = rng.choice(np.array(['F', 'M'], dtype=object), n, p=[0.7, 0.3])
     
     # 출생연도 (1960~2006, 20대~60대 분포)
-    birth_years = np.random.choice(
-        range(1960, 2007),
-        n,
-        p=_age_distribution()
-    )
+    birth_years = rng.choice(np.arange(1960, 2007), n, p=_age_distribution())
     
     # 지역 (서울/경기 비중 높게)
     region_weights = [0.25, 0.25, 0.08, 0.08, 0.05, 0.04, 0.04, 0.03, 0.01,
                       0.03, 0.02, 0.02, 0.02, 0.02, 0.02, 0.02, 0.02]
-    regions = np.random.choice(REGIONS, n, p=region_weights)
+    regions = rng.choice(np.array(REGIONS, dtype=object), n, p=region_weights)
     
     # 피부타입
-    skin_types = np.random.choice(SKIN_TYPES, n, p=[0.25, 0.25, 0.25, 0.15, 0.10])
+    skin_types = rng.choice(np.array(SKIN_TYPES, dtype=object), n, p=[0.25, 0.25, 0.25, 0.15, 0.10])
     
     # 가입일 (최근 5년)
-    joined_days_ago = np.random.randint(0, 365 * 5, n)
-    joined_at = [today - timedelta(days=int(d)) for d in joined_days_ago]
-    
-    # 마지막 주문일 (가입일 이후, 일부는 None - 미구매)
-    last_order_at = []
-    for i in range(n):
-        if np.random.random() < 0.05:  # 5%는 미구매
-            last_order_at.append(None)
-        else:
-            max_days = joined_days_ago[i]
-            if max_days > 0:
-                days_ago = np.random.randint(0, max_days)
-                last_order_at.append(today - timedelta(days=int(days_ago)))
-            else:
-                last_order_at.append(today)
+    joined_days_ago = rng.integers(0, 365 * 5, n)
+    joined_at = (today - joined_days_ago).astype('datetime64[ns]')
+    
+    # 마지막 주문일 (가입일 이후, 5%는 미구매 → NaT, 당일 가입자는 오늘)
+    order_days_ago = (rng.random(n) * joined_days_ago).astype(np.int64)
+    last_order_at = (today - order_days_ago).astype('datetime64[ns]')
+    last_order_at[rng.random(n) < 0.05] = np.datetime64('NaT')
     
     # 구매 빈도, 금액, 등급
-    frequencies = np.random.poisson(5, n) + 1
-    monetaries = np.random.lognormal(10, 1, n).astype(int)
-    grades = np.random.choice(GRADES, n, p=[0.05, 0.15, 0.25, 0.30, 0.25])
+    frequencies = rng.poisson(5, n) + 1
+    monetaries = rng.lognormal(10, 1, n).astype(np.int64)
+    grades = rng.choice(np.array(GRADES, dtype=object), n, p=[0.05, 0.15, 0.25, 0.30, 0.25])
     
-    # 이름 생성 (간단한 해시 기반)
-    names = [f"고객{hashlib.md5(cid.encode()).hexdigest()[:6]}" for cid in customer_ids]
+    # 이름 생성 (인덱스 곱셈 해시 기반 6자리 hex)
+    names = _format_names(np.arange(1, n + 1))
     
     df = pd.DataFrame({
         'customer_id': customer_ids,
@@ -93,14 +97,20 @@ def generate_customers(n: int = 500_000, seed: int = 42) -> pd.DataFrame:
         'grade': grades
     })
     
-    # 타입 변환
-    df['joined_at'] = pd.to_datetime(df['joined_at'])
-    df['last_order_at'] = pd.to_datetime(df['last_order_at'])
-    
     print(f"고객 데이터 생성 완료: {len(df):,}명")
     return df
 
 
+def _format_names(numbers: np.ndarray) -> np.ndarray:
+    """정수 배열 → '고객1a2b3c' 형식 이름 (Knuth 곱셈 해시, 결정적)"""
+    hashed = (np.asarray(numbers, dtype=np.uint64) * np.uint64(2654435761)) & np.uint64(0xFFFFFF)
+    shifts = np.arange(20, -1, -4, dtype=np.uint64)
+    nibbles = (hashed[:, None] >> shifts) & np.uint64(0xF)
+    hex_chars = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)[nibbles.astype(np.intp)]
+    suffix = np.ascontiguousarray(hex_chars).view('S6').ravel().astype('U6')
+    return np.char.add('고객', suffix).astype(object)
+
+
 def _age_distribution() -> list:
     """연령 분포 (20대 > 30대 > 40대 > 기타)"""
     years = list(range(1960, 2007))
@@ -124,17 +134,22 @@ def _age_distribution() -> list:
 def generate_purchases(customers_df: pd.DataFrame, 
                        min_purchases: int = 2_000_000,
                        seed: int = 42) -> pd.DataFrame:
-    """구매 데이터 생성"""
+    """
+    구매 데이터 생성 (전체 배열 연산)
+    
+    고객 인덱스를 구매 횟수만큼 반복한 뒤 구매일/카테고리/제품/금액을
+    한 번에 샘플링하여 컬럼을 직접 구성 (행 단위 파이썬 루프 없음)
+    """
     print(f"구매 데이터 {min_purchases:,}건 이상 생성 중...")
-    np.random.seed(seed)
+    rng = np.random.default_rng(seed)
     
-    today = datetime.now().date()
-    customer_ids = customers_df['customer_id'].values
-    joined_dates = customers_df['joined_at'].values
+    today = np.datetime64(datetime.now().date(), 'D')
+    customer_ids = customers_df['customer_id'].to_numpy()
+    joined_dates = customers_df['joined_at'].to_numpy().astype('datetime64[D]')
     
     # 고객별 구매 횟수 (1~20회, 평균 4회)
     n_customers = len(customer_ids)
-    purchases_per_customer = np.random.geometric(0.25, n_customers)
+    purchases_per_customer = rng.geometric(0.25, n_customers)
     purchases_per_customer = np.clip(purchases_per_customer, 1, 20)
     
     # 최소 구매 건수 보장
@@ -144,58 +159,60 @@ def generate_purchases(customers_df: pd.DataFrame,
         purchases_per_customer = (purchases_per_customer * scale_factor).astype(int)
         purchases_per_customer = np.clip(purchases_per_customer, 1, 50)
     
-    # 구매 데이터 생성
-    records = []
-    purchase_id = 1
+    # 구매 1건당 고객 인덱스
+    customer_idx = np.repeat(np.arange(n_customers), purchases_per_customer)
+    n = len(customer_idx)
+    
+    # 구매일: 가입일 ~ 오늘 사이 균등 (가입 당일 고객은 1일로 보정)
+    days_since_joined = (today - joined_dates).astype(np.int64)
+    days_since_joined = np.maximum(days_since_joined, 1)
+    days_ago = (rng.random(n) * (days_since_joined[customer_idx] + 1)).astype(np.int64)
+    purchased_at = (today - days_ago).astype('datetime64[ns]')
+    
+    # 카테고리 (STAGES 80%, CONCERNS 20%, 그룹 내 균등)
+    is_stage = rng.random(n) < 0.8
+    category_codes = np.where(
+        is_stage,
+        rng.integers(0, len(STAGES), n),
+        len(STAGES) + rng.integers(0, len(CONCERNS), n)
+    )
     
-    # 제품 목록 (카테고리별)
+    # 제품 (카테고리별 제품 목록에서 균등)
     products_by_category = _generate_products()
+    product_lists = [products_by_category.get(cat, ['기본제품']) for cat in CATEGORIES]
+    product_counts = np.array([len(p) for p in product_lists])
+    product_offsets = np.concatenate([[0], np.cumsum(product_counts)[:-1]])
+    product_table = np.array([p for plist in product_lists for p in plist], dtype=object)
+    product_idx = (rng.random(n) * product_counts[category_codes]).astype(np.int64)
+    products = product_table[product_offsets[category_codes] + product_idx]
     
-    for i, (cid, joined, n_purch) in enumerate(zip(customer_ids, joined_dates, purchases_per_customer)):
-        if i % 100000 == 0:
-            print(f"  {i:,}/{n_customers:,} 고객 처리 중...")
-        
-        # 가입일 이후 구매
-        joined_date = pd.to_datetime(joined).date()
-        days_since_joined = (today - joined_date).days
-        
-        if days_since_joined <= 0:
-            days_since_joined = 1
-        
-        for _ in range(int(n_purch)):
-            # 구매일
-            days_ago = np.random.randint(0, days_since_joined + 1)
-            purchased_at = today - timedelta(days=days_ago)
-            
-            # 카테고리 (STAGES 위주, CONCERNS도 가끔)
-            if np.random.random() < 0.8:
-                category = np.random.choice(STAGES)
-            else:
-                category = np.random.choice(CONCERNS)
-            
-            # 제품
-            product = np.random.choice(products_by_category.get(category, ['기본제품']))
-            
-            # 금액
-            amount = int(np.random.lognormal(9.5, 0.5))  # 평균 ~15,000원
-            
-            records.append({
-                'purchase_id': f"P{str(purchase_id).zfill(9)}",
-                'customer_id': cid,
-                'purchased_at': purchased_at,
-                'category': category,
-                'product': product,
-                'amount': amount
-            })
-            purchase_id += 1
-    
-    df = pd.DataFrame(records)
-    df['purchased_at'] = pd.to_datetime(df['purchased_at'])
+    # 금액 (평균 ~15,000원)
+    amounts = rng.lognormal(9.5, 0.5, n).astype(np.int64)
+    
+    df = pd.DataFrame({
+        'purchase_id': _format_ids('P', np.arange(1, n + 1), 9),
+        'customer_id': customer_ids[customer_idx],
+        'purchased_at': purchased_at,
+        'category': np.array(CATEGORIES, dtype=object)[category_codes],
+        'product': products,
+        'amount': amounts
+    })
     
     print(f"구매 데이터 생성 완료: {len(df):,}건")
     return df
 
 
+def _format_ids(prefix: str, numbers: np.ndarray, width: int) -> np.ndarray:
+    """정수 배열 → 'P000000001' 형식 ID 배열 (자릿수 연산으로 벡터화)"""
+    numbers = np.asarray(numbers, dtype=np.int64)
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    digits = (numbers[:, None] // powers) % 10 + ord('0')
+    chars = np.empty((len(numbers), width + len(prefix)), dtype=np.uint8)
+    chars[:, :len(prefix)] = np.frombuffer(prefix.encode('ascii'), dtype=np.uint8)
+    chars[:, len(prefix):] = digits
+    return chars.view(f'S{width + len(prefix)}').ravel().astype(f'U{width + len(prefix)}').astype(object)
+
+
 def _generate_products() -> dict:
     """카테고리별 제품 목록 생성"""
     products = {
@@ -227,11 +244,10 @@ def build_customer_stats(customers_df: pd.DataFrame,
     """고객별 구매 통계 마트 생성"""
     print("고객 통계 마트 생성 중...")
     
-    # 마지막 주문 정보
-    last_orders = purchases_df.groupby('customer_id').agg({
-        'purchased_at': 'max',
-        'amount': 'last'
-    }).reset_index()
+    # 마지막 주문 정보 (구매일이 가장 늦은 행의 금액, 같은 날짜면 나중 행 - 증분 반영과 같은 기준)
+    last_orders = (purchases_df[['customer_id', 'purchased_at', 'amount']]
+                   .sort_values('purchased_at', kind='stable')
+                   .drop_duplicates('customer_id', keep='last'))
     last_orders.columns = ['customer_id', 'last_order_at', 'last_order_amount']
     
     # 전체 고객과 조인
@@ -253,22 +269,36 @@ def build_customer_categories(purchases_df: pd.DataFrame) -> pd.DataFrame:
     return cat_history
 
 
-def load_or_generate_data(force_regenerate: bool = False) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+def data_files_exist() -> bool:
+    """parquet 원본/마트 파일이 모두 존재하는지"""
+    return all([
+        CUSTOMERS_PATH.exists(),
+        PURCHASES_PATH.exists(),
+        CUSTOMER_STATS_PATH.exists(),
+        CUSTOMER_CATEGORIES_PATH.exists()
+    ])
+
+
+def get_data_scale() -> float:
+    """데이터 규모 배수 (DATA_SCALE 환경변수, 기본 1 = 고객 50만)"""
+    return float(os.getenv('DATA_SCALE', '1'))
+
+
+def load_or_generate_data(force_regenerate: bool = False,
+                          scale: Optional[float] = None) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """
     데이터 로드 또는 생성
+    
+    Args:
+        force_regenerate: 기존 파일 무시하고 재생성
+        scale: 생성 규모 배수 (None이면 DATA_SCALE 환경변수)
+    
     Returns: (customers_df, purchases_df, customer_stats_df, customer_categories_df)
     """
     ensure_data_dir()
     
     # 모든 파일이 존재하고 재생성 플래그가 없으면 로드
-    all_exists = all([
-        CUSTOMERS_PATH.exists(),
-        PURCHASES_PATH.exists(),
-        CUSTOMER_STATS_PATH.exists(),
-        CUSTOMER_CATEGORIES_PATH.exists()
-    ])
-    
-    if all_exists and not force_regenerate:
+    if data_files_exist() and not force_regenerate:
         print("기존 데이터 로드 중...")
         customers_df = pd.read_parquet(CUSTOMERS_PATH)
         purchases_df = pd.read_parquet(PURCHASES_PATH)
@@ -282,8 +312,17 @@ def load_or_generate_data(force_regenerate: bool = False) -> Tuple[pd.DataFrame,
     print("데이터 생성을 시작합니다. 수 분 소요될 수 있습니다...")
     print("="*50)
     
-    customers_df = generate_customers()
-    purchases_df = generate_purchases(customers_df)
+    if scale is None:
+        scale = get_data_scale()
+    
+    # 이전 증분 배치/워터마크는 새 데이터와 무관하므로 정리
+    if PURCHASE_BATCHES_DIR.exists():
+        shutil.rmtree(PURCHASE_BATCHES_DIR)
+    if WATERMARK_PATH.exists():
+        os.remove(WATERMARK_PATH)
+    
+    customers_df = generate_customers(scale=scale)
+    purchases_df = generate_purchases(customers_df, min_purchases=int(2_000_000 * scale))
     customer_stats_df = build_customer_stats(customers_df, purchases_df)
     customer_categories_df = build_customer_categories(purchases_df)
     
@@ -303,48 +342,476 @@ def load_or_generate_data(force_regenerate: bool = False) -> Tuple[pd.DataFrame,
     return customers_df, purchases_df, customer_stats_df, customer_categories_df
 
 
-def get_category_customers(customer_categories_df: pd.DataFrame, 
-                           category: str) -> Set[str]:
-    """특정 카테고리 구매 이력이 있는 고객 ID 집합"""
-    mask = customer_categories_df['category'] == category
-    return set(customer_categories_df.loc[mask, 'customer_id'].values)
+def build_category_bitmaps(customers_df: pd.DataFrame,
+                           customer_categories_df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    카테고리별 구매 고객 비트맵 생성
+    
+    비트 위치 = customers_df 행 위치 (문자열 ID 집합 대신 packed uint8 배열)
+    """
+    positions = pd.Index(customers_df['customer_id']).get_indexer(
+        customer_categories_df['customer_id']
+    )
+    codes = pd.Categorical(
+        customer_categories_df['category'], categories=CATEGORIES
+    ).codes.astype(np.int64)
+    bitmaps = bitmap.build_index(positions, codes, len(CATEGORIES), len(customers_df))
+    return dict(zip(CATEGORIES, bitmaps))
+
+
+def build_purchase_events(customers_df: pd.DataFrame,
+                          purchases_df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """구매 테이블 → (카테고리, 구매일) 정렬 이벤트 인덱스"""
+    keys = pd.Index(customers_df['customer_id']).get_indexer(purchases_df['customer_id'])
+    codes = pd.Categorical(purchases_df['category'], categories=CATEGORIES).codes.astype(np.int64)
+    days = purchases_df['purchased_at'].to_numpy().astype('datetime64[D]').astype(np.int64)
+    return build_event_index(keys, codes, days, len(CATEGORIES))
+
+
+def build_column_store(customers_df: pd.DataFrame,
+                       customer_categories_df: pd.DataFrame,
+                       purchases_df: pd.DataFrame):
+    """
+    parquet → 메모리 매핑용 컬럼 스토어
+    
+    필터 배열 + 카테고리 비트맵 + customer_id + 구매 이벤트 인덱스
+    """
+    print("컬럼 스토어 생성 중...")
+    columns = dict(build_customer_arrays(customers_df))
+    columns.update(build_purchase_events(customers_df, purchases_df))
+    
+    category_bitmaps = build_category_bitmaps(customers_df, customer_categories_df)
+    columns['category_bitmaps'] = np.stack([category_bitmaps[cat] for cat in CATEGORIES])
+    columns['customer_id'] = column_store.to_fixed_width(customers_df['customer_id'].to_numpy())
+    
+    # 이벤트 인덱스는 원본 + 워터마크까지 반영된 배치 기준
+    column_store.write_column_store(
+        columns,
+        sources=COLUMN_STORE_SOURCES,
+        extra={'n_customers': len(customers_df), 'categories': CATEGORIES,
+               'batch_seq': read_watermark()['batch_seq']}
+    )
+    print(f"컬럼 스토어 완료: {column_store.COLUMNS_DIR}")
+
+
+# 컬럼 스토어 신선도 확인 대상
+COLUMN_STORE_SOURCES = [CUSTOMERS_PATH, CUSTOMER_CATEGORIES_PATH, PURCHASES_PATH]
+
+# 구매 이벤트 인덱스 컬럼
+EVENT_COLUMNS = ['event_keys', 'event_days', 'event_offsets']
+
+# 증분 구매 배치 / 워터마크
+PURCHASE_BATCHES_DIR = DATA_DIR / "purchase_batches"
+WATERMARK_PATH = DATA_DIR / "watermark.json"
+PURCHASE_COLUMNS = ['purchase_id', 'customer_id', 'purchased_at', 'category', 'product', 'amount']
+
+# 지연 로드 테이블
+TABLE_PATHS = {
+    'customers': CUSTOMERS_PATH,
+    'purchases': PURCHASES_PATH,
+    'customer_stats': CUSTOMER_STATS_PATH,
+    'customer_categories': CUSTOMER_CATEGORIES_PATH,
+}
+
+# category dtype으로 로드할 저카디널리티 문자열 컬럼
+CATEGORICAL_COLUMNS = {'gender', 'region', 'skin_type', 'grade', 'category', 'product'}
+
+
+def read_watermark() -> Dict[str, Any]:
+    """증분 갱신 워터마크 (마지막으로 반영한 배치 번호 등)"""
+    if not WATERMARK_PATH.exists():
+        return {'batch_seq': 0}
+    with open(WATERMARK_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_watermark(watermark: Dict[str, Any]):
+    """워터마크 저장 (임시 파일 → rename)"""
+    tmp_path = WATERMARK_PATH.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(watermark, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, WATERMARK_PATH)
+
+
+def _batch_seq(path: Path) -> int:
+    """batch_00000012.parquet → 12"""
+    return int(path.stem.split('_')[1])
+
+
+def list_purchase_batches() -> List[Path]:
+    """저장된 구매 배치 파일 (번호순)"""
+    if not PURCHASE_BATCHES_DIR.exists():
+        return []
+    return sorted(PURCHASE_BATCHES_DIR.glob('batch_*.parquet'), key=_batch_seq)
+
+
+def applied_purchase_batches() -> List[Path]:
+    """워터마크까지 마트에 반영된 배치"""
+    applied = read_watermark()['batch_seq']
+    return [p for p in list_purchase_batches() if _batch_seq(p) <= applied]
+
+
+def pending_purchase_batches() -> List[Path]:
+    """워터마크 이후 아직 마트에 반영되지 않은 배치"""
+    applied = read_watermark()['batch_seq']
+    return [p for p in list_purchase_batches() if _batch_seq(p) > applied]
+
+
+def stage_purchase_batch(batch_df: pd.DataFrame) -> Path:
+    """구매 배치를 배치 디렉토리에 저장 (마트 반영 전 내구성 확보)"""
+    missing = [c for c in PURCHASE_COLUMNS if c not in batch_df.columns]
+    if missing:
+        raise ValueError(f"구매 배치에 필요한 컬럼이 없습니다: {missing}")
+    
+    PURCHASE_BATCHES_DIR.mkdir(parents=True, exist_ok=True)
+    batches = list_purchase_batches()
+    seq = max(read_watermark()['batch_seq'], _batch_seq(batches[-1]) if batches else 0) + 1
+    
+    batch_df = batch_df[PURCHASE_COLUMNS].copy()
+    batch_df['purchased_at'] = pd.to_datetime(batch_df['purchased_at'])
+    
+    path = PURCHASE_BATCHES_DIR / f"batch_{seq:08d}.parquet"
+    tmp_path = path.with_suffix('.tmp')
+    batch_df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _apply_purchase_batch(batch_df: pd.DataFrame, seq: int):
+    """
+    구매 배치 1건(seq번)을 마트/컬럼 스토어에 반영
+    
+    반영 도중 중단되면 재시작 시 같은 배치를 다시 반영하므로 재적용해도 결과가 같게:
+    - 최근 구매일/금액, last_order_day, 카테고리 비트: max/합집합 갱신
+    - customer_categories: 이미 있는 고객-카테고리 쌍은 추가하지 않음
+    - 이벤트 인덱스: 컬럼 스토어 매니페스트의 batch_seq가 이 배치 이상이면 병합 생략
+      (이벤트와 batch_seq는 같은 매니페스트 기록으로 함께 반영됨)
+    """
+    customers_df = pd.read_parquet(CUSTOMERS_PATH)
+    id_index = pd.Index(customers_df['customer_id'])
+    
+    keys = id_index.get_indexer(batch_df['customer_id'])
+    unknown = int((keys < 0).sum())
+    if unknown:
+        print(f"  알 수 없는 고객 구매 {unknown:,}건은 마트 반영에서 제외")
+    batch_df = batch_df.assign(_key=keys)[keys >= 0]
+    if len(batch_df) == 0:
+        return
+    
+    # 고객별 배치 내 마지막 구매 (구매일, 금액)
+    latest = (batch_df.sort_values('purchased_at', kind='stable')
+              .drop_duplicates('_key', keep='last'))
+    latest_keys = latest['_key'].to_numpy()
+    latest_at = latest['purchased_at'].to_numpy().astype('datetime64[ns]')
+    
+    # 1. customers.last_order_at
+    last_order = customers_df['last_order_at'].to_numpy().copy()
+    current = last_order[latest_keys]
+    newer = np.isnat(current) | (latest_at > current)
+    last_order[latest_keys[newer]] = latest_at[newer]
+    customers_df['last_order_at'] = last_order
+    
+    # 2. customer_stats (last_order_at, last_order_amount)
+    stats_df = pd.read_parquet(CUSTOMER_STATS_PATH)
+    stat_rows = pd.Index(stats_df['customer_id']).get_indexer(latest['customer_id'])
+    stats_at = stats_df['last_order_at'].to_numpy().copy()
+    stats_amount = stats_df['last_order_amount'].to_numpy(dtype=float).copy()
+    current = stats_at[stat_rows]
+    # 같은 구매일이면 나중 배치 금액 (전체 재생성의 파일 순서 기준과 동일)
+    newer = (stat_rows >= 0) & (np.isnat(current) | (latest_at >= current))
+    stats_at[stat_rows[newer]] = latest_at[newer]
+    stats_amount[stat_rows[newer]] = latest['amount'].to_numpy()[newer]
+    stats_df['last_order_at'] = stats_at
+    stats_df['last_order_amount'] = stats_amount
+    
+    # 3. customer_categories (마트에 없는 고객-카테고리 쌍만 추가)
+    #    비트맵은 중단 시 parquet보다 늦게 갱신될 수 있으므로 마트 자체와 비교
+    store = column_store.open_column_store()
+    category_bitmaps = np.array(store['category_bitmaps'])
+    pairs = batch_df[['customer_id', 'category', '_key']].drop_duplicates(['_key', 'category'])
+    codes = pd.Categorical(pairs['category'], categories=CATEGORIES).codes.astype(np.int64)
+    pair_keys = pairs['_key'].to_numpy()
+    known = codes >= 0
+    
+    categories_df = pd.read_parquet(CUSTOMER_CATEGORIES_PATH)
+    existing = pd.MultiIndex.from_arrays(
+        [categories_df['customer_id'].astype(str), categories_df['category'].astype(str)]
+    )
+    candidates = pd.MultiIndex.from_arrays(
+        [pairs['customer_id'].astype(str), pairs['category'].astype(str)]
+    )
+    new_pairs = pairs[~candidates.isin(existing)]
+    if len(new_pairs):
+        categories_df = pd.concat(
+            [categories_df, new_pairs[['customer_id', 'category']]], ignore_index=True
+        )
+    
+    # 4. 컬럼 스토어 (last_order_day 최대값, 카테고리 비트 세팅)
+    last_order_day = np.array(store['last_order_day'])
+    days = latest_at.astype('datetime64[D]').astype(np.int64).astype(np.int32)
+    np.maximum.at(last_order_day, latest_keys, days)
+    for code in np.unique(codes[known]):
+        bitmap.set_positions(category_bitmaps[code], pair_keys[known & (codes == code)])
+    
+    # 5. 구매 이벤트 인덱스 병합 (이미 병합된 배치면 생략)
+    events = {}
+    if column_store.read_manifest().get('batch_seq', 0) < seq:
+        events = merge_event_index(
+            {name: store[name] for name in EVENT_COLUMNS},
+            batch_df['_key'].to_numpy(),
+            pd.Categorical(batch_df['category'], categories=CATEGORIES).codes.astype(np.int64),
+            batch_df['purchased_at'].to_numpy().astype('datetime64[D]').astype(np.int64),
+        )
+    
+    # parquet 저장 후 컬럼 스토어 갱신 (원본 시그니처도 함께 갱신)
+    customers_df.to_parquet(CUSTOMERS_PATH, index=False)
+    stats_df.to_parquet(CUSTOMER_STATS_PATH, index=False)
+    categories_df.to_parquet(CUSTOMER_CATEGORIES_PATH, index=False)
+    column_store.update_columns(
+        {'last_order_day': last_order_day, 'category_bitmaps': category_bitmaps, **events},
+        sources=COLUMN_STORE_SOURCES,
+        extra={'batch_seq': seq}
+    )
+
+
+def refresh_marts() -> int:
+    """
+    워터마크 이후 배치를 순서대로 마트에 반영
+    
+    배치마다 반영 후 워터마크를 기록하므로 재시작 시 남은 배치부터 이어서 처리
+    Returns: 반영한 배치 수
+    """
+    pending = pending_purchase_batches()
+    for path in pending:
+        batch_df = pd.read_parquet(path)
+        print(f"구매 배치 반영 중: {path.name} ({len(batch_df):,}건)")
+        _apply_purchase_batch(batch_df, _batch_seq(path))
+        
+        watermark = read_watermark()
+        max_at = batch_df['purchased_at'].max() if len(batch_df) else None
+        prev_at = watermark.get('max_purchased_at')
+        if max_at is not None and (prev_at is None or max_at.isoformat() > prev_at):
+            watermark['max_purchased_at'] = max_at.isoformat()
+        watermark['batch_seq'] = _batch_seq(path)
+        watermark['updated_at'] = datetime.now().isoformat()
+        _write_watermark(watermark)
+    return len(pending)
+
+
+def append_purchases(batch_df: pd.DataFrame) -> int:
+    """
+    신규 구매 배치 추가 + 마트 증분 갱신
+    
+    전체 재생성 없이 last_order_at/last_order_amount와 카테고리 비트맵만 갱신
+    Returns: 반영한 배치 수
+    """
+    stage_purchase_batch(batch_df)
+    return refresh_marts()
 
 
 class DataCache:
-    """싱글톤 데이터 캐시"""
+    """
+    싱글톤 데이터 캐시
+    
+    타겟팅 핫패스(필터 배열, 카테고리 비트맵, customer_id)는 메모리 매핑된
+    컬럼 스토어에서 바로 열고, DataFrame 컬럼은 처음 접근할 때 parquet에서
+    필요한 컬럼만 로드
+    """
     _instance = None
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._instance._loaded = False
+            cls._instance._version = 0
+            cls._instance._frames = {}
+            cls._instance._sample = None
+            cls._instance._lock = threading.Lock()
         return cls._instance
     
     def load(self, force: bool = False):
         if not self._loaded or force:
-            (self.customers, 
-             self.purchases, 
-             self.customer_stats, 
-             self.customer_categories) = load_or_generate_data(force)
+            with self._lock:
+                self._frames = {}
+                self._sample = None
             
-            # 카테고리별 고객 집합 캐시
-            self._category_customers_cache = {}
-            for cat in CATEGORIES:
-                self._category_customers_cache[cat] = get_category_customers(
-                    self.customer_categories, cat
+            # 원본이 없거나 재생성 요청 시 생성, 컬럼 스토어가 오래됐으면 재빌드
+            if force or not data_files_exist():
+                customers_df, purchases_df, _, customer_categories_df = load_or_generate_data(force)
+                build_column_store(customers_df, customer_categories_df, purchases_df)
+            elif not column_store.is_fresh(COLUMN_STORE_SOURCES):
+                customers_df = pd.read_parquet(CUSTOMERS_PATH)
+                customer_categories_df = pd.read_parquet(CUSTOMER_CATEGORIES_PATH)
+                # 이벤트 인덱스는 원본 + 반영 완료 배치 기준 (미반영 배치는 아래에서 반영)
+                event_columns = ['customer_id', 'category', 'purchased_at']
+                purchases_df = pd.concat(
+                    [pd.read_parquet(PURCHASES_PATH, columns=event_columns)] +
+                    [pd.read_parquet(p, columns=event_columns) for p in applied_purchase_batches()],
+                    ignore_index=True
                 )
+                build_column_store(customers_df, customer_categories_df, purchases_df)
+            
+            # 재시작 전 반영되지 않은 구매 배치 이어서 반영
+            if pending_purchase_batches():
+                refresh_marts()
+            
+            store = column_store.open_column_store()
+            
+            # 카테고리별 고객 비트맵 (mmap 2차원 배열의 행)
+            self._category_bitmaps = dict(zip(CATEGORIES, store.pop('category_bitmaps')))
             
+            # 고객 키 → customer_id (고정폭 바이트)
+            self._customer_ids = store.pop('customer_id')
+            self._id_index = None
+            
+            # 구매 이벤트 인덱스 ((카테고리, 구매일) 정렬)
+            self.event_index = {name: store.pop(name) for name in EVENT_COLUMNS}
+            
+            # 필터용 타입 배열 (uint8 코드, int16 출생연도, int32 일수)
+            self.arrays = store
+            
+            # 성별 × 출생연도 × 지역 × 피부타입 (× 최근 구매 / 카테고리) 고객 수 큐브
+            self.count_cube = CountCube(self.arrays, self._category_bitmaps)
+            
+            self._version += 1
             self._loaded = True
     
-    def get_category_customers(self, category: str) -> Set[str]:
-        """캐시된 카테고리별 고객 집합 반환"""
+    def get_columns(self, table: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        테이블 컬럼 지연 로드 (parquet 컬럼 프로젝션)
+        
+        처음 요청된 컬럼만 parquet에서 읽어 캐시하고, 저카디널리티 문자열은
+        category dtype으로 변환
+        
+        Args:
+            table: 'customers', 'purchases', 'customer_stats', 'customer_categories'
+            columns: 필요한 컬럼 (None이면 전체)
+        """
+        if not self._loaded:
+            self.load()
+        
+        path = TABLE_PATHS[table]
+        if columns is None:
+            columns = self._table_schema(table)
+        
+        with self._lock:
+            frame = self._frames.get(table)
+            loaded = [] if frame is None else list(frame.columns)
+            missing = [c for c in columns if c not in loaded]
+            
+            if missing:
+                new_cols = pd.read_parquet(path, columns=missing)
+                if table == 'purchases':
+                    # 증분 배치 포함
+                    batches = [pd.read_parquet(p, columns=missing) for p in list_purchase_batches()]
+                    new_cols = pd.concat([new_cols] + batches, ignore_index=True)
+                for col in missing:
+                    if col in CATEGORICAL_COLUMNS:
+                        new_cols[col] = new_cols[col].astype('category')
+                frame = new_cols if frame is None else pd.concat([frame, new_cols], axis=1)
+                self._frames[table] = frame
+        
+        return frame[list(columns)]
+    
+    def _table_schema(self, table: str) -> List[str]:
+        """parquet 스키마의 컬럼 목록"""
+        return pq.read_schema(TABLE_PATHS[table]).names
+    
+    def loaded_columns(self) -> Dict[str, List[str]]:
+        """현재 메모리에 로드된 테이블별 컬럼 (진단용)"""
+        with self._lock:
+            return {table: list(frame.columns) for table, frame in self._frames.items()}
+    
+    @property
+    def customers(self) -> pd.DataFrame:
+        return self.get_columns('customers')
+    
+    @property
+    def purchases(self) -> pd.DataFrame:
+        return self.get_columns('purchases')
+    
+    @property
+    def customer_stats(self) -> pd.DataFrame:
+        return self.get_columns('customer_stats')
+    
+    @property
+    def customer_categories(self) -> pd.DataFrame:
+        return self.get_columns('customer_categories')
+    
+    @property
+    def category_bitmaps(self) -> Dict[str, np.ndarray]:
+        """카테고리 → 고객 비트맵"""
         if not self._loaded:
             self.load()
-        return self._category_customers_cache.get(category, set())
+        return self._category_bitmaps
+    
+    def get_category_bitmap(self, category: str) -> np.ndarray:
+        """캐시된 카테고리별 고객 비트맵 반환 (알 수 없는 카테고리는 빈 비트맵)"""
+        if not self._loaded:
+            self.load()
+        if category not in self._category_bitmaps:
+            return bitmap.empty(self.n_customers)
+        return self._category_bitmaps[category]
+    
+    @property
+    def approx_sample(self) -> StratifiedSample:
+        """근사 모수용 층화 표본 (첫 접근 시 생성, 로드/갱신 시 재생성)"""
+        if not self._loaded:
+            self.load()
+        with self._lock:
+            if self._sample is None:
+                self._sample = StratifiedSample(self.arrays, self._category_bitmaps, self.event_index)
+            return self._sample
+    
+    @property
+    def approx_sample_built(self) -> bool:
+        """층화 표본이 이미 생성됐는지 (생성하지 않고 확인)"""
+        return self._sample is not None
+    
+    @property
+    def n_customers(self) -> int:
+        if not self._loaded:
+            self.load()
+        return len(self._customer_ids)
+    
+    def ids_for_keys(self, keys: np.ndarray) -> np.ndarray:
+        """
+        내부 고객 키 → 문자열 customer_id (내보내기 시점에만 사용)
+        
+        고객 키 = customers 행 위치 (0..n-1, int32)
+        """
+        if not self._loaded:
+            self.load()
+        return np.char.decode(self._customer_ids[keys], 'utf-8').astype(object)
+    
+    def keys_for_ids(self, customer_ids) -> np.ndarray:
+        """문자열 customer_id → 내부 고객 키 (없는 ID는 제외)"""
+        if not self._loaded:
+            self.load()
+        if self._id_index is None:
+            self._id_index = pd.Index(np.char.decode(self._customer_ids, 'utf-8'))
+        keys = self._id_index.get_indexer(list(customer_ids))
+        return np.sort(keys[keys >= 0]).astype(np.int32)
+    
+    def refresh(self):
+        """재생성 없이 디스크의 최신 마트/컬럼 스토어로 다시 열기 (버전 증가)"""
+        self._loaded = False
+        self.load()
+    
+    def append_purchases(self, batch_df: pd.DataFrame) -> int:
+        """신규 구매 배치 증분 반영 후 캐시 갱신"""
+        applied = append_purchases(batch_df)
+        self.refresh()
+        return applied
     
     @property
     def is_loaded(self):
         return self._loaded
+    
+    @property
+    def version(self) -> int:
+        """데이터 스냅샷 버전 (로드/갱신 시 증가, 결과 캐시 무효화용)"""
+        return self._version
 
 
 # 전역 캐시 인스턴스
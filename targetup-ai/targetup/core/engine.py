@@ -3,17 +3,22 @@ TargetUP AI - Unified Engine
 AI 모드와 규칙 기반 모드 통합
 """
 from datetime import datetime
-from typing import Tuple, List, Set, Optional, Dict, Any
+from typing import Tuple, List, Optional, Dict, Any, Union
 import pandas as pd
+import numpy as np
 
-from .models import FilterSpec, MessageVariant
+from .models import FilterSpec, MessageVariant, FrequencyCap
 from .data_store import data_cache
-from .query_engine import query_engine, QueryEngine
+from .query_engine import QueryEngine
 from .recommender import message_recommender
 from .llm_client import claude_client, check_api_status
 from .ai_parser import ai_parser
 from .ai_recommender import ai_recommender
 from .rag_store import rag_store, search_similar_campaigns
+from .result_cache import result_cache
+from .approx_count import ApproxCount
+from .campaign_db import campaign_db
+from . import bitmap
 
 
 class UnifiedEngine:
@@ -44,16 +49,20 @@ class UnifiedEngine:
     
     def execute(self, 
                 prompt: str,
-                use_ai: Optional[bool] = None) -> Tuple[FilterSpec, datetime, int, pd.DataFrame, List[str], Dict[str, Any]]:
+                use_ai: Optional[bool] = None,
+                frequency_cap: Optional[FrequencyCap] = None) -> Tuple[FilterSpec, datetime, int, pd.DataFrame, np.ndarray, Dict[str, Any]]:
         """
         쿼리 실행
         
         Args:
             prompt: 사용자 프롬프트
             use_ai: AI 사용 여부 (None이면 자동)
+            frequency_cap: 지정 시 기존 예약/발송 기준 한도 도달 고객 제외
+                           (제외 인원은 extra_context['frequency_capped'])
             
         Returns:
-            (spec, send_at, total_count, sample_df, customer_ids, extra_context)
+            (spec, send_at, total_count, sample_df, customer_keys, extra_context)
+            customer_keys: 정렬된 int32 고객 키 (문자열 ID는 내보내기 시점에 변환)
         """
         # 데이터 로드 확인
         if not data_cache.is_loaded:
@@ -77,20 +86,78 @@ class UnifiedEngine:
             spec, send_at = self._rule_engine.parser.parse(prompt)
         
         # 필터링 (항상 규칙 기반 - 정확성 보장)
-        customer_ids = self._rule_engine._filter_customers(spec)
-        total_count = len(customer_ids)
+        customer_keys = self._rule_engine._filter_customers(spec)
         
-        # 샘플 추출
-        sample_ids = list(customer_ids)[:50]
-        sample_df = data_cache.customers[
-            data_cache.customers['customer_id'].isin(sample_ids)
-        ].copy()
+        # 빈도 제한 (발송일 기준 고객별 발송 수 인덱스)
+        if frequency_cap is not None:
+            capped_keys = campaign_db.apply_frequency_cap(customer_keys, send_at, frequency_cap)
+            extra_context['frequency_capped'] = len(customer_keys) - len(capped_keys)
+            customer_keys = capped_keys
         
-        # 나이 컬럼 추가
-        current_year = datetime.now().year
-        sample_df['age'] = current_year - sample_df['birth_year']
+        total_count = len(customer_keys)
         
-        return spec, send_at, total_count, sample_df, list(customer_ids), extra_context
+        # 샘플 추출 (행 위치로 직접 조회)
+        sample_df = self._rule_engine.sample_rows(customer_keys[:50])
+        
+        return spec, send_at, total_count, sample_df, customer_keys, extra_context
+    
+    def count(self, spec: FilterSpec) -> int:
+        """타겟 모수만 계산 (고객 키/샘플 생성 없음)"""
+        return self._rule_engine.count(spec)
+
+    def count_many(self, specs: List[FilterSpec]) -> List[int]:
+        """여러 세그먼트 모수 일괄 계산 (공통 조건은 한 번만 평가)"""
+        return self._rule_engine.execute_many(specs)
+
+    def overlap_matrix(self, segments: List[Union[FilterSpec, int]]) -> Dict[str, Any]:
+        """
+        세그먼트 간 중복 분석 (같은 날 여러 캠페인 예약 전 타겟 중복 확인)
+
+        Args:
+            segments: FilterSpec 또는 저장된 캠페인 ID 목록
+        Returns:
+            {'labels': 세그먼트 이름, 'sizes': 세그먼트별 모수,
+             'matrix': 쌍별 교집합 수 (k×k), 'union': 전체 합집합 수}
+        """
+        if not data_cache.is_loaded:
+            data_cache.load()
+        n = data_cache.n_customers
+
+        # 조건 세그먼트는 일괄 평가, 캠페인은 저장된 타겟으로 비트맵 생성
+        specs = [s for s in segments if isinstance(s, FilterSpec)]
+        spec_bitmaps = iter(self._rule_engine.execute_many(specs, return_bitmaps=True))
+
+        labels, bitmaps = [], []
+        for segment in segments:
+            if isinstance(segment, FilterSpec):
+                labels.append(segment.raw_prompt or f"세그먼트 {len(labels) + 1}")
+                bitmaps.append(next(spec_bitmaps))
+            else:
+                keys = campaign_db.get_target_keys(segment)
+                if keys is None:
+                    raise ValueError(f"캠페인 타겟을 찾을 수 없습니다: #{segment}")
+                labels.append(f"캠페인 #{segment}")
+                bitmaps.append(bitmap.from_positions(keys, n))
+
+        matrix, union = bitmap.overlap_counts(bitmaps)
+        return {
+            'labels': labels,
+            'sizes': np.diag(matrix).copy(),
+            'matrix': matrix,
+            'union': union,
+        }
+
+    def preview_count(self, prompt: str) -> Tuple[FilterSpec, ApproxCount]:
+        """
+        입력 중 실시간 모수 미리보기
+        
+        API 호출 없이 규칙 기반 파싱 + 근사 모수(층화 표본)만 계산
+        정확한 모수는 미리보기(execute) 시 계산
+        """
+        if not data_cache.is_loaded:
+            data_cache.load()
+        spec, _ = self._rule_engine.parser.parse(prompt)
+        return spec, self._rule_engine.approx_count(spec)
     
     def recommend_messages(self,
                            prompt: str,
@@ -148,7 +215,13 @@ class UnifiedEngine:
             "rag_available": self.rag_available,
             "api_status": api_status,
             "rag_stats": rag_stats,
-            "data_loaded": data_cache.is_loaded
+            "data_loaded": data_cache.is_loaded,
+            "data_version": data_cache.version,
+            "loaded_columns": data_cache.loaded_columns(),
+            "result_cache": result_cache.get_stats(),
+            # 상태 조회가 표본 생성을 일으키지 않도록 이미 만든 표본만 보고
+            "approx_sample": data_cache.approx_sample.stats() if data_cache.approx_sample_built else None,
+            "count_cube": data_cache.count_cube.stats() if data_cache.is_loaded else None
         }
 
 
@@ -0,0 +1,430 @@
+"""
+TargetUP AI - Filter Plan
+FilterSpec → 타입 배열 기반 필터 실행 계획 컴파일/평가
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, date
+from typing import Tuple, List, Optional, Dict, Mapping
+from dateutil.relativedelta import relativedelta
+import numpy as np
+import pandas as pd
+
+from .models import FilterSpec, CATEGORIES, GENDERS, REGIONS, SKIN_TYPES
+from . import bitmap
+
+
+# 코드 배열에서 알 수 없는 값
+UNKNOWN_CODE = 255
+
+# last_order_day 미구매(NULL) 값 - 모든 비교에서 cutoff보다 작음
+NO_ORDER_DAY = np.iinfo(np.int32).min
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# 코드 컬럼 → (원본 컬럼, 값 목록)
+CODE_COLUMNS = {
+    'gender_code': ('gender', GENDERS),
+    'region_code': ('region', REGIONS),
+    'skin_type_code': ('skin_type', SKIN_TYPES),
+}
+
+
+def to_day_number(d: date) -> int:
+    """date → 1970-01-01 기준 일수"""
+    return d.toordinal() - _EPOCH_ORDINAL
+
+
+def _encode(values: pd.Series, vocabulary: List[str]) -> np.ndarray:
+    """문자열 컬럼 → uint8 코드 (목록에 없으면 UNKNOWN_CODE)"""
+    codes = pd.Categorical(values, categories=vocabulary).codes
+    return np.where(codes < 0, UNKNOWN_CODE, codes).astype(np.uint8)
+
+
+def build_customer_arrays(customers_df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    필터용 타입 배열 생성 (고객 키 = 행 위치)
+
+    - gender_code / region_code / skin_type_code: uint8
+    - birth_year: int16
+    - last_order_day: int32 일수 (미구매는 NO_ORDER_DAY)
+    """
+    arrays = {
+        name: _encode(customers_df[source], vocabulary)
+        for name, (source, vocabulary) in CODE_COLUMNS.items()
+    }
+    arrays['birth_year'] = customers_df['birth_year'].to_numpy().astype(np.int16)
+
+    last_order = customers_df['last_order_at'].to_numpy().astype('datetime64[D]')
+    days = last_order.astype(np.int64)
+    days[np.isnat(last_order)] = NO_ORDER_DAY
+    arrays['last_order_day'] = days.astype(np.int32)
+    return arrays
+
+
+def build_event_index(keys: np.ndarray, category_codes: np.ndarray,
+                      days: np.ndarray, n_categories: int) -> Dict[str, np.ndarray]:
+    """
+    구매 이벤트 인덱스 ((카테고리, 구매일) 정렬)
+
+    - event_keys: int32 고객 키
+    - event_days: int32 구매일 일수 (카테고리 구간 내 오름차순)
+    - event_offsets: int64 카테고리별 시작 위치 (길이 n_categories + 1)
+    """
+    valid = (keys >= 0) & (category_codes >= 0)
+    keys, category_codes, days = keys[valid], category_codes[valid], days[valid]
+
+    order = np.lexsort((days, category_codes))
+    return {
+        'event_keys': keys[order].astype(np.int32),
+        'event_days': days[order].astype(np.int32),
+        'event_offsets': np.searchsorted(
+            category_codes[order], np.arange(n_categories + 1)
+        ).astype(np.int64),
+    }
+
+
+def merge_event_index(events: Mapping[str, np.ndarray], keys: np.ndarray,
+                      category_codes: np.ndarray, days: np.ndarray) -> Dict[str, np.ndarray]:
+    """기존 이벤트 인덱스에 신규 구매 이벤트 병합"""
+    offsets = events['event_offsets']
+    n_categories = len(offsets) - 1
+    old_codes = np.repeat(np.arange(n_categories), np.diff(offsets))
+    return build_event_index(
+        np.concatenate([events['event_keys'], keys]),
+        np.concatenate([old_codes, category_codes]),
+        np.concatenate([events['event_days'], days]),
+        n_categories,
+    )
+
+
+def window_mask(events: Mapping[str, np.ndarray], category_code: int,
+                start_day: int, end_day: int, n: int) -> np.ndarray:
+    """카테고리 구매일이 [start_day, end_day]에 있는 고객 마스크 (이진 탐색)"""
+    offsets = events['event_offsets']
+    lo, hi = offsets[category_code], offsets[category_code + 1]
+    days = events['event_days'][lo:hi]
+    i0 = lo + np.searchsorted(days, start_day, side='left')
+    i1 = lo + np.searchsorted(days, end_day, side='right')
+    mask = np.zeros(n, dtype=bool)
+    mask[events['event_keys'][i0:i1]] = True
+    return mask
+
+
+def resolve_window(window: Mapping, as_of: date) -> Tuple[str, int, int]:
+    """
+    category_windows 항목 → (카테고리, 시작 일수, 종료 일수)
+
+    within_months가 있으면 as_of 기준 최근 N개월, 아니면 start~end
+    (start 생략 시 처음부터, end 생략 시 as_of까지)
+    """
+    category = window['category']
+    end = as_of
+    if window.get('end'):
+        end = date.fromisoformat(str(window['end']))
+
+    if window.get('within_months'):
+        start_day = to_day_number(as_of - relativedelta(months=int(window['within_months'])))
+        return category, start_day, to_day_number(as_of)
+    if window.get('start'):
+        start_day = to_day_number(date.fromisoformat(str(window['start'])))
+    else:
+        start_day = int(NO_ORDER_DAY) + 1
+    return category, start_day, to_day_number(end)
+
+
+@dataclass(frozen=True)
+class Predicate:
+    """
+    단일 조건 (컬럼 op 값)
+
+    op: 'in'(코드 집합), 'ge', 'le', 'lt'
+    """
+    column: str
+    op: str
+    value: object
+
+    def apply(self, arrays: Mapping[str, np.ndarray], mask: np.ndarray, scratch: np.ndarray):
+        """mask &= 조건 (scratch는 같은 길이의 bool 작업 버퍼)"""
+        col = arrays[self.column]
+        if self.op == 'in':
+            lut = np.zeros(256, dtype=bool)
+            lut[list(self.value)] = True
+            np.take(lut, col, out=scratch)
+        elif self.op == 'ge':
+            np.greater_equal(col, self.value, out=scratch)
+        elif self.op == 'le':
+            np.less_equal(col, self.value, out=scratch)
+        elif self.op == 'lt':
+            np.less(col, self.value, out=scratch)
+        else:
+            raise ValueError(f"지원하지 않는 연산: {self.op}")
+        np.logical_and(mask, scratch, out=mask)
+
+
+@dataclass
+class FilterPlan:
+    """컴파일된 필터 실행 계획"""
+    predicates: List[Predicate] = field(default_factory=list)
+    categories: Tuple[str, ...] = ()
+    category_mode: str = "ANY"
+    # (카테고리, 시작 일수, 종료 일수) - 이벤트 인덱스 필요
+    windows: Tuple[Tuple[str, int, int], ...] = ()
+
+    def evaluate(self,
+                 arrays: Mapping[str, np.ndarray],
+                 category_bitmaps: Mapping[str, np.ndarray],
+                 events: Optional[Mapping[str, np.ndarray]] = None) -> np.ndarray:
+        """계획 평가 → 고객 키 위치 불리언 마스크"""
+        n = len(arrays['birth_year'])
+        mask = np.ones(n, dtype=bool)
+        scratch = np.empty(n, dtype=bool)
+
+        for predicate in self.predicates:
+            predicate.apply(arrays, mask, scratch)
+
+        if self.windows_in_disjunction:
+            bits = self.disjunction_bitmap(category_bitmaps, events, n)
+            np.logical_and(mask, bitmap.to_mask(bits, n), out=mask)
+            return mask
+
+        if self.categories:
+            np.logical_and(mask, bitmap.to_mask(self.category_bitmap(category_bitmaps, n), n), out=mask)
+
+        for category, start_day, end_day in self.windows:
+            if category not in CATEGORIES:
+                mask[:] = False
+                break
+            if events is None:
+                raise ValueError("기간별 카테고리 조건에는 구매 이벤트 인덱스가 필요합니다")
+            in_window = window_mask(events, CATEGORIES.index(category), start_day, end_day, n)
+            np.logical_and(mask, in_window, out=mask)
+
+        return mask
+
+    def atoms(self) -> List[Tuple]:
+        """
+        공유 가능한 하위 조건 목록 (같은 atom은 여러 계획에서 한 번만 평가)
+
+        - ('pred', Predicate)
+        - ('cat', 정렬된 카테고리 튜플, 모드)
+        - ('window', 카테고리, 시작 일수, 종료 일수)
+        - ('any', 정렬된 카테고리 튜플, 정렬된 기간 조건 튜플) - ANY 모드 카테고리 + 기간 조건 OR
+        """
+        atoms = [('pred', p) for p in self.predicates]
+        if self.windows_in_disjunction:
+            atoms.append(('any', tuple(sorted(set(self.categories))), tuple(sorted(set(self.windows)))))
+            return atoms
+        if self.categories:
+            mode = self.category_mode if len(self.categories) > 1 else 'ANY'
+            atoms.append(('cat', tuple(sorted(set(self.categories))), mode))
+        atoms.extend(('window',) + w for w in self.windows)
+        return atoms
+
+    @property
+    def windows_in_disjunction(self) -> bool:
+        """
+        ANY 모드에서 기간 조건을 카테고리 구매 이력과 OR로 묶는지
+        ("최근 3개월 눈가케어 또는 에센스 구매" → 눈가케어(기간) ∪ 에센스)
+        ALL 모드와 조건이 하나뿐이면 AND와 같으므로 기존대로 교집합
+        """
+        return (self.category_mode == 'ANY' and bool(self.windows)
+                and len(self.categories) + len(self.windows) > 1)
+
+    def disjunction_bitmap(self,
+                           category_bitmaps: Mapping[str, np.ndarray],
+                           events: Optional[Mapping[str, np.ndarray]],
+                           n: int) -> np.ndarray:
+        """ANY 모드 카테고리 + 기간 조건 비트맵 (하나라도 만족, 알 수 없는 카테고리는 제외)"""
+        if events is None:
+            raise ValueError("기간별 카테고리 조건에는 구매 이벤트 인덱스가 필요합니다")
+        bitmaps = [self.category_bitmap(category_bitmaps, n)] if self.categories else []
+        for category, start_day, end_day in self.windows:
+            if category in CATEGORIES:
+                in_window = window_mask(events, CATEGORIES.index(category), start_day, end_day, n)
+                bitmaps.append(bitmap.from_mask(in_window))
+        return bitmap.or_all(bitmaps) if bitmaps else bitmap.empty(n)
+
+    def category_bitmap(self, category_bitmaps: Mapping[str, np.ndarray], n: int) -> np.ndarray:
+        """카테고리 조건 비트맵 (ALL: 비트 AND, ANY: 비트 OR)"""
+        if not self.categories:
+            return bitmap.full(n)
+
+        # 알 수 없는 카테고리는 빈 비트맵
+        empty = bitmap.empty(n)
+        bitmaps = [category_bitmaps.get(cat, empty) for cat in self.categories]
+
+        if self.category_mode == 'ALL':  # 교집합: 모든 카테고리 구매 이력
+            return bitmap.and_all(bitmaps)
+        # ANY: 합집합: 하나라도 구매 이력
+        return bitmap.or_all(bitmaps)
+
+
+def _codes_for(values: List[str], vocabulary: List[str]) -> Tuple[int, ...]:
+    """값 목록 → 코드 튜플 (알 수 없는 값은 제외)"""
+    return tuple(sorted({vocabulary.index(v) for v in values if v in vocabulary}))
+
+
+def compile_filter(spec: FilterSpec, current_year: Optional[int] = None) -> FilterPlan:
+    """
+    FilterSpec → FilterPlan
+
+    Args:
+        spec: 타겟팅 조건
+        current_year: 나이 계산 기준 연도 (None이면 올해)
+    """
+    if current_year is None:
+        current_year = datetime.now().year
+
+    predicates = []
+
+    # 1. 성별
+    if spec.gender:
+        predicates.append(Predicate('gender_code', 'in', _codes_for([spec.gender], GENDERS)))
+
+    # 2. 연령대 → 출생연도 범위
+    if spec.age_min is not None:
+        predicates.append(Predicate('birth_year', 'le', current_year - spec.age_min))
+    if spec.age_max is not None:
+        predicates.append(Predicate('birth_year', 'ge', current_year - spec.age_max))
+
+    # 3. 지역
+    if spec.regions:
+        predicates.append(Predicate('region_code', 'in', _codes_for(spec.regions, REGIONS)))
+
+    # 4. 피부타입
+    if spec.skin_types:
+        predicates.append(Predicate('skin_type_code', 'in', _codes_for(spec.skin_types, SKIN_TYPES)))
+
+    # 5. 기간 조건
+    as_of = spec.as_of_date or datetime.now().date()
+
+    # 최근 N개월 구매 O
+    if spec.purchased_within_months:
+        cutoff = as_of - relativedelta(months=spec.purchased_within_months)
+        predicates.append(Predicate('last_order_day', 'ge', to_day_number(cutoff)))
+
+    # 최근 N개월 미구매 (NULL은 NO_ORDER_DAY라 cutoff 미만으로 포함)
+    if spec.not_purchased_within_months:
+        cutoff = as_of - relativedelta(months=spec.not_purchased_within_months)
+        predicates.append(Predicate('last_order_day', 'lt', to_day_number(cutoff)))
+
+    # 6. 카테고리별 구매 기간
+    windows = tuple(resolve_window(w, as_of) for w in spec.category_windows)
+
+    return FilterPlan(
+        predicates=predicates,
+        categories=tuple(spec.categories),
+        category_mode=spec.category_mode,
+        windows=windows,
+    )
+
+
+def _evaluate_atom(atom: Tuple,
+                   arrays: Mapping[str, np.ndarray],
+                   category_bitmaps: Mapping[str, np.ndarray],
+                   events: Optional[Mapping[str, np.ndarray]],
+                   n: int,
+                   code_bitmaps: Dict[Tuple[str, int], np.ndarray]) -> np.ndarray:
+    """
+    atom 하나 → 비트맵
+
+    코드 컬럼의 'in' 조건은 (컬럼, 코드)별 비트맵의 OR로 계산하고
+    코드 비트맵은 code_bitmaps에 모아 다른 atom과 공유
+    """
+    kind = atom[0]
+    if kind == 'pred':
+        predicate = atom[1]
+        if predicate.op == 'in':
+            if not predicate.value:
+                return bitmap.empty(n)
+            col = arrays[predicate.column]
+            for code in predicate.value:
+                if (predicate.column, code) not in code_bitmaps:
+                    code_bitmaps[(predicate.column, code)] = bitmap.from_mask(col == code)
+            return bitmap.or_all([code_bitmaps[(predicate.column, c)] for c in predicate.value])
+        mask = np.ones(n, dtype=bool)
+        predicate.apply(arrays, mask, np.empty(n, dtype=bool))
+        return bitmap.from_mask(mask)
+    if kind == 'cat':
+        plan = FilterPlan(categories=atom[1], category_mode=atom[2])
+        return plan.category_bitmap(category_bitmaps, n)
+    if kind == 'any':
+        plan = FilterPlan(categories=atom[1], category_mode='ANY', windows=atom[2])
+        return plan.disjunction_bitmap(category_bitmaps, events, n)
+    # window
+    category, start_day, end_day = atom[1:]
+    if category not in CATEGORIES:
+        return bitmap.empty(n)
+    return bitmap.from_mask(window_mask(events, CATEGORIES.index(category), start_day, end_day, n))
+
+
+def evaluate_many(plans: List[FilterPlan],
+                  arrays: Mapping[str, np.ndarray],
+                  category_bitmaps: Mapping[str, np.ndarray],
+                  events: Optional[Mapping[str, np.ndarray]] = None) -> List[np.ndarray]:
+    """
+    여러 계획을 한 번에 평가
+
+    모든 계획의 atom을 모아 서로 다른 atom만 한 번씩 비트맵으로 평가한 뒤,
+    계획별로 해당 비트맵들을 비트 AND로 결합.
+    atom은 여러 계획에 자주 나오는 순으로 결합하고 둘 이상의 계획이 공유하는
+    중간 결과(접두 교집합)만 재사용하므로 그리드 세그먼트는 공통 부분을 한 번만 AND.
+    접두/atom 비트맵은 마지막으로 쓰는 계획이 끝나면 바로 해제
+    Returns: 계획별 비트맵 (입력 순서)
+    """
+    n = len(arrays['birth_year'])
+    plan_atoms = [plan.atoms() for plan in plans]
+
+    # atom 빈도 (같은 빈도면 먼저 나온 순)
+    frequency: Dict[Tuple, int] = {}
+    for atoms in plan_atoms:
+        for atom in set(atoms):
+            frequency[atom] = frequency.get(atom, 0) + 1
+    order = {atom: (-count, i) for i, (atom, count) in enumerate(frequency.items())}
+    plan_atoms = [sorted(set(atoms), key=order.__getitem__) for atoms in plan_atoms]
+
+    # 접두별 사용 계획 수 (2 이상만 캐시)
+    prefix_uses: Dict[Tuple, int] = {}
+    for atoms in plan_atoms:
+        prefix: Tuple = ()
+        for atom in atoms:
+            prefix += (atom,)
+            prefix_uses[prefix] = prefix_uses.get(prefix, 0) + 1
+
+    atom_uses = dict(frequency)
+    atom_bitmaps: Dict[Tuple, np.ndarray] = {}
+    code_bitmaps: Dict[Tuple[str, int], np.ndarray] = {}
+    prefixes: Dict[Tuple, np.ndarray] = {}
+    results = []
+
+    for atoms in plan_atoms:
+        prefix = ()
+        current = bitmap.full(n)
+        for atom in atoms:
+            prefix += (atom,)
+            cached = prefixes.get(prefix)
+            if cached is None:
+                if atom not in atom_bitmaps:
+                    atom_bitmaps[atom] = _evaluate_atom(
+                        atom, arrays, category_bitmaps, events, n, code_bitmaps
+                    )
+                cached = np.bitwise_and(current, atom_bitmaps[atom])
+                if prefix_uses[prefix] > 1:
+                    prefixes[prefix] = cached
+            current = cached
+
+        # 이 계획이 마지막 사용자인 접두/atom 비트맵 해제
+        prefix = ()
+        for atom in atoms:
+            prefix += (atom,)
+            prefix_uses[prefix] -= 1
+            if prefix_uses[prefix] == 0:
+                prefixes.pop(prefix, None)
+            atom_uses[atom] -= 1
+            if atom_uses[atom] == 0:
+                del atom_bitmaps[atom]
+
+        # 다른 계획이 아직 쓰는 접두면 복사
+        results.append(current.copy() if prefix in prefixes else current)
+
+    return results
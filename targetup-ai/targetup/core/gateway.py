@@ -0,0 +1,82 @@
+"""
+TargetUP AI - Message Gateway
+SMS/LMS 발송 게이트웨이 인터페이스 + 로컬 스텁
+
+실제 발송사 연동은 MessageGateway.send_batch를 구현해 get_gateway에 등록
+"""
+import os
+import time
+import random
+import threading
+from collections import defaultdict
+from typing import Dict, Optional, Sequence
+
+
+# 게이트웨이 선택 (현재 stub만 제공)
+SEND_GATEWAY = os.getenv('SEND_GATEWAY', 'stub')
+
+# 게이트웨이 전체 처리 용량 (건/초, 모든 워커 합계 - 예상 완료 시각/분산 계획 기준)
+GATEWAY_CAPACITY = float(os.getenv('GATEWAY_CAPACITY', '5000'))
+
+# 스텁 배치당 응답 지연(초) / 실패 확률
+STUB_LATENCY = float(os.getenv('SEND_STUB_LATENCY', '0.02'))
+STUB_FAILURE_RATE = float(os.getenv('SEND_STUB_FAILURE_RATE', '0'))
+
+
+class GatewayError(Exception):
+    """게이트웨이 배치 발송 실패 (retryable=False면 재시도하지 않음)"""
+    
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class MessageGateway:
+    """발송 게이트웨이 (여러 스레드에서 동시에 send_batch 호출)"""
+    
+    name = 'base'
+    
+    def send_batch(self, campaign_id: int, batch_id: str,
+                   customer_ids: Sequence[str], text: str) -> int:
+        """
+        배치 발송 요청
+        
+        batch_id: 재시도 시에도 같은 값 (게이트웨이 측 중복 제거 키)
+        Returns: 접수된 메시지 수
+        Raises: GatewayError
+        """
+        raise NotImplementedError
+
+
+class StubGateway(MessageGateway):
+    """로컬 스텁 게이트웨이 (지연/실패 시뮬레이션, 배치 ID로 중복 접수 방지)"""
+    
+    name = 'stub'
+    
+    def __init__(self, latency: float = STUB_LATENCY,
+                 failure_rate: float = STUB_FAILURE_RATE,
+                 seed: Optional[int] = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._batches: Dict[str, int] = {}
+        self.delivered: Dict[int, int] = defaultdict(int)
+    
+    def send_batch(self, campaign_id: int, batch_id: str,
+                   customer_ids: Sequence[str], text: str) -> int:
+        time.sleep(self.latency)
+        with self._lock:
+            if self._rng.random() < self.failure_rate:
+                raise GatewayError(f"stub: 배치 {batch_id} 일시 오류")
+            if batch_id not in self._batches:
+                self._batches[batch_id] = len(customer_ids)
+                self.delivered[campaign_id] += len(customer_ids)
+        return len(customer_ids)
+
+
+def get_gateway(name: str = SEND_GATEWAY) -> MessageGateway:
+    """이름으로 게이트웨이 생성"""
+    if name == 'stub':
+        return StubGateway()
+    raise ValueError(f"지원하지 않는 게이트웨이: {name}")
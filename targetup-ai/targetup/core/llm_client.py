@@ -1,18 +1,26 @@
 """
 TargetUP AI - LLM Client
 Claude API 연동 클라이언트
+
+- AsyncClaudeClient: Messages API 비동기 클라이언트 (httpx 연결 재사용,
+  429/5xx 지수 백오프 + 지터, 동시 요청 세마포어 + 토큰 버킷, 호출별 타임아웃)
+- ClaudeClient: 동기 파사드 (백그라운드 이벤트 루프 하나에서 AsyncClaudeClient 실행)
 """
 import os
 import json
+import time
+import random
+import asyncio
+import threading
 from typing import Optional, Dict, Any, List
 from dataclasses import dataclass
 from pathlib import Path
 
 try:
-    import anthropic
-    HAS_ANTHROPIC = True
+    import httpx
+    HAS_HTTPX = True
 except ImportError:
-    HAS_ANTHROPIC = False
+    HAS_HTTPX = False
 
 # .env 파일 로드
 def load_env():
@@ -29,6 +37,16 @@ def load_env():
 load_env()
 
 
+# Messages API 버전 헤더
+ANTHROPIC_VERSION = "2023-06-01"
+
+# 재시도하는 HTTP 상태 (429 요청 한도 초과, 5xx / 529 서버 과부하)
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504, 529})
+
+# 재시도 대기 상한(초)
+RETRY_MAX_SECONDS = 30.0
+
+
 @dataclass
 class LLMConfig:
     """LLM 설정"""
@@ -36,12 +54,24 @@ class LLMConfig:
     model: str = "claude-sonnet-4-20250514"
     max_tokens: int = 4096
     temperature: float = 0.7
+    base_url: str = "https://api.anthropic.com"
+    timeout: float = 60.0              # 호출별 기본 타임아웃(초)
+    max_retries: int = 4               # 429/5xx/연결 오류 재시도 횟수
+    retry_base_seconds: float = 1.0    # 첫 재시도 최대 대기(초, 이후 2배씩)
+    max_concurrency: int = 4           # 프로세스 전체 동시 요청 수
+    requests_per_minute: float = 50    # 분당 요청 한도 (0 = 제한 없음)
     
     @classmethod
     def from_env(cls) -> 'LLMConfig':
         return cls(
             api_key=os.getenv('ANTHROPIC_API_KEY', ''),
             model=os.getenv('CLAUDE_MODEL', 'claude-sonnet-4-20250514'),
+            base_url=os.getenv('ANTHROPIC_BASE_URL', 'https://api.anthropic.com'),
+            timeout=float(os.getenv('LLM_TIMEOUT_SECONDS', '60')),
+            max_retries=int(os.getenv('LLM_MAX_RETRIES', '4')),
+            retry_base_seconds=float(os.getenv('LLM_RETRY_BASE_SECONDS', '1')),
+            max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', '4')),
+            requests_per_minute=float(os.getenv('LLM_REQUESTS_PER_MINUTE', '50')),
         )
     
     @property
@@ -49,30 +79,126 @@ class LLMConfig:
         return bool(self.api_key and self.api_key.startswith('sk-ant-'))
 
 
-class ClaudeClient:
-    """Claude API 클라이언트"""
+class LLMError(RuntimeError):
+    """Claude API 호출 실패 (status: HTTP 상태 코드, 연결 오류/타임아웃이면 None)"""
+    
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class AsyncRateLimiter:
+    """
+    비동기 토큰 버킷 (초당 rate개 충전, 최대 burst개)
+    
+    대기 중에도 락을 쥐고 있어 호출 순서대로 통과
+    """
+    
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """토큰 1개 사용 (부족하면 충전될 때까지 대기)"""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._tokens = 1.0
+                self._updated = time.monotonic()
+            self._tokens -= 1
+
+
+def json_system_prompt(system: str) -> str:
+    """시스템 프롬프트에 JSON 출력 지시 추가"""
+    return system + "\n\n반드시 유효한 JSON 형식으로만 응답하세요. 다른 텍스트는 포함하지 마세요."
+
+
+def parse_json_response(response_text: str) -> Dict[str, Any]:
+    """응답 텍스트 → JSON dict (파싱 실패 시 빈 dict)"""
+    try:
+        # JSON 블록 추출 (```json ... ``` 형식 처리)
+        if "```json" in response_text:
+            start = response_text.find("```json") + 7
+            end = response_text.find("```", start)
+            response_text = response_text[start:end].strip()
+        elif "```" in response_text:
+            start = response_text.find("```") + 3
+            end = response_text.find("```", start)
+            response_text = response_text[start:end].strip()
+        
+        return json.loads(response_text)
+    except json.JSONDecodeError as e:
+        # 파싱 실패시 빈 dict 반환
+        print(f"JSON 파싱 실패: {e}")
+        print(f"응답: {response_text[:500]}")
+        return {}
+
+
+class AsyncClaudeClient:
+    """
+    Claude Messages API 비동기 클라이언트
+    
+    httpx 연결 풀, 세마포어, 토큰 버킷이 처음 호출한 이벤트 루프에 묶이므로
+    한 루프에서만 사용 (여러 스레드에서는 ClaudeClient 사용)
+    """
     
     def __init__(self, config: Optional[LLMConfig] = None):
         self.config = config or LLMConfig.from_env()
         self._client = None
-        
+        self._semaphore = None
+        self._rate_limiter = None
+    
     @property
     def is_available(self) -> bool:
         """API 사용 가능 여부"""
-        return HAS_ANTHROPIC and self.config.is_valid
+        return HAS_HTTPX and self.config.is_valid
     
     @property
     def client(self):
-        """Anthropic 클라이언트 (lazy init)"""
-        if self._client is None and self.is_available:
-            self._client = anthropic.Anthropic(api_key=self.config.api_key)
+        """httpx 비동기 클라이언트 (lazy init, keep-alive 연결 재사용)"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.config.base_url,
+                headers={
+                    "x-api-key": self.config.api_key,
+                    "anthropic-version": ANTHROPIC_VERSION,
+                },
+                timeout=self.config.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.config.max_concurrency,
+                    max_keepalive_connections=self.config.max_concurrency,
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.config.max_concurrency)
+            self._rate_limiter = AsyncRateLimiter(
+                self.config.requests_per_minute / 60, burst=self.config.max_concurrency
+            )
         return self._client
     
-    def chat(self, 
-             messages: List[Dict[str, str]], 
-             system: str = "",
-             temperature: Optional[float] = None,
-             max_tokens: Optional[int] = None) -> str:
+    def _retry_delay(self, attempt: int, response=None) -> float:
+        """재시도 대기(초): retry-after 헤더 우선, 없으면 지수 백오프 + 전체 지터"""
+        if response is not None:
+            try:
+                return min(float(response.headers.get('retry-after', '')), RETRY_MAX_SECONDS)
+            except ValueError:
+                pass
+        # 동시에 실패한 요청이 한꺼번에 재시도하지 않도록 [0, base * 2^attempt) 구간에서 무작위
+        return random.uniform(0, min(self.config.retry_base_seconds * 2 ** attempt, RETRY_MAX_SECONDS))
+    
+    async def chat(self,
+                   messages: List[Dict[str, str]],
+                   system: str = "",
+                   temperature: Optional[float] = None,
+                   max_tokens: Optional[int] = None,
+                   timeout: Optional[float] = None) -> str:
         """
         Claude API 호출
         
@@ -81,27 +207,133 @@ class ClaudeClient:
             system: 시스템 프롬프트
             temperature: 온도 (기본값 사용시 None)
             max_tokens: 최대 토큰 (기본값 사용시 None)
-            
+            timeout: 요청 1회 타임아웃(초, 기본값 사용시 None)
+        
         Returns:
             응답 텍스트
+        Raises:
+            LLMError: 재시도할 수 없는 오류 또는 재시도 횟수 초과
         """
         if not self.is_available:
             raise RuntimeError("Claude API를 사용할 수 없습니다. API 키를 확인하세요.")
         
-        response = self.client.messages.create(
-            model=self.config.model,
-            max_tokens=max_tokens or self.config.max_tokens,
-            temperature=temperature if temperature is not None else self.config.temperature,
-            system=system,
-            messages=messages
+        client = self.client
+        payload = {
+            "model": self.config.model,
+            "max_tokens": max_tokens or self.config.max_tokens,
+            "temperature": temperature if temperature is not None else self.config.temperature,
+            "messages": messages,
+        }
+        if system:
+            payload["system"] = system
+        
+        for attempt in range(self.config.max_retries + 1):
+            await self._rate_limiter.acquire()
+            response = None
+            async with self._semaphore:
+                try:
+                    response = await client.post(
+                        "/v1/messages", json=payload,
+                        timeout=timeout if timeout is not None else self.config.timeout
+                    )
+                except httpx.TransportError as e:
+                    # 타임아웃/연결 오류는 재시도
+                    error = LLMError(f"Claude API 연결 실패: {e!r}")
+            
+            if response is not None:
+                if response.status_code == 200:
+                    blocks = response.json().get("content", [])
+                    return "".join(b.get("text", "") for b in blocks if b.get("type") == "text")
+                error = LLMError(
+                    f"Claude API 오류 {response.status_code}: {response.text[:200]}",
+                    status=response.status_code
+                )
+                if response.status_code not in RETRY_STATUSES:
+                    raise error
+            
+            if attempt < self.config.max_retries:
+                await asyncio.sleep(self._retry_delay(attempt, response))
+        
+        raise error
+    
+    async def chat_json(self,
+                        messages: List[Dict[str, str]],
+                        system: str = "",
+                        temperature: float = 0.3,
+                        timeout: Optional[float] = None) -> Dict[str, Any]:
+        """JSON 응답을 요청하고 파싱 (파싱 실패 시 빈 dict)"""
+        response_text = await self.chat(
+            messages=messages,
+            system=json_system_prompt(system),
+            temperature=temperature,
+            timeout=timeout
         )
+        return parse_json_response(response_text)
+    
+    async def aclose(self):
+        """연결 풀 종료"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class ClaudeClient:
+    """
+    Claude API 클라이언트 (동기 파사드)
+    
+    Streamlit 세션 스레드 어디서 호출해도 백그라운드 이벤트 루프 하나에서
+    AsyncClaudeClient를 실행 → 연결 풀과 동시성/속도 제한을 프로세스 전체가 공유
+    """
+    
+    def __init__(self, config: Optional[LLMConfig] = None):
+        self.config = config or LLMConfig.from_env()
+        self.async_client = AsyncClaudeClient(self.config)
+        self._loop = None
+        self._loop_lock = threading.Lock()
+    
+    @property
+    def is_available(self) -> bool:
+        """API 사용 가능 여부"""
+        return self.async_client.is_available
+    
+    def _run(self, coro):
+        """백그라운드 이벤트 루프에서 코루틴을 실행하고 결과 대기"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="claude-client", daemon=True).start()
+            loop = self._loop
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+    
+    def chat(self,
+             messages: List[Dict[str, str]],
+             system: str = "",
+             temperature: Optional[float] = None,
+             max_tokens: Optional[int] = None,
+             timeout: Optional[float] = None) -> str:
+        """
+        Claude API 호출
         
-        return response.content[0].text
+        Args:
+            messages: [{"role": "user", "content": "..."}, ...]
+            system: 시스템 프롬프트
+            temperature: 온도 (기본값 사용시 None)
+            max_tokens: 최대 토큰 (기본값 사용시 None)
+            timeout: 요청 1회 타임아웃(초, 기본값 사용시 None)
+        
+        Returns:
+            응답 텍스트
+        """
+        if not self.is_available:
+            raise RuntimeError("Claude API를 사용할 수 없습니다. API 키를 확인하세요.")
+        
+        return self._run(self.async_client.chat(messages, system, temperature, max_tokens, timeout))
     
     def chat_json(self,
                   messages: List[Dict[str, str]],
                   system: str = "",
-                  temperature: float = 0.3) -> Dict[str, Any]:
+                  temperature: float = 0.3,
+                  timeout: Optional[float] = None) -> Dict[str, Any]:
         """
         JSON 응답을 요청하고 파싱
         
@@ -109,45 +341,38 @@ class ClaudeClient:
             messages: 메시지 목록
             system: 시스템 프롬프트 (JSON 출력 지시 포함 권장)
             temperature: 낮은 온도 권장 (정확성)
-            
+            timeout: 요청 1회 타임아웃(초)
+        
         Returns:
             파싱된 JSON dict
         """
-        # 시스템 프롬프트에 JSON 지시 추가
-        json_system = system + "\n\n반드시 유효한 JSON 형식으로만 응답하세요. 다른 텍스트는 포함하지 마세요."
-        
         response_text = self.chat(
             messages=messages,
-            system=json_system,
-            temperature=temperature
+            system=json_system_prompt(system),
+            temperature=temperature,
+            timeout=timeout
         )
-        
-        # JSON 파싱 시도
-        try:
-            # JSON 블록 추출 (```json ... ``` 형식 처리)
-            if "```json" in response_text:
-                start = response_text.find("```json") + 7
-                end = response_text.find("```", start)
-                response_text = response_text[start:end].strip()
-            elif "```" in response_text:
-                start = response_text.find("```") + 3
-                end = response_text.find("```", start)
-                response_text = response_text[start:end].strip()
-            
-            return json.loads(response_text)
-        except json.JSONDecodeError as e:
-            # 파싱 실패시 빈 dict 반환
-            print(f"JSON 파싱 실패: {e}")
-            print(f"응답: {response_text[:500]}")
-            return {}
+        return parse_json_response(response_text)
+    
+    def close(self):
+        """연결 풀과 백그라운드 이벤트 루프 종료"""
+        with self._loop_lock:
+            if self._loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self.async_client.aclose(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
     
     def get_usage_info(self) -> Dict[str, Any]:
         """API 사용 정보 (디버그용)"""
         return {
             "available": self.is_available,
-            "has_library": HAS_ANTHROPIC,
+            "has_library": HAS_HTTPX,
             "has_key": bool(self.config.api_key),
-            "model": self.config.model
+            "model": self.config.model,
+            "base_url": self.config.base_url,
+            "max_concurrency": self.config.max_concurrency,
+            "requests_per_minute": self.config.requests_per_minute,
         }
 
 
@@ -158,14 +383,14 @@ claude_client = ClaudeClient()
 def check_api_status() -> Dict[str, Any]:
     """API 상태 확인"""
     status = {
-        "anthropic_installed": HAS_ANTHROPIC,
+        "httpx_installed": HAS_HTTPX,
         "api_key_set": bool(os.getenv('ANTHROPIC_API_KEY')),
         "api_key_valid": claude_client.config.is_valid,
         "ready": claude_client.is_available
     }
     
-    if not HAS_ANTHROPIC:
-        status["message"] = "anthropic 패키지를 설치하세요: pip install anthropic"
+    if not HAS_HTTPX:
+        status["message"] = "httpx 패키지를 설치하세요: pip install httpx"
     elif not status["api_key_set"]:
         status["message"] = ".env 파일에 ANTHROPIC_API_KEY를 설정하세요"
     elif not status["api_key_valid"]:
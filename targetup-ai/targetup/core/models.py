@@ -1,6 +1,7 @@
 """
 TargetUP AI - Data Models
 """
+import os
 from dataclasses import dataclass, field, asdict
 from datetime import datetime, date
 from typing import Optional, List, Dict, Any
@@ -24,6 +25,11 @@ class FilterSpec:
     categories: List[str] = field(default_factory=list)
     category_mode: str = "ANY"  # "ANY"(합집합) or "ALL"(교집합)
     
+    # 카테고리별 구매 기간 조건 (모두 만족해야 함)
+    # [{'category': '눈가케어', 'within_months': 3},
+    #  {'category': '선케어', 'start': '2026-03-01', 'end': '2026-05-31'}]
+    category_windows: List[Dict[str, Any]] = field(default_factory=list)
+    
     # 파싱된 원본
     raw_prompt: str = ""
     as_of_date: Optional[date] = None
@@ -57,6 +63,21 @@ class MessageVariant:
         self.lms_bytes = len(self.lms_text.encode('euc-kr', errors='replace'))
 
 
+@dataclass
+class FrequencyCap:
+    """고객당 발송 빈도 제한 (window_days일 동안 최대 max_messages건)"""
+    max_messages: int
+    window_days: int = 7
+    
+    @classmethod
+    def from_env(cls) -> Optional['FrequencyCap']:
+        """FREQUENCY_CAP_MAX / FREQUENCY_CAP_DAYS 환경변수 (미설정/0이면 None)"""
+        max_messages = int(os.getenv('FREQUENCY_CAP_MAX', '0') or 0)
+        if max_messages <= 0:
+            return None
+        return cls(max_messages, int(os.getenv('FREQUENCY_CAP_DAYS', '7') or 7))
+
+
 @dataclass
 class Campaign:
     """캠페인"""
@@ -67,12 +88,15 @@ class Campaign:
     as_of_date: Optional[date] = None
     spec_json: str = "{}"
     total_count: int = 0
-    targets_csv_path: Optional[str] = None
+    targets_csv_path: Optional[str] = None  # 기존 CSV 타겟
+    targets_path: Optional[str] = None  # 압축 고객 키 타겟
+    targets_hash: Optional[str] = None  # 타겟 내용 해시 (같은 타겟 파일 공유)
     selected_variant_id: Optional[str] = None
     sms_text: Optional[str] = None
     lms_text: Optional[str] = None
-    status: str = "scheduled"  # scheduled, sent, canceled
+    status: str = "scheduled"  # scheduled, sending, sent, failed, canceled
     sent_at: Optional[datetime] = None
+    projected_done_at: Optional[datetime] = None  # 예상 발송 완료 시각 (게이트웨이 용량 + 분산 구간 기준)
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -84,11 +108,14 @@ class Campaign:
             'spec_json': self.spec_json,
             'total_count': self.total_count,
             'targets_csv_path': self.targets_csv_path,
+            'targets_path': self.targets_path,
+            'targets_hash': self.targets_hash,
             'selected_variant_id': self.selected_variant_id,
             'sms_text': self.sms_text,
             'lms_text': self.lms_text,
             'status': self.status,
             'sent_at': self.sent_at.isoformat() if self.sent_at else None,
+            'projected_done_at': self.projected_done_at.isoformat() if self.projected_done_at else None,
         }
 
 
@@ -111,4 +138,6 @@ REGIONS = ['서울', '경기', '인천', '부산', '대구', '광주', '대전',
 
 SKIN_TYPES = ['건성', '지성', '복합성', '민감성', '중성']
 
+GENDERS = ['F', 'M']
+
 GRADES = ['VIP', 'GOLD', 'SILVER', 'BRONZE', 'NORMAL']
@@ -0,0 +1,64 @@
+"""
+TargetUP AI - Send Pacing
+발송 분산 계획 (같은 시각에 몰린 대형 캠페인을 일정 구간에 나눠 발송)
+
+- 캠페인마다 초당 total / 분산 구간 속도의 토큰 버킷을 두고,
+  청크 i는 토큰이 쌓이는 시각(not_before)부터 발송 가능 → 여러 워커가 같은 계획을 공유
+- 작은 캠페인(SEND_SMOOTHING_MIN_COUNT 이하)과 즉시 발송은 분산 없이 바로 발송
+- 우선순위: 즉시 발송 → 작은 캠페인 순 (청크 작업 priority 오름차순)
+"""
+import os
+from datetime import datetime, timedelta
+from typing import List
+
+from .gateway import GATEWAY_CAPACITY
+
+
+# 대형 캠페인 분산 구간(분)
+SEND_SMOOTHING_MINUTES = float(os.getenv('SEND_SMOOTHING_MINUTES', '60'))
+
+# 이 인원 이하 캠페인은 분산하지 않음
+SEND_SMOOTHING_MIN_COUNT = int(os.getenv('SEND_SMOOTHING_MIN_COUNT', '50000'))
+
+# 즉시 발송 캠페인 우선순위 (일반 캠페인은 타겟 수)
+URGENT_PRIORITY = -1
+
+
+def smoothing_seconds(n_messages: int, urgent: bool = False) -> float:
+    """캠페인 발송을 나눠 보낼 구간 길이(초, 0 = 분산 안 함)"""
+    if urgent or n_messages <= SEND_SMOOTHING_MIN_COUNT:
+        return 0.0
+    return SEND_SMOOTHING_MINUTES * 60
+
+
+def send_priority(n_messages: int, urgent: bool = False) -> int:
+    """청크 작업 우선순위 (작을수록 먼저)"""
+    return URGENT_PRIORITY if urgent else n_messages
+
+
+def chunk_release_times(n_messages: int, chunk_size: int, start: float,
+                        urgent: bool = False) -> List[float]:
+    """
+    청크별 발송 가능 시각 (unix time)
+    
+    분산 구간 동안 초당 n_messages / 구간 속도로 토큰이 쌓인다고 보고
+    청크 i는 앞선 청크 분량의 토큰이 쌓인 시각부터 발송
+    """
+    n_chunks = -(-n_messages // chunk_size)
+    span = smoothing_seconds(n_messages, urgent)
+    if span <= 0:
+        return [start] * n_chunks
+    rate = n_messages / span
+    return [start + i * chunk_size / rate for i in range(n_chunks)]
+
+
+def projected_completion(n_messages: int, send_at: datetime, ahead_messages: int = 0,
+                         urgent: bool = False, capacity: float = GATEWAY_CAPACITY) -> datetime:
+    """
+    예상 발송 완료 시각
+    
+    분산 구간 끝과, 게이트웨이 용량으로 앞선(더 작은) 캠페인 + 이 캠페인을
+    모두 보내는 시간 중 늦은 쪽
+    """
+    drain = (ahead_messages + n_messages) / capacity if capacity > 0 else 0.0
+    return send_at + timedelta(seconds=max(smoothing_seconds(n_messages, urgent), drain))
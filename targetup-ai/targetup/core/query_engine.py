@@ -5,12 +5,16 @@ TargetUP AI - Query Engine
 import re
 from datetime import datetime, date, timedelta
 from dateutil.relativedelta import relativedelta
-from typing import Tuple, List, Optional, Set, Dict, Any
+from typing import Tuple, List, Optional, Dict, Any
 import pandas as pd
 import numpy as np
 
-from .models import FilterSpec, CATEGORIES, REGIONS, SKIN_TYPES, STAGES, CONCERNS
+from .models import FilterSpec, CATEGORIES, REGIONS, SKIN_TYPES
 from .data_store import data_cache
+from .filter_plan import compile_filter, evaluate_many
+from .result_cache import result_cache, spec_cache_key
+from . import bitmap
+from .approx_count import ApproxCount
 
 
 class QueryParser:
@@ -61,6 +65,14 @@ class QueryParser:
             'not_purchased_within': r'최근\s*(\d{1,2})\s*개월\s*(미구매|구매\s*X|구매\s*안|주문\s*X)',
         }
         
+        # 카테고리별 구매 기간 패턴
+        self.category_window_patterns = {
+            # 최근 3개월 (내) 눈가케어 구매
+            'within': r'최근\s*(\d{1,2})\s*개월\s*(?:내|간|동안|이내)?\s*([가-힣/A-Za-z]+?)\s*(?:을|를)?\s*구매(?!\s*X|\s*안)',
+            # 3월~5월 (사이) 선케어 구매
+            'between': r'(\d{1,2})\s*월\s*(?:~|-|부터)\s*(\d{1,2})\s*월\s*(?:사이|까지|에)?\s*([가-힣/A-Za-z]+?)\s*(?:을|를)?\s*구매',
+        }
+        
         # 카테고리 모드 패턴
         self.category_mode_patterns = {
             'ALL': r'(교집합|AND|모두\s*구매|둘\s*다|전부)',
@@ -105,12 +117,16 @@ class QueryParser:
         # 9. 카테고리 모드 파싱 (기본 ANY)
         spec.category_mode = self._parse_category_mode(prompt)
         
+        # 10. 카테고리별 구매 기간 (기간 조건이 붙은 카테고리는 "구매 이력"에서 제외)
+        #     ALL: 구매 이력과 기간 조건 모두 만족, ANY: 하나라도 만족 (FilterPlan에서 OR)
+        spec.category_windows = self._parse_category_windows(prompt, spec.as_of_date)
+        window_categories = {w['category'] for w in spec.category_windows}
+        spec.categories = [c for c in spec.categories if c not in window_categories]
+        
         return spec, send_at
     
     def _parse_datetime(self, prompt: str, base_date: date) -> datetime:
         """발송일시 파싱"""
-        now = datetime.now()
-        
         # 패턴 1: 2026-02-10 10시
         match = re.search(r'(\d{4})-(\d{1,2})-(\d{1,2})\s*(\d{1,2})시', prompt)
         if match:
@@ -223,6 +239,42 @@ class QueryParser:
                     found.append(cat)
         return found
     
+    def _match_category(self, text: str) -> Optional[str]:
+        """텍스트에서 카테고리 하나 찾기 (_parse_categories와 같은 규칙)"""
+        found = self._parse_categories(text)
+        return found[0] if found else None
+    
+    def _parse_category_windows(self, prompt: str, as_of: date) -> List[Dict[str, Any]]:
+        """
+        카테고리별 구매 기간 파싱
+        
+        - "최근 3개월 (내) 눈가케어 구매" → within_months
+        - "3월~5월 선케어 구매" → start/end (as_of 기준 가장 최근의 해당 월)
+        """
+        windows = []
+        seen = set()
+        
+        for match in re.finditer(self.category_window_patterns['within'], prompt):
+            category = self._match_category(match.group(2))
+            if category and category not in seen:
+                windows.append({'category': category, 'within_months': int(match.group(1))})
+                seen.add(category)
+        
+        for match in re.finditer(self.category_window_patterns['between'], prompt):
+            category = self._match_category(match.group(3))
+            start_month, end_month = int(match.group(1)), int(match.group(2))
+            if not category or category in seen or not (1 <= start_month <= 12 and 1 <= end_month <= 12):
+                continue
+            # 종료 월이 as_of 이후면 작년 기간
+            end_year = as_of.year if end_month <= as_of.month else as_of.year - 1
+            start_year = end_year if start_month <= end_month else end_year - 1
+            start = date(start_year, start_month, 1)
+            end = date(end_year, end_month, 1) + relativedelta(months=1) - timedelta(days=1)
+            windows.append({'category': category, 'start': start.isoformat(), 'end': end.isoformat()})
+            seen.add(category)
+        
+        return windows
+    
     def _parse_category_mode(self, prompt: str) -> str:
         """카테고리 조합 모드 파싱 (기본 ALL for 구매이력 조건)"""
         # 명시적 합집합 키워드
@@ -238,6 +290,11 @@ class QueryParser:
         return 'ALL'
 
 
+# 샘플 표시용 고객 컬럼
+SAMPLE_COLUMNS = ['customer_id', 'name', 'gender', 'birth_year', 'region',
+                  'skin_type', 'grade', 'last_order_at']
+
+
 class QueryEngine:
     """타겟 필터링 엔진"""
     
@@ -245,10 +302,10 @@ class QueryEngine:
         self.parser = QueryParser()
     
     def execute(self, prompt: str, 
-                base_date: Optional[date] = None) -> Tuple[FilterSpec, datetime, int, pd.DataFrame, List[str]]:
+                base_date: Optional[date] = None) -> Tuple[FilterSpec, datetime, int, pd.DataFrame, np.ndarray]:
         """
         쿼리 실행
-        Returns: (spec, send_at, total_count, sample_df, all_customer_ids)
+        Returns: (spec, send_at, total_count, sample_df, customer_keys)
         """
         # 데이터 로드 확인
         if not data_cache.is_loaded:
@@ -258,93 +315,133 @@ class QueryEngine:
         spec, send_at = self.parser.parse(prompt, base_date)
         
         # 필터링
-        customer_ids = self._filter_customers(spec)
-        total_count = len(customer_ids)
+        customer_keys = self._filter_customers(spec)
+        total_count = len(customer_keys)
         
-        # 샘플 추출 (최대 50명)
-        sample_ids = list(customer_ids)[:50]
-        sample_df = data_cache.customers[
-            data_cache.customers['customer_id'].isin(sample_ids)
-        ].copy()
+        # 샘플 추출 (최대 50명, 행 위치로 직접 조회)
+        sample_df = self.sample_rows(customer_keys[:50])
         
-        # 나이 컬럼 추가
-        current_year = datetime.now().year
-        sample_df['age'] = current_year - sample_df['birth_year']
-        
-        return spec, send_at, total_count, sample_df, list(customer_ids)
+        return spec, send_at, total_count, sample_df, customer_keys
     
-    def _filter_customers(self, spec: FilterSpec) -> Set[str]:
-        """고객 필터링 (불리언 마스크 사용)"""
-        df = data_cache.customers
-        
-        # 기본 마스크 (전체 True)
-        mask = pd.Series([True] * len(df), index=df.index)
-        
-        # 1. 성별 필터
-        if spec.gender:
-            mask = mask & (df['gender'] == spec.gender)
+    def count(self, spec: FilterSpec) -> int:
+        """
+        타겟 모수만 계산
         
-        # 2. 연령대 필터
-        current_year = datetime.now().year
-        if spec.age_min is not None:
-            max_birth_year = current_year - spec.age_min
-            mask = mask & (df['birth_year'] <= max_birth_year)
-        if spec.age_max is not None:
-            min_birth_year = current_year - spec.age_max
-            mask = mask & (df['birth_year'] >= min_birth_year)
+        인구통계(+최근 구매/단일 카테고리) 조건은 고객 수 큐브에서 바로 합산,
+        그 외는 비트맵 popcount (고객 키 배열 생성 없음)
+        """
+        cube_count = self._cube_count(spec)
+        if cube_count is not None:
+            return cube_count
+        return bitmap.popcount(self._filter_bitmap(spec))
+    
+    def _cube_count(self, spec: FilterSpec) -> Optional[int]:
+        """고객 수 큐브로 계산 가능하면 모수, 아니면 None"""
+        if not data_cache.is_loaded:
+            data_cache.load()
+        return data_cache.count_cube.count(compile_filter(spec))
+    
+    def approx_count(self, spec: FilterSpec) -> ApproxCount:
+        """
+        근사 타겟 모수 (입력 중 미리보기용)
         
-        # 3. 지역 필터
-        if spec.regions:
-            mask = mask & (df['region'].isin(spec.regions))
+        고객 수 큐브나 결과 캐시로 정확한 값을 알 수 있으면 그대로,
+        없으면 층화 표본으로 추정
+        """
+        if not data_cache.is_loaded:
+            data_cache.load()
         
-        # 4. 피부타입 필터
-        if spec.skin_types:
-            mask = mask & (df['skin_type'].isin(spec.skin_types))
+        cube_count = self._cube_count(spec)
+        if cube_count is not None:
+            return ApproxCount(cube_count, 0, exact=True)
         
-        # 5. 기간 조건 필터
-        as_of = spec.as_of_date or datetime.now().date()
+        cached = result_cache.peek(spec_cache_key(spec, data_cache.version))
+        if cached is not None:
+            return ApproxCount(bitmap.popcount(cached), 0, exact=True)
+        return data_cache.approx_sample.estimate(compile_filter(spec))
+    
+    def execute_many(self, specs: List[FilterSpec],
+                     return_bitmaps: bool = False) -> List[Any]:
+        """
+        여러 FilterSpec 일괄 평가 (지역 × 연령대 같은 그리드 세그먼트용)
         
-        # 최근 N개월 구매 O
-        if spec.purchased_within_months:
-            cutoff_date = as_of - relativedelta(months=spec.purchased_within_months)
-            cutoff_dt = pd.Timestamp(cutoff_date)
-            mask = mask & (df['last_order_at'] >= cutoff_dt)
+        공통 하위 조건(성별, 지역, 출생연도 범위, 카테고리 등)은 스펙 전체에서
+        한 번만 평가하고 스펙별로 비트 AND로 결합
         
-        # 최근 N개월 미구매
-        if spec.not_purchased_within_months:
-            cutoff_date = as_of - relativedelta(months=spec.not_purchased_within_months)
-            cutoff_dt = pd.Timestamp(cutoff_date)
-            # NULL이거나 cutoff 이전
-            no_purchase = df['last_order_at'].isna() | (df['last_order_at'] < cutoff_dt)
-            mask = mask & no_purchase
+        Returns: 스펙별 타겟 모수 (return_bitmaps=True면 고객 키 비트맵)
+        """
+        if not data_cache.is_loaded:
+            data_cache.load()
         
-        # 기본 필터 적용된 고객 집합
-        filtered_ids = set(df.loc[mask, 'customer_id'].values)
+        results: List[Optional[np.ndarray]] = [None] * len(specs)
+        keys = [spec_cache_key(spec, data_cache.version) for spec in specs]
+        
+        # 캐시에 없는 스펙만 일괄 평가
+        misses = []
+        for i, key in enumerate(keys):
+            results[i] = result_cache.get(key)
+            if results[i] is None:
+                misses.append(i)
+        
+        if misses:
+            plans = [compile_filter(specs[i]) for i in misses]
+            bitmaps = evaluate_many(
+                plans, data_cache.arrays, data_cache.category_bitmaps, data_cache.event_index
+            )
+            for i, result in zip(misses, bitmaps):
+                result_cache.put(keys[i], result)
+                results[i] = result
+        
+        if return_bitmaps:
+            return results
+        return [bitmap.popcount(b) for b in results]
+    
+    def sample(self, spec: FilterSpec, n: int = 50) -> pd.DataFrame:
+        """앞에서부터 n명 샘플 (비트맵 앞부분만 스캔)"""
+        positions = bitmap.first_positions(self._filter_bitmap(spec), data_cache.n_customers, n)
+        return self.sample_rows(positions)
+    
+    def sample_rows(self, customer_keys: np.ndarray) -> pd.DataFrame:
+        """고객 키(행 위치) → 샘플 DataFrame (표시 컬럼만 로드, 나이 컬럼 포함)"""
+        customers = data_cache.get_columns('customers', SAMPLE_COLUMNS)
+        sample_df = customers.iloc[customer_keys].copy()
         
-        # 6. 카테고리 필터
-        if spec.categories:
-            category_ids = self._filter_by_categories(spec.categories, spec.category_mode)
-            filtered_ids = filtered_ids & category_ids
+        # 표시/차트용으로 category dtype 해제 (50행이라 비용 미미)
+        for col in sample_df.select_dtypes('category').columns:
+            sample_df[col] = sample_df[col].astype(object)
         
-        return filtered_ids
+        # 나이 컬럼 추가
+        current_year = datetime.now().year
+        sample_df['age'] = current_year - sample_df['birth_year']
+        return sample_df
+    
+    def _filter_customers(self, spec: FilterSpec) -> np.ndarray:
+        """
+        고객 필터링 (컴파일된 계획을 타입 배열에 평가)
+        Returns: 조건을 만족하는 고객 키 배열 (정렬된 int32)
+        """
+        mask = self._filter_mask(spec)
+        return np.flatnonzero(mask).astype(np.int32)
     
-    def _filter_by_categories(self, categories: List[str], mode: str) -> Set[str]:
-        """카테고리 조건으로 고객 필터링"""
-        if not categories:
-            return set(data_cache.customers['customer_id'].values)
-        
-        # 각 카테고리별 고객 집합 가져오기
-        category_sets = [data_cache.get_category_customers(cat) for cat in categories]
-        
-        if mode == 'ALL':  # 교집합: 모든 카테고리 구매 이력
-            result = category_sets[0]
-            for s in category_sets[1:]:
-                result = result & s
-        else:  # ANY: 합집합: 하나라도 구매 이력
-            result = set()
-            for s in category_sets:
-                result = result | s
+    def _filter_mask(self, spec: FilterSpec) -> np.ndarray:
+        """고객 키 위치 불리언 마스크"""
+        return bitmap.to_mask(self._filter_bitmap(spec), data_cache.n_customers)
+    
+    def _filter_bitmap(self, spec: FilterSpec) -> np.ndarray:
+        """고객 키 위치 비트맵 (결과 캐시 우선)"""
+        if not data_cache.is_loaded:
+            data_cache.load()
         
+        key = spec_cache_key(spec, data_cache.version)
+        cached = result_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        plan = compile_filter(spec)
+        result = bitmap.from_mask(
+            plan.evaluate(data_cache.arrays, data_cache.category_bitmaps, data_cache.event_index)
+        )
+        result_cache.put(key, result)
         return result
     
     def get_spec_tags(self, spec: FilterSpec) -> List[Dict[str, str]]:
@@ -376,7 +473,14 @@ class QueryEngine:
         for cat in spec.categories:
             tags.append({'type': '카테고리', 'value': cat})
         
-        if len(spec.categories) > 1:
+        for window in spec.category_windows:
+            if window.get('within_months'):
+                period = f"최근 {window['within_months']}개월"
+            else:
+                period = f"{window.get('start') or '?'}~{window.get('end') or '?'}"
+            tags.append({'type': '기간 카테고리', 'value': f"{window['category']} ({period} 구매)"})
+        
+        if len(spec.categories) + len(spec.category_windows) > 1:
             mode_str = '교집합(ALL)' if spec.category_mode == 'ALL' else '합집합(ANY)'
             tags.append({'type': '조합방식', 'value': mode_str})
         
@@ -3,7 +3,6 @@ TargetUP AI - RAG Store
 과거 캠페인/문안 학습을 위한 벡터 저장소
 """
 import os
-import json
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from pathlib import Path
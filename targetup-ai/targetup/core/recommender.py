@@ -3,8 +3,8 @@ TargetUP AI - Message Recommender
 페르소나 기반 문안 3안 + 자동 추천
 """
 import re
-from datetime import datetime, date
-from typing import List, Tuple, Optional, Dict
+from datetime import datetime
+from typing import List, Optional
 from dataclasses import dataclass
 
 from .models import FilterSpec, MessageVariant
@@ -0,0 +1,129 @@
+"""
+TargetUP AI - Result Cache
+FilterSpec 결과 비트맵 LRU 캐시 (데이터 버전 기반 무효화)
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Dict, Any
+import numpy as np
+
+from .models import FilterSpec
+
+
+def spec_cache_key(spec: FilterSpec, data_version: int) -> str:
+    """
+    정규화된 FilterSpec + 데이터 버전 → 캐시 키
+
+    - 목록 필드는 정렬/중복 제거
+    - raw_prompt 제외
+    - 카테고리 + 기간 카테고리 조건이 1개 이하면 category_mode 무시
+    - as_of_date는 기간 조건이 있을 때만 포함
+    - 나이 → 출생연도 변환 기준 연도 포함
+    """
+    has_period = bool(spec.purchased_within_months or spec.not_purchased_within_months
+                      or spec.category_windows)
+    as_of = spec.as_of_date or datetime.now().date()
+    categories = sorted(set(spec.categories))
+
+    normalized = {
+        'gender': spec.gender or None,
+        'age_min': spec.age_min,
+        'age_max': spec.age_max,
+        'regions': sorted(set(spec.regions)),
+        'skin_types': sorted(set(spec.skin_types)),
+        'purchased_within_months': spec.purchased_within_months or None,
+        'not_purchased_within_months': spec.not_purchased_within_months or None,
+        'categories': categories,
+        'category_mode': spec.category_mode if len(categories) + len(spec.category_windows) > 1 else None,
+        'category_windows': sorted(
+            ({k: v for k, v in w.items() if v is not None} for w in spec.category_windows),
+            key=lambda w: json.dumps(w, ensure_ascii=False, sort_keys=True)
+        ),
+        'as_of_date': as_of.isoformat() if has_period else None,
+        'current_year': datetime.now().year,
+        'data_version': data_version,
+    }
+    payload = json.dumps(normalized, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    타겟 비트맵 LRU 캐시
+
+    저장 값은 packed 비트맵(고객 키 위치)이며, 총 바이트 수가 max_bytes를
+    넘으면 가장 오래 사용하지 않은 항목부터 제거
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv('RESULT_CACHE_MB', '64')) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """캐시 조회 (히트 시 최근 사용으로 이동)"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: str) -> Optional[np.ndarray]:
+        """조회만 (히트/미스 통계, LRU 순서 변경 없음)"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key: str, value: np.ndarray):
+        """캐시 저장 (용량 초과 시 LRU 제거)"""
+        if value.nbytes > self.max_bytes:
+            return
+        value.setflags(write=False)
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[key] = value
+            self._bytes += value.nbytes
+
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def clear(self):
+        """전체 비우기"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """캐시 통계"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+
+# 싱글톤 인스턴스
+result_cache = ResultCache()
@@ -1,57 +1,118 @@
 """
 TargetUP AI - Scheduler
-예정된 캠페인 자동 처리 (Streamlit rerun 환경 고려)
+예정된 캠페인 자동 처리
+
+발송은 별도 프로세스(scripts/run_scheduler.py)에서 run_forever로 수행:
+대기 캠페인 (send_at, id) 최소 힙을 메모리에 두고 가장 이른 발송 시각까지 대기,
+DB가 바뀌면(PRAGMA data_version) 힙을 다시 구성
+발송 시각이 된 캠페인은 청크 작업으로 나뉘고, 모든 워커가 리스로 나눠 발송
 """
+import os
+import heapq
+import threading
 from datetime import datetime
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from .campaign_db import campaign_db
 from .models import Campaign
+from .send_pipeline import send_pipeline
+
+
+# DB 변경 확인 주기(초) - 다음 발송 시각이 멀어도 이 간격으로 깨어나 취소/신규 예약 반영
+SCHEDULER_POLL_SECONDS = float(os.getenv('SCHEDULER_POLL_SECONDS', '1.0'))
 
 
 class CampaignScheduler:
     """캠페인 스케줄러"""
     
     def __init__(self):
-        pass
+        self._heap: List[Tuple[datetime, int]] = []
+        self._data_version: Optional[int] = None
     
     def process_due_campaigns(self) -> List[Tuple[Campaign, bool]]:
         """
         발송 예정 캠페인 처리 (idempotent)
+        
+        scheduled → sending 선점에 성공한 캠페인만 발송하므로
+        여러 워커/세션이 동시에 호출해도 중복 발송 없음
+        이어서 남은 청크 작업(즉시 발송, 리스 만료 등)도 처리
         Returns: [(campaign, success), ...]
         """
         results = []
         
-        # status='scheduled' AND send_at <= now() 인 건 조회
-        due_campaigns = campaign_db.get_due_campaigns()
-        
-        for campaign in due_campaigns:
+        for campaign in campaign_db.claim_due_campaigns():
             success = self._send_campaign(campaign)
             results.append((campaign, success))
         
+        while send_pipeline.process_round():
+            pass
+        
         return results
     
     def _send_campaign(self, campaign: Campaign) -> bool:
         """
-        캠페인 발송 (시뮬레이션)
-        실제 환경에서는 여기서 SMS/LMS API 호출
+        선점한 캠페인 발송 (남은 청크 작업을 이 프로세스에서 처리)
+        
+        실패 청크가 남으면 failed (retry_campaign으로 실패 청크만 이어서 발송)
         """
         try:
-            # 상태를 sent로 변경
-            campaign_db.update_status(campaign.id, 'sent', datetime.now())
-            
-            # 실제 발송 로직 (시뮬레이션)
-            print(f"[발송 완료] Campaign #{campaign.id}: {campaign.total_count}명에게 발송")
-            
-            return True
+            return send_pipeline.run(campaign) == 'sent'
         except Exception as e:
             print(f"[발송 실패] Campaign #{campaign.id}: {e}")
             return False
     
+    # ==================== 발송 워커 ====================
+    
+    def _refresh_heap(self):
+        """DB의 대기 캠페인으로 힙 재구성"""
+        self._data_version = campaign_db.data_version()
+        self._heap = campaign_db.get_schedule()
+        heapq.heapify(self._heap)
+    
+    def _claim_due(self, now: datetime) -> List[Campaign]:
+        """힙에서 발송 시각이 지난 캠페인을 꺼내 선점 (청크 작업 생성)"""
+        claimed = []
+        while self._heap and self._heap[0][0] <= now:
+            _, campaign_id = heapq.heappop(self._heap)
+            # 그사이 취소/다른 워커 선점이면 빈 목록
+            claimed.extend(campaign_db.claim_due_campaigns(now, campaign_id=campaign_id))
+        return claimed
+    
+    def run_forever(self,
+                    stop_event: Optional[threading.Event] = None,
+                    poll_interval: float = SCHEDULER_POLL_SECONDS):
+        """
+        발송 워커 루프 (stop_event가 설정될 때까지)
+        
+        발송 시각이 된 캠페인을 선점하고, 대기 중인 청크 작업(다른 워커가 선점한
+        캠페인, 리스가 만료된 작업 포함)을 한 번씩 처리
+        할 일이 없으면 다음 발송 시각과 poll_interval 중 이른 쪽까지 대기
+        """
+        stop_event = stop_event or threading.Event()
+        self._refresh_heap()
+        print(f"[스케줄러] 시작 ({send_pipeline.owner}) - 대기 캠페인 {len(self._heap)}건")
+        removed = campaign_db.gc_targets()
+        if removed:
+            print(f"[스케줄러] 참조 없는 타겟 파일 {removed}개 정리")
+        
+        while not stop_event.is_set():
+            if campaign_db.data_version() != self._data_version:
+                self._refresh_heap()
+            
+            self._claim_due(datetime.now())
+            if send_pipeline.process_round():
+                continue
+            
+            timeout = poll_interval
+            if self._heap:
+                timeout = min(timeout, max(0.0, (self._heap[0][0] - datetime.now()).total_seconds()))
+            stop_event.wait(timeout)
+        
+        print("[스케줄러] 종료")
+    
     def get_pending_count(self) -> int:
         """대기 중인 캠페인 수"""
-        campaigns = campaign_db.get_all_campaigns(status='scheduled')
-        return len(campaigns)
+        return campaign_db.get_campaign_stats()['scheduled']
     
     def get_today_scheduled(self) -> List[Campaign]:
         """오늘 발송 예정 캠페인"""
@@ -0,0 +1,222 @@
+"""
+TargetUP AI - Send Pipeline
+캠페인 청크 작업을 리스해 게이트웨이에 발송 (속도 제한 + 동시 배치 + 재시도 + 리스 연장)
+
+- 작업: 캠페인 선점 시 타겟을 SEND_CHUNK_SIZE명씩 send_chunks 작업으로 분할 (CampaignDB)
+        작업마다 발송 가능 시각/우선순위가 있어 대형 캠페인은 분산 구간에 나눠 발송 (pacing)
+- 리스: 여러 프로세스/노드가 대기 작업을 나눠 가져가고, 발송 중에는 주기적으로 리스 연장
+        멈춘 워커의 작업은 리스 만료 후 다른 워커가 다시 가져감 (SEND_MAX_ATTEMPTS회까지)
+- 속도 제한: 모든 워커 합계 SEND_RATE_LIMIT 건/초를 리스를 가진 워커 수로 나눠
+           워커 프로세스마다 토큰 버킷으로 적용 (작업을 리스할 때/리스 연장 때 재배분)
+- 동시 배치: 스레드 풀 SEND_MAX_IN_FLIGHT개, 청크 안 재시도는 지수 백오프 + 지터
+- customer_id 변환은 청크를 보낼 때만, DB 접근은 호출 스레드에서만
+"""
+import os
+import time
+import uuid
+import random
+import socket
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Optional, Tuple
+import numpy as np
+
+from .campaign_db import campaign_db
+from .data_store import data_cache
+from .gateway import GATEWAY_CAPACITY, MessageGateway, GatewayError, get_gateway
+from .models import Campaign
+
+
+# 전체 워커 합계 초당 발송 한도 (0 = 제한 없음, 기본: 게이트웨이 전체 용량)
+SEND_RATE_LIMIT = float(os.getenv('SEND_RATE_LIMIT', str(GATEWAY_CAPACITY)))
+
+# 동시 전송 배치 수
+SEND_MAX_IN_FLIGHT = int(os.getenv('SEND_MAX_IN_FLIGHT', '4'))
+
+# 청크 리스 1회 안 재시도 횟수 / 첫 재시도 대기(초, 이후 2배씩)
+SEND_MAX_RETRIES = int(os.getenv('SEND_MAX_RETRIES', '3'))
+SEND_RETRY_BASE_SECONDS = float(os.getenv('SEND_RETRY_BASE_SECONDS', '0.5'))
+
+# 청크 리스 시간(초) / 청크당 최대 리스 횟수 (워커 중단·실패 후 재할당 포함)
+SEND_LEASE_SECONDS = float(os.getenv('SEND_LEASE_SECONDS', '30'))
+SEND_MAX_ATTEMPTS = int(os.getenv('SEND_MAX_ATTEMPTS', '3'))
+
+# 워커별로 들고 있는 캠페인 타겟 수
+KEYS_CACHE_SIZE = 8
+
+
+class RateLimiter:
+    """
+    토큰 버킷 (초당 rate개 충전, 최대 burst개)
+    
+    acquire(n)은 토큰을 미리 차감하고 부족분이 충전될 때까지 대기하므로
+    burst보다 큰 배치도 평균 속도를 지키며 통과
+    """
+    
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or rate
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, n: int = 1):
+        """n개 토큰 사용 (필요하면 대기)"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= n
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if delay > 0:
+            time.sleep(delay)
+    
+    def set_rate(self, rate: float):
+        """충전 속도 변경 (burst도 같은 값으로, 쌓인 토큰은 새 burst 이하로)"""
+        with self._lock:
+            self.rate = rate
+            self.burst = rate
+            self._tokens = min(self._tokens, self.burst)
+
+
+class SendPipeline:
+    """리스 기반 청크 발송 워커"""
+    
+    def __init__(self,
+                 gateway: Optional[MessageGateway] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 max_in_flight: int = SEND_MAX_IN_FLIGHT,
+                 max_retries: int = SEND_MAX_RETRIES,
+                 retry_base_seconds: float = SEND_RETRY_BASE_SECONDS,
+                 lease_seconds: float = SEND_LEASE_SECONDS,
+                 max_attempts: int = SEND_MAX_ATTEMPTS,
+                 owner: Optional[str] = None):
+        self.gateway = gateway or get_gateway()
+        self.rate_limiter = rate_limiter or RateLimiter(SEND_RATE_LIMIT)
+        self.total_rate = self.rate_limiter.rate
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._campaigns: "OrderedDict[int, Tuple[Optional[Campaign], Optional[np.ndarray]]]" = OrderedDict()
+    
+    def run(self, campaign: Campaign) -> str:
+        """
+        선점한 캠페인 1개의 남은 청크를 이 워커에서 모두 처리
+        
+        Returns: 캠페인 상태 (다른 워커가 아직 리스 중인 청크가 있으면 sending)
+        """
+        while self.process_round(campaign.id):
+            pass
+        current = campaign_db.get_campaign(campaign.id)
+        return current.status if current else 'canceled'
+    
+    def process_round(self, campaign_id: Optional[int] = None) -> int:
+        """
+        대기 청크 작업을 한 번 리스해 발송 (campaign_id 지정 시 해당 캠페인만)
+        
+        발송 중에는 lease_seconds / 3마다 리스를 연장하고,
+        청크가 끝나는 대로 반납 (마지막 청크를 반납한 워커가 캠페인 마무리)
+        Returns: 처리한 청크 수 (0이면 대기 작업 없음)
+        """
+        jobs = campaign_db.claim_send_chunks(
+            self.owner, self.max_in_flight * 2, self.lease_seconds, self.max_attempts, campaign_id
+        )
+        if not jobs:
+            return 0
+        self._share_rate()
+        
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            futures = {}
+            for job in jobs:
+                campaign, keys = self._load_campaign(job['campaign_id'])
+                if keys is None:
+                    self._release(job, 0, "타겟 파일이 없습니다", retryable=False)
+                    continue
+                start = job['chunk_index'] * job['chunk_size']
+                text = campaign.sms_text or campaign.lms_text or ''
+                future = pool.submit(self._send_chunk, job, keys[start:start + job['chunk_size']], text)
+                futures[future] = job
+            
+            pending = set(futures)
+            while pending:
+                finished, pending = wait(pending, timeout=self.lease_seconds / 3)
+                for future in finished:
+                    n_messages, error, retryable = future.result()
+                    self._release(futures[future], n_messages, error, retryable)
+                if pending:
+                    # 리스를 잃은 청크는 끝나도 반납이 무시됨 (게이트웨이는 batch_id로 중복 제거)
+                    campaign_db.renew_send_chunks(
+                        self.owner,
+                        [(futures[f]['campaign_id'], futures[f]['chunk_index']) for f in pending],
+                        self.lease_seconds
+                    )
+                    self._share_rate()
+        return len(jobs)
+    
+    def _share_rate(self):
+        """전체 한도를 지금 리스를 가진 워커 수로 나눠 이 워커의 속도 한도로 설정"""
+        if self.total_rate <= 0:
+            return
+        n_workers = max(campaign_db.count_send_workers(), 1)
+        self.rate_limiter.set_rate(self.total_rate / n_workers)
+    
+    def _load_campaign(self, campaign_id: int) -> Tuple[Optional[Campaign], Optional[np.ndarray]]:
+        """캠페인 + 타겟 키 (최근 캠페인 몇 개는 메모리에 유지)"""
+        if campaign_id in self._campaigns:
+            self._campaigns.move_to_end(campaign_id)
+            return self._campaigns[campaign_id]
+        
+        campaign = campaign_db.get_campaign(campaign_id)
+        keys = campaign_db.get_target_keys(campaign_id) if campaign else None
+        self._campaigns[campaign_id] = (campaign, keys)
+        if len(self._campaigns) > KEYS_CACHE_SIZE:
+            self._campaigns.popitem(last=False)
+        return campaign, keys
+    
+    def _release(self, job: dict, n_messages: int, error: Optional[str], retryable: bool = True):
+        """청크 반납 + 캠페인이 끝났으면 결과 출력"""
+        _, final_status = campaign_db.release_send_chunk(
+            self.owner, job['campaign_id'], job['chunk_index'], n_messages,
+            self.max_attempts, error, retryable
+        )
+        if final_status:
+            self._campaigns.pop(job['campaign_id'], None)
+            self._report(job['campaign_id'], final_status)
+    
+    def _report(self, campaign_id: int, status: str):
+        """캠페인 발송 결과 로그 (전체 워커 합산 처리량)"""
+        progress = campaign_db.get_send_progress(campaign_id)
+        if status == 'sent':
+            print(f"[발송 완료] Campaign #{campaign_id}: {progress['sent']:,}명에게 발송 "
+                  f"({progress['elapsed']:.1f}s, {progress['throughput']:,.0f}건/s)")
+        else:
+            print(f"[발송 실패] Campaign #{campaign_id}: 청크 {progress['failed_chunks']}개 실패 "
+                  f"({progress['sent']:,}건 발송)")
+    
+    def _send_chunk(self, job: dict, keys: np.ndarray, text: str) -> Tuple[int, Optional[str], bool]:
+        """
+        청크 1개 발송 (풀 스레드, 재시도 포함)
+        Returns: (발송 건수, 오류 메시지, 재시도 가능 여부)
+        """
+        customer_ids = data_cache.ids_for_keys(keys)
+        batch_id = f"{job['campaign_id']}-{job['chunk_index']}"
+        
+        for attempt in range(1, self.max_retries + 2):
+            self.rate_limiter.acquire(len(customer_ids))
+            try:
+                return self.gateway.send_batch(job['campaign_id'], batch_id, customer_ids, text), None, True
+            except GatewayError as e:
+                if not e.retryable or attempt > self.max_retries:
+                    return 0, str(e), e.retryable
+                # 지수 백오프 + 지터 (동시에 실패한 배치가 한꺼번에 재시도하지 않도록)
+                time.sleep(self.retry_base_seconds * 2 ** (attempt - 1) * (0.5 + random.random()))
+
+
+# 싱글톤 인스턴스
+send_pipeline = SendPipeline()
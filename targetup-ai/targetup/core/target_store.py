@@ -0,0 +1,169 @@
+"""
+TargetUP AI - Target Store
+캠페인 타겟 저장 (정렬된 int32 고객 키, 델타 + zlib 압축) 및 스트리밍 내보내기
+
+타겟 파일은 고객 키 배열의 해시로 이름을 정해 같은 타겟을 공유 (참조 수는 CampaignDB)
+
+저장 시 문자열 customer_id로 변환하지 않고, 내보내기 요청 시에만
+청크 단위로 ID 변환 → CSV/Parquet 바이트 생성
+"""
+import io
+import os
+import struct
+import zlib
+import hashlib
+import threading
+from pathlib import Path
+from typing import Iterator, Tuple, Union
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .data_store import data_cache
+
+
+# 타겟 파일 형식
+KEYS_MAGIC = b'TGK1'
+KEYS_SUFFIX = '.tgk'
+
+# 내보내기 형식 → (MIME, 확장자)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# 내보내기 청크 크기 (고객 수)
+EXPORT_CHUNK_SIZE = 100_000
+
+
+def normalize_keys(customer_keys: np.ndarray) -> np.ndarray:
+    """정렬 + 중복 제거된 int32 고객 키 (이미 정렬돼 있으면 복사만)"""
+    keys = np.asarray(customer_keys, dtype=np.int32)
+    if len(keys) > 1 and not (keys[1:] > keys[:-1]).all():
+        keys = np.unique(keys)
+    return keys
+
+
+def keys_hash(keys: np.ndarray) -> str:
+    """정렬된 고객 키 내용 해시 (저장 파일명)"""
+    return hashlib.sha256(np.ascontiguousarray(keys, dtype='<i4').tobytes()).hexdigest()
+
+
+def encode_keys(keys: np.ndarray) -> bytes:
+    """
+    정렬된 고객 키 → 델타 인코딩 + zlib 압축 바이트
+
+    델타(첫 값은 그대로)를 최대값에 맞는 가장 작은 부호 없는 정수형으로 저장
+    헤더: MAGIC(4) + 델타 바이트 폭(1) + 개수(uint32)
+    """
+    deltas = np.diff(keys.astype(np.int64), prepend=0)
+    max_delta = int(deltas.max()) if len(deltas) else 0
+    dtype = next(t for t in (np.uint8, np.uint16, np.uint32) if max_delta <= np.iinfo(t).max)
+    header = KEYS_MAGIC + struct.pack('<BI', np.dtype(dtype).itemsize, len(keys))
+    return header + zlib.compress(deltas.astype(dtype).tobytes(), 6)
+
+
+def decode_keys(data: bytes) -> np.ndarray:
+    """encode_keys 역변환"""
+    if data[:4] != KEYS_MAGIC:
+        raise ValueError("타겟 파일 형식이 올바르지 않습니다")
+    width, count = struct.unpack('<BI', data[4:9])
+    dtype = {1: np.uint8, 2: np.uint16, 4: np.uint32}[width]
+    deltas = np.frombuffer(zlib.decompress(data[9:]), dtype=dtype, count=count)
+    return np.cumsum(deltas, dtype=np.int64).astype(np.int32)
+
+
+def object_path(targets_dir: Path, digest: str) -> Path:
+    """내용 해시 → 저장 경로"""
+    return targets_dir / f"{digest}{KEYS_SUFFIX}"
+
+
+def save_keys(targets_dir: Path, customer_keys: np.ndarray) -> Tuple[str, Path, int, int]:
+    """
+    고객 키를 내용 주소 방식으로 저장
+
+    같은 타겟은 같은 파일을 공유하므로 이미 있으면 쓰지 않고 수정 시각만 갱신
+    (참조 등록 전 정리 대상에서 제외되도록 - CampaignDB.gc_targets)
+    Returns: (해시, 경로, 고객 수, 파일 크기) - 크기는 인코딩 결과 기준
+             (동시 삭제로 파일이 사라져도 stat 없이 사용)
+    """
+    keys = normalize_keys(customer_keys)
+    digest = keys_hash(keys)
+    path = object_path(targets_dir, digest)
+    data = encode_keys(keys)
+    try:
+        os.utime(path)
+        exists = True
+    except FileNotFoundError:
+        exists = False
+    if not exists:
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return digest, path, len(keys), len(data)
+
+
+def load_keys(path: Union[str, Path]) -> np.ndarray:
+    """저장된 고객 키 로드 (정렬된 int32, 이전 .npz 형식 포함)"""
+    if str(path).endswith('.npz'):
+        with np.load(path) as data:
+            return data['keys']
+    with open(path, 'rb') as f:
+        return decode_keys(f.read())
+
+
+def iter_csv(customer_keys: np.ndarray, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """고객 키 → CSV 바이트 청크 (헤더 포함)"""
+    yield b'customer_id\n'
+    for start in range(0, len(customer_keys), chunk_size):
+        ids = data_cache.ids_for_keys(customer_keys[start:start + chunk_size])
+        yield ('\n'.join(ids) + '\n').encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """ParquetWriter 출력 버퍼 (쓴 만큼 꺼내 가는 append-only 파일)"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_parquet(customer_keys: np.ndarray, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """고객 키 → Parquet 바이트 청크 (청크마다 row group 1개)"""
+    sink = _ChunkSink()
+    schema = pa.schema([('customer_id', pa.string())])
+    with pq.ParquetWriter(sink, schema) as writer:
+        for start in range(0, len(customer_keys), chunk_size):
+            ids = data_cache.ids_for_keys(customer_keys[start:start + chunk_size])
+            writer.write_table(pa.table({'customer_id': pa.array(ids, type=pa.string())}, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
+
+
+def iter_export(customer_keys: np.ndarray, fmt: str = 'csv',
+                chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """내보내기 형식별 바이트 청크 생성기"""
+    if fmt == 'csv':
+        return iter_csv(customer_keys, chunk_size)
+    if fmt == 'parquet':
+        return iter_parquet(customer_keys, chunk_size)
+    raise ValueError(f"지원하지 않는 내보내기 형식: {fmt}")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+TargetUP AI - Data Generation Benchmark
+합성 데이터 생성 속도 측정
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 경로 설정
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_DIR = SCRIPT_DIR.parent
+
+sys.path.insert(0, str(PROJECT_DIR))
+
+from core.data_store import generate_customers, generate_purchases, _format_ids
+
+
+def make_customers(n: int, seed: int = 42) -> pd.DataFrame:
+    """구매 생성에 필요한 최소 고객 컬럼 (customer_id, joined_at)"""
+    rng = np.random.default_rng(seed)
+    today = np.datetime64(pd.Timestamp.now().date(), 'D')
+    joined_at = (today - rng.integers(0, 365 * 5, n)).astype('datetime64[ns]')
+    return pd.DataFrame({
+        'customer_id': _format_ids('C', np.arange(1, n + 1), 7),
+        'joined_at': joined_at,
+    })
+
+
+def bench_customers(n: int, seed: int = 42) -> float:
+    """고객 n명 생성 시간 (초)"""
+    start = time.perf_counter()
+    customers_df = generate_customers(n=n, seed=seed)
+    elapsed = time.perf_counter() - start
+
+    print(f"[customers] {len(customers_df):,}명: {elapsed:.2f}s "
+          f"({len(customers_df) / elapsed:,.0f} rows/s)")
+    return elapsed
+
+
+def bench_purchases(rows: int, seed: int = 42) -> float:
+    """구매 rows건 생성 시간 (초)"""
+    # 고객당 평균 4건 → rows/4 고객
+    customers_df = make_customers(max(rows // 4, 1), seed)
+
+    start = time.perf_counter()
+    purchases_df = generate_purchases(customers_df, min_purchases=rows, seed=seed)
+    elapsed = time.perf_counter() - start
+
+    print(f"[purchases] {len(purchases_df):,}건: {elapsed:.2f}s "
+          f"({len(purchases_df) / elapsed:,.0f} rows/s)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TargetUP AI 데이터 생성 벤치마크")
+    parser.add_argument('--rows', type=int, nargs='+', default=[2_000_000, 20_000_000],
+                        help='구매 건수 (기본: 2M 20M)')
+    parser.add_argument('--customers', type=int, nargs='+', default=[500_000, 10_000_000],
+                        help='고객 수 (기본: 0.5M 10M)')
+    parser.add_argument('--seed', type=int, default=42)
+
+    args = parser.parse_args()
+
+    for n in args.customers:
+        bench_customers(n, args.seed)
+
+    for rows in args.rows:
+        bench_purchases(rows, args.seed)
+
+
+if __name__ == "__main__":
+    main()
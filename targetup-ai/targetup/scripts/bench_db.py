@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+TargetUP AI - Campaign DB Benchmark
+N개 스레드가 동시에 캠페인 저장/목록/상태 변경을 할 때 처리량과 지연 측정
+(임시 디렉토리에 DB를 만들어 실제 campaigns.db는 건드리지 않음)
+"""
+import sys
+import time
+import random
+import sqlite3
+import tempfile
+import argparse
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+import numpy as np
+
+# 경로 설정
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_DIR = SCRIPT_DIR.parent
+
+sys.path.insert(0, str(PROJECT_DIR))
+
+from core.data_store import data_cache
+from core.campaign_db import CampaignDB
+from core.models import FilterSpec
+
+OPERATIONS = ('save', 'list', 'update')
+
+
+def worker(db: CampaignDB, ops: int, target_size: int, seed: int,
+           latencies: dict, errors: list, saved_ids: list):
+    """저장 1 : 목록 2 : 상태 변경 1 비율로 반복"""
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    n = data_cache.n_customers
+
+    for i in range(ops):
+        op = rng.choice(('save', 'list', 'list', 'update'))
+        if op == 'update' and not saved_ids:
+            op = 'save'
+
+        start = time.perf_counter()
+        try:
+            if op == 'save':
+                keys = np.sort(np_rng.choice(n, size=min(target_size, n), replace=False)).astype(np.int32)
+                campaign_id = db.save_campaign(
+                    user_prompt=f"bench {seed}-{i}",
+                    send_at=datetime.now() + timedelta(days=rng.randint(1, 30)),
+                    spec=FilterSpec(),
+                    total_count=len(keys),
+                    customer_keys=keys,
+                    selected_variant_id='A',
+                    sms_text='벤치마크 SMS',
+                    lms_text='벤치마크 LMS',
+                )
+                saved_ids.append(campaign_id)
+            elif op == 'list':
+                db.get_all_campaigns(limit=20)
+            else:
+                db.update_status(rng.choice(saved_ids), rng.choice(('scheduled', 'sent')))
+        except sqlite3.OperationalError as e:
+            errors.append(str(e))
+            continue
+        latencies[op].append(time.perf_counter() - start)
+
+
+def bench(threads: int, ops: int, target_size: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CampaignDB(db_path=Path(tmp) / "bench.db", targets_dir=Path(tmp) / "targets")
+        latencies = {op: [] for op in OPERATIONS}
+        errors, saved_ids = [], []
+
+        workers = [
+            threading.Thread(target=worker, args=(db, ops, target_size, seed, latencies, errors, saved_ids))
+            for seed in range(threads)
+        ]
+        start = time.perf_counter()
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        elapsed = time.perf_counter() - start
+        db.close()
+
+    done = sum(len(v) for v in latencies.values())
+    print(f"[db] {threads:>2}스레드 | {done:,}건 {elapsed:.2f}s | {done / elapsed:,.0f} ops/s | 오류 {len(errors)}건")
+    for op in OPERATIONS:
+        if latencies[op]:
+            ms = np.array(latencies[op]) * 1000
+            print(f"     {op:<6} {len(ms):>5}건 | p50 {np.percentile(ms, 50):.2f}ms | p99 {np.percentile(ms, 99):.2f}ms")
+    for message in sorted(set(errors)):
+        print(f"     ⚠️ {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TargetUP AI 캠페인 DB 동시성 벤치마크")
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16],
+                        help='동시 스레드 수 (여러 개 지정 가능)')
+    parser.add_argument('--ops', type=int, default=200, help='스레드당 작업 수')
+    parser.add_argument('--target-size', type=int, default=10_000, help='저장 캠페인 타겟 고객 수')
+
+    args = parser.parse_args()
+
+    data_cache.load()
+    for threads in args.threads:
+        bench(threads, args.ops, args.target_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+TargetUP AI - Query Benchmark
+컴파일된 필터 계획 평가 속도 측정 (규모별)
+"""
+import sys
+import time
+import argparse
+import numpy as np
+from pathlib import Path
+
+# 경로 설정
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_DIR = SCRIPT_DIR.parent
+
+sys.path.insert(0, str(PROJECT_DIR))
+
+from core.data_store import (
+    generate_customers, generate_purchases, build_customer_categories, build_category_bitmaps
+)
+from core.filter_plan import build_customer_arrays, compile_filter, evaluate_many
+from core.query_engine import QueryParser
+from core import bitmap
+from core.models import FilterSpec, REGIONS
+
+PROMPTS = [
+    "2026-02-10 10시 서울 20대 여성 중 최근 12개월 구매했고 최근 6개월 미구매이며, 눈가케어+에센스 구매이력 고객",
+    "서울 경기 30~40대 여성 지성 민감성 최근 6개월 구매",
+    "부산 남성 선케어 또는 클렌징 구매이력",
+]
+
+
+def build(scale: float):
+    """규모별 타입 배열 + 카테고리 비트맵 (디스크 저장 없이 메모리에서 생성)"""
+    customers_df = generate_customers(scale=scale)
+    purchases_df = generate_purchases(customers_df, min_purchases=int(2_000_000 * scale))
+    categories_df = build_customer_categories(purchases_df)
+    del purchases_df
+    return build_customer_arrays(customers_df), build_category_bitmaps(customers_df, categories_df)
+
+
+def bench(scale: float, repeat: int):
+    arrays, category_bitmaps = build(scale)
+    n = len(arrays['birth_year'])
+    parser = QueryParser()
+
+    for prompt in PROMPTS:
+        spec, _ = parser.parse(prompt)
+        plan = compile_filter(spec)
+        plan.evaluate(arrays, category_bitmaps)  # 워밍업
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            mask = plan.evaluate(arrays, category_bitmaps)
+        elapsed = (time.perf_counter() - start) / repeat
+
+        print(f"[filter] {n:,}명 | {int(mask.sum()):,}명 매칭 | {elapsed * 1000:.2f}ms | {prompt[:30]}...")
+
+
+def grid_specs():
+    """지역(17) × 연령대(5) 그리드 세그먼트 (여성, 최근 12개월 구매)"""
+    return [
+        FilterSpec(gender='F', regions=[region], age_min=age, age_max=age + 9,
+                   purchased_within_months=12)
+        for region in REGIONS
+        for age in (20, 30, 40, 50, 60)
+    ]
+
+
+def bench_grid(scale: float):
+    """스펙별 개별 평가 vs evaluate_many 일괄 평가"""
+    arrays, category_bitmaps = build(scale)
+    n = len(arrays['birth_year'])
+    plans = [compile_filter(spec) for spec in grid_specs()]
+
+    start = time.perf_counter()
+    loop_counts = [int(plan.evaluate(arrays, category_bitmaps).sum()) for plan in plans]
+    loop_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bitmaps = evaluate_many(plans, arrays, category_bitmaps)
+    many_counts = [bitmap.popcount(b) for b in bitmaps]
+    many_elapsed = time.perf_counter() - start
+
+    assert loop_counts == many_counts
+    print(f"[grid] {n:,}명 | {len(plans)}개 세그먼트 | 개별 {loop_elapsed * 1000:.1f}ms | "
+          f"일괄 {many_elapsed * 1000:.1f}ms | {loop_elapsed / many_elapsed:.1f}x")
+
+
+def bench_overlap(scale: float, k: int = 50):
+    """세그먼트 k개 쌍별 교집합 행렬 + 합집합"""
+    arrays, category_bitmaps = build(scale)
+    n = len(arrays['birth_year'])
+    plans = [compile_filter(spec) for spec in grid_specs()[:k]]
+    bitmaps = evaluate_many(plans, arrays, category_bitmaps)
+
+    start = time.perf_counter()
+    matrix, union = bitmap.overlap_counts(bitmaps)
+    elapsed = time.perf_counter() - start
+
+    print(f"[overlap] {n:,}명 | {len(bitmaps)}개 세그먼트 | 합집합 {union:,}명 | "
+          f"최대 교집합 {int((matrix - np.diag(np.diag(matrix))).max()):,}명 | {elapsed * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TargetUP AI 필터 벤치마크")
+    parser.add_argument('--scale', type=float, nargs='+', default=[1, 20],
+                        help='데이터 규모 배수 (기본: 1=50만, 20=1,000만)')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--grid', action='store_true', help='그리드 세그먼트 일괄 평가 비교')
+    parser.add_argument('--overlap', action='store_true', help='세그먼트 중복 행렬 계산')
+
+    args = parser.parse_args()
+
+    for scale in args.scale:
+        if args.grid:
+            bench_grid(scale)
+        elif args.overlap:
+            bench_overlap(scale)
+        else:
+            bench(scale, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+TargetUP AI - Multi-process Dispatch Demo
+임시 DB에 캠페인을 만들고 발송 워커(run_scheduler.py) 여러 개를 띄워
+청크 작업이 나눠 처리되는지, 강제 종료된 워커의 리스가 회수되는지 확인
+
+사용법:
+    python scripts/demo_dispatch.py --workers 3 --campaigns 4 --size 50000
+    python scripts/demo_dispatch.py --no-kill    # 워커 강제 종료 없이
+"""
+import os
+import sys
+import time
+import signal
+import tempfile
+import argparse
+import subprocess
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 경로 설정
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_DIR = SCRIPT_DIR.parent
+
+sys.path.insert(0, str(PROJECT_DIR))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TargetUP AI 멀티 프로세스 발송 데모")
+    parser.add_argument('--workers', type=int, default=3, help='발송 워커 프로세스 수')
+    parser.add_argument('--campaigns', type=int, default=4, help='캠페인 수')
+    parser.add_argument('--size', type=int, default=50_000, help='캠페인당 타겟 고객 수')
+    parser.add_argument('--no-kill', action='store_true',
+                        help='첫 워커가 청크를 리스하면 SIGKILL하는 동작 끄기')
+    parser.add_argument('--lease', type=float, default=2.0, help='청크 리스 시간(초)')
+
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp(prefix="targetup_dispatch_"))
+    env = dict(
+        os.environ,
+        CAMPAIGN_DB_PATH=str(tmp / "campaigns.db"),
+        CAMPAIGN_TARGETS_DIR=str(tmp / "targets"),
+        SEND_LEASE_SECONDS=str(args.lease),
+        SEND_STUB_LATENCY=os.getenv('SEND_STUB_LATENCY', '0.05'),
+        SEND_RATE_LIMIT=os.getenv('SEND_RATE_LIMIT', '0'),
+        ENABLE_RAG='false',
+    )
+    os.environ.update(env)
+
+    # 환경변수 설정 후 임포트 (임시 DB 사용)
+    import numpy as np
+    from core.campaign_db import campaign_db
+    from core.data_store import data_cache
+    from core.models import FilterSpec
+
+    n = data_cache.n_customers
+    rng = np.random.default_rng(0)
+    send_at = datetime.now() + timedelta(seconds=1)
+    ids = []
+    for i in range(args.campaigns):
+        keys = np.sort(rng.choice(n, size=min(args.size, n), replace=False)).astype(np.int32)
+        ids.append(campaign_db.save_campaign(
+            f"demo {i}", send_at, FilterSpec(), len(keys), keys, 'A', '데모 문자', '데모 LMS'
+        ))
+    print(f"[데모] 캠페인 {len(ids)}개 × {args.size:,}명 예약 → {tmp}")
+
+    logs = [open(tmp / f"worker_{i}.log", 'w') for i in range(args.workers)]
+    workers = [
+        subprocess.Popen([sys.executable, str(SCRIPT_DIR / "run_scheduler.py"), '--poll', '0.2'],
+                         env=env, stdout=log, stderr=subprocess.STDOUT)
+        for log in logs
+    ]
+    print(f"[데모] 워커 {args.workers}개 시작")
+
+    start = time.time()
+    killed = args.no_kill
+    victim = f":{workers[0].pid}:"  # 워커 owner = 호스트:pid:임의값
+    while True:
+        time.sleep(0.05 if not killed else 0.2)
+        if not killed:
+            held = [c for i in ids for c in campaign_db.get_send_chunks(i)
+                    if c['status'] == 'leased' and victim in (c['owner'] or '')]
+            if held:
+                workers[0].send_signal(signal.SIGKILL)
+                killed = True
+                print(f"[데모] 워커 0 강제 종료 (pid {workers[0].pid}, 리스 중인 청크 {len(held)}개) "
+                      f"- 리스 만료 후 다른 워커가 회수")
+        statuses = [campaign_db.get_campaign(i).status for i in ids]
+        if all(s in ('sent', 'failed') for s in statuses):
+            break
+        if time.time() - start > 120:
+            print("[데모] 시간 초과")
+            break
+    elapsed = time.time() - start
+
+    for w in workers:
+        if w.poll() is None:
+            w.send_signal(signal.SIGTERM)
+    for w in workers:
+        w.wait()
+    for log in logs:
+        log.close()
+
+    # 결과: 청크는 모두 한 번씩 done, 워커별 처리량과 재할당(attempts > 1) 수
+    chunks = [c for i in ids for c in campaign_db.get_send_chunks(i)]
+    total = sum(c['n_messages'] for c in chunks if c['status'] == 'done')
+    print(f"[데모] 완료 {elapsed:.1f}s | 상태 {Counter(statuses)} | 발송 {total:,}건 "
+          f"({total / elapsed:,.0f}건/s)")
+    print(f"[데모] 청크 {len(chunks)}개 | 상태 {Counter(c['status'] for c in chunks)} | "
+          f"재할당 {sum(c['attempts'] > 1 for c in chunks)}개")
+    for owner, count in sorted(Counter(c['owner'] for c in chunks).items(), key=str):
+        print(f"     {owner}: 청크 {count}개")
+    for i in ids:
+        progress = campaign_db.get_send_progress(i)
+        print(f"     #{i}: {progress['sent']:,}건 | {progress['throughput']:,.0f}건/s")
+    print(f"[데모] 워커 로그: {tmp}/worker_*.log")
+
+
+if __name__ == "__main__":
+    main()
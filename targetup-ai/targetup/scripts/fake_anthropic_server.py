@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+TargetUP AI - Fake Anthropic Server
+로컬 Messages API(/v1/messages) 흉내 서버 (API 키/과금 없이 LLM 클라이언트 확인용)
+
+사용법:
+    python scripts/fake_anthropic_server.py --port 8765 --fail-rate 0.3
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 ANTHROPIC_API_KEY=sk-ant-fake streamlit run app.py
+
+    클라이언트 동작 확인: python -m pytest tests/test_llm_client.py
+
+응답은 마지막 user 메시지를 되돌려 주고, --fail-rate 확률로 --fail-status 오류(retry-after 포함)를 반환
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# 경로 설정
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_DIR = SCRIPT_DIR.parent
+
+sys.path.insert(0, str(PROJECT_DIR))
+
+
+class FakeAnthropicServer(ThreadingHTTPServer):
+    """Messages API 흉내 서버 (요청 수/최대 동시 요청 수 집계)"""
+    
+    daemon_threads = True
+    
+    def __init__(self, port: int = 0, latency: float = 0.0, fail_rate: float = 0.0,
+                 fail_status: int = 529, retry_after: float = 0.0, fail_first: int = 0):
+        super().__init__(('127.0.0.1', port), FakeMessagesHandler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.retry_after = retry_after
+        self.fail_first = fail_first   # 처음 N개 요청은 무조건 실패
+        self.requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+    
+    def start(self) -> 'FakeAnthropicServer':
+        """백그라운드 스레드에서 서비스"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+    
+    def handle_error(self, request, client_address):
+        # 타임아웃으로 클라이언트가 먼저 끊은 연결은 무시
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeMessagesHandler(BaseHTTPRequestHandler):
+    """POST /v1/messages 처리"""
+    
+    protocol_version = "HTTP/1.1"  # keep-alive
+    
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get('content-length', 0))) or b'{}')
+        
+        if self.path != '/v1/messages':
+            return self._send(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+        if not self.headers.get('x-api-key'):
+            return self._send(401, {"type": "error", "error": {"type": "authentication_error", "message": "x-api-key 없음"}})
+        
+        with server._lock:
+            server.requests += 1
+            fail = server.requests <= server.fail_first or random.random() < server.fail_rate
+            server.failures += fail
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.latency)
+        finally:
+            with server._lock:
+                server.in_flight -= 1
+        
+        if fail:
+            headers = {'retry-after': str(server.retry_after)} if server.retry_after else {}
+            return self._send(server.fail_status,
+                              {"type": "error", "error": {"type": "overloaded_error", "message": "fake 과부하"}},
+                              headers)
+        
+        user_text = next((m['content'] for m in reversed(body.get('messages', []))
+                          if m.get('role') == 'user' and isinstance(m.get('content'), str)), '')
+        self._send(200, {
+            "id": f"msg_fake_{server.requests}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get('model', ''),
+            "content": [{"type": "text", "text": f"echo: {user_text}"}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": len(user_text), "output_tokens": len(user_text) + 6},
+        })
+    
+    def _send(self, status: int, payload: dict, headers: dict = None):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('content-type', 'application/json')
+        self.send_header('content-length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TargetUP AI 로컬 Anthropic API 흉내 서버")
+    parser.add_argument('--port', type=int, default=8765, help='포트')
+    parser.add_argument('--latency', type=float, default=0.2, help='응답 지연(초)')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='오류 응답 확률')
+    parser.add_argument('--fail-status', type=int, default=529, help='오류 응답 상태 코드 (429, 5xx 등)')
+    parser.add_argument('--retry-after', type=float, default=0.0, help='오류 응답 retry-after(초, 0 = 헤더 없음)')
+    
+    args = parser.parse_args()
+    
+    server = FakeAnthropicServer(args.port, args.latency, args.fail_rate, args.fail_status, args.retry_after)
+    print(f"[fake] {server.base_url}/v1/messages (Ctrl+C로 종료)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -31,6 +31,17 @@ def reset_data():
             os.remove(f)
             print(f"삭제됨: {f}")
     
+    # 메모리 매핑 컬럼 스토어, 증분 구매 배치
+    for d in [DATA_DIR / "columns", DATA_DIR / "purchase_batches"]:
+        if d.exists():
+            shutil.rmtree(d)
+            print(f"삭제됨: {d}")
+    
+    watermark_path = DATA_DIR / "watermark.json"
+    if watermark_path.exists():
+        os.remove(watermark_path)
+        print(f"삭제됨: {watermark_path}")
+    
     print("데이터 파일 초기화 완료. 다음 실행 시 재생성됩니다.")
 
 
@@ -59,12 +70,12 @@ def reset_all():
     print("전체 초기화 완료.")
 
 
-def regenerate_data():
+def regenerate_data(scale=None):
     """데이터 강제 재생성"""
     from core.data_store import load_or_generate_data
     
     print("데이터 재생성을 시작합니다...")
-    load_or_generate_data(force_regenerate=True)
+    load_or_generate_data(force_regenerate=True, scale=scale)
     print("데이터 재생성 완료!")
 
 
@@ -74,6 +85,8 @@ def main():
     parser.add_argument('--db', action='store_true', help='DB만 삭제')
     parser.add_argument('--all', action='store_true', help='전체 삭제 (data 폴더)')
     parser.add_argument('--regenerate', action='store_true', help='데이터 강제 재생성')
+    parser.add_argument('--scale', type=float, default=None,
+                        help='재생성 규모 배수 (1=50만, 10=500만, 100=5,000만 고객)')
     
     args = parser.parse_args()
     
@@ -86,7 +99,7 @@ def main():
     elif args.db:
         reset_db()
     elif args.regenerate:
-        regenerate_data()
+        regenerate_data(args.scale)
     else:
         parser.print_help()
 
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+TargetUP AI - Scheduler Service
+예약 캠페인 발송 워커 (Streamlit과 별도 프로세스로 실행)
+
+사용법:
+    python scripts/run_scheduler.py           # 계속 실행 (Ctrl+C로 종료)
+    python scripts/run_scheduler.py --once    # 지금 발송 시각이 된 캠페인만 처리
+
+여러 개를 띄워도 캠페인은 scheduled → sending 선점에 성공한 워커 하나만 발송
+"""
+import sys
+import signal
+import argparse
+import threading
+from pathlib import Path
+
+# 경로 설정
+SCRIPT_DIR = Path(__file__).parent
+PROJECT_DIR = SCRIPT_DIR.parent
+
+sys.path.insert(0, str(PROJECT_DIR))
+
+from core.scheduler import scheduler, SCHEDULER_POLL_SECONDS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TargetUP AI 예약 발송 워커")
+    parser.add_argument('--once', action='store_true', help='발송 시각이 된 캠페인만 처리하고 종료')
+    parser.add_argument('--poll', type=float, default=SCHEDULER_POLL_SECONDS,
+                        help=f'DB 변경 확인 주기(초, 기본: {SCHEDULER_POLL_SECONDS})')
+
+    args = parser.parse_args()
+
+    if args.once:
+        results = scheduler.process_due_campaigns()
+        print(f"[스케줄러] {len(results)}건 처리")
+        return
+
+    stop_event = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop_event.set())
+
+    scheduler.run_forever(stop_event, poll_interval=args.poll)
+
+
+if __name__ == "__main__":
+    main()
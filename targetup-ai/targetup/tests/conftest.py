@@ -0,0 +1,67 @@
+"""
+TargetUP AI - 테스트 공용 fixture
+임시 디렉토리의 소규모 고객/구매 데이터와 컬럼 스토어
+"""
+import sys
+import importlib
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+data_store = importlib.import_module('core.data_store')
+column_store = importlib.import_module('core.column_store')
+
+
+def data_paths(data_dir: Path) -> dict:
+    """data_store 모듈 경로 상수 → 임시 디렉토리 경로"""
+    return {
+        'DATA_DIR': data_dir,
+        'CUSTOMERS_PATH': data_dir / "customers.parquet",
+        'PURCHASES_PATH': data_dir / "purchases.parquet",
+        'CUSTOMER_STATS_PATH': data_dir / "customer_stats.parquet",
+        'CUSTOMER_CATEGORIES_PATH': data_dir / "customer_categories.parquet",
+        'PURCHASE_BATCHES_DIR': data_dir / "purchase_batches",
+        'WATERMARK_PATH': data_dir / "watermark.json",
+    }
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """임시 디렉토리에 소규모 원본/마트/컬럼 스토어 생성"""
+    paths = data_paths(tmp_path)
+    for name, value in paths.items():
+        monkeypatch.setattr(data_store, name, value)
+    monkeypatch.setattr(data_store, 'COLUMN_STORE_SOURCES', [
+        paths['CUSTOMERS_PATH'], paths['CUSTOMER_CATEGORIES_PATH'], paths['PURCHASES_PATH']
+    ])
+    monkeypatch.setattr(data_store, 'TABLE_PATHS', {
+        'customers': paths['CUSTOMERS_PATH'],
+        'purchases': paths['PURCHASES_PATH'],
+        'customer_stats': paths['CUSTOMER_STATS_PATH'],
+        'customer_categories': paths['CUSTOMER_CATEGORIES_PATH'],
+    })
+    monkeypatch.setattr(column_store, 'COLUMNS_DIR', tmp_path / "columns")
+    monkeypatch.setattr(column_store, 'MANIFEST_PATH', tmp_path / "columns" / "manifest.json")
+    
+    customers_df = data_store.generate_customers(n=2_000, seed=1)
+    purchases_df = data_store.generate_purchases(customers_df, min_purchases=8_000, seed=1)
+    customers_df.to_parquet(paths['CUSTOMERS_PATH'], index=False)
+    purchases_df.to_parquet(paths['PURCHASES_PATH'], index=False)
+    data_store.build_customer_stats(customers_df, purchases_df).to_parquet(
+        paths['CUSTOMER_STATS_PATH'], index=False
+    )
+    categories_df = data_store.build_customer_categories(purchases_df)
+    categories_df.to_parquet(paths['CUSTOMER_CATEGORIES_PATH'], index=False)
+    data_store.build_column_store(customers_df, categories_df, purchases_df)
+    return customers_df, purchases_df
+
+
+@pytest.fixture
+def cache(store, monkeypatch):
+    """임시 스토어를 로드한 data_cache (테스트 후에는 다시 로드되도록 _loaded 복원)"""
+    data_cache = data_store.data_cache
+    monkeypatch.setattr(data_cache, '_loaded', False)
+    data_cache.load()
+    return data_cache
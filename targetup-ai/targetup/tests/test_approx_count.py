@@ -0,0 +1,104 @@
+"""
+TargetUP AI - 근사 모수 테스트
+층화 표본 추정의 95% 신뢰구간이 정확한 모수를 포함하는지, 표본보다 작은 모집단은 전수인지
+
+실행: python -m pytest tests
+"""
+import importlib
+from datetime import date
+
+import numpy as np
+import pytest
+
+approx_count = importlib.import_module('core.approx_count')
+filter_plan = importlib.import_module('core.filter_plan')
+from core.models import FilterSpec
+
+REFERENCE_DATE = date(2026, 3, 31)
+CURRENT_YEAR = 2026
+
+# 고객 2,000명 중 표본 크기
+SAMPLE_SIZE = 800
+
+# 층(성별 × 지역)과 무관한 조건 - 표본 오차가 있음
+SAMPLED_SPECS = [
+    {'gender': 'M', 'age_min': 20, 'age_max': 39},
+    {'skin_types': ['건성'], 'age_min': 30},
+    {'categories': ['에센스']},
+    {'categories': ['에센스', '선케어'], 'category_mode': 'ANY'},
+    {'purchased_within_months': 6},
+]
+
+# 층 조건만 - 층별 비율이 0 또는 1이라 오차 없이 정확
+STRATA_SPECS = [
+    {'gender': 'F'},
+    {'regions': ['서울', '경기']},
+]
+
+# 신뢰구간 포함 확인 시드 수 / 최소 포함 비율 (명목 95%)
+COVERAGE_SEEDS = 40
+MIN_COVERAGE = 0.8
+
+
+def plan_for(**kwargs) -> filter_plan.FilterPlan:
+    spec = FilterSpec(as_of_date=REFERENCE_DATE, **kwargs)
+    return filter_plan.compile_filter(spec, current_year=CURRENT_YEAR)
+
+
+def exact_count(cache, plan) -> int:
+    return int(plan.evaluate(cache.arrays, cache.category_bitmaps, cache.event_index).sum())
+
+
+@pytest.fixture
+def sample(cache):
+    return approx_count.StratifiedSample(
+        cache.arrays, cache.category_bitmaps, cache.event_index, sample_size=SAMPLE_SIZE, seed=7
+    )
+
+
+def test_sample_is_proportional_subset(cache, sample):
+    stats = sample.stats()
+    assert stats['population'] == len(cache.arrays['birth_year'])
+    # 층마다 반올림 + 최소 1명이라 표본 크기는 근사
+    assert abs(stats['sample_size'] - SAMPLE_SIZE) <= stats['strata']
+    assert not sample.exact
+    assert (sample.sizes <= sample.population).all()
+    assert (np.diff(sample.positions) > 0).all()
+
+
+@pytest.mark.parametrize('spec_kwargs', SAMPLED_SPECS)
+def test_estimate_interval_contains_exact_count(cache, spec_kwargs):
+    plan = plan_for(**spec_kwargs)
+    exact = exact_count(cache, plan)
+    assert 0 < exact < len(cache.arrays['birth_year'])
+    
+    covered = 0
+    for seed in range(COVERAGE_SEEDS):
+        result = approx_count.StratifiedSample(
+            cache.arrays, cache.category_bitmaps, cache.event_index, sample_size=SAMPLE_SIZE, seed=seed
+        ).estimate(plan)
+        assert not result.exact
+        assert result.error > 0
+        assert result.format().startswith('≈')
+        covered += result.estimate - result.error <= exact <= result.estimate + result.error
+    assert covered >= MIN_COVERAGE * COVERAGE_SEEDS
+
+
+@pytest.mark.parametrize('spec_kwargs', STRATA_SPECS)
+def test_strata_only_estimate_has_no_error(cache, sample, spec_kwargs):
+    plan = plan_for(**spec_kwargs)
+    result = sample.estimate(plan)
+    assert result == approx_count.ApproxCount(exact_count(cache, plan), 0, exact=False)
+
+
+@pytest.mark.parametrize('sample_size', [2_000, 10_000])
+def test_population_not_larger_than_sample_is_exact(cache, sample_size):
+    sample = approx_count.StratifiedSample(
+        cache.arrays, cache.category_bitmaps, cache.event_index, sample_size=sample_size
+    )
+    assert sample.exact
+    for spec_kwargs in SAMPLED_SPECS + STRATA_SPECS:
+        plan = plan_for(**spec_kwargs)
+        result = sample.estimate(plan)
+        assert result == approx_count.ApproxCount(exact_count(cache, plan), 0, exact=True)
+        assert result.format() == f"{result.estimate:,}명"
@@ -0,0 +1,122 @@
+"""
+TargetUP AI - 캠페인 DB 테스트
+스레드별 연결 정리, 타겟 파일 저장(쓰기 잠금 밖) / 빈도 제한 재확인 / 참조 없는 파일 정리
+
+실행: python -m pytest tests
+"""
+import sqlite3
+import threading
+import importlib
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+campaign_db_module = importlib.import_module('core.campaign_db')
+target_store = importlib.import_module('core.target_store')
+from core.models import FilterSpec, FrequencyCap
+
+
+@pytest.fixture
+def db(cache, tmp_path):
+    """임시 캠페인 DB"""
+    db = campaign_db_module.CampaignDB(db_path=tmp_path / "campaigns.db", targets_dir=tmp_path / "targets")
+    yield db
+    db.close()
+
+
+def test_connections_of_finished_threads_are_closed(db):
+    opened = []
+    
+    def rerun():
+        # Streamlit rerun처럼 매번 새 스레드에서 조회
+        opened.append(db.conn)
+        db.get_campaign_stats()
+    
+    for _ in range(5):
+        thread = threading.Thread(target=rerun)
+        thread.start()
+        thread.join()
+    
+    # 메인 스레드 연결 + 아직 다음 연결이 열리지 않은 마지막 rerun 스레드 연결만 남음
+    assert len(db._connections) == 2
+    for conn in opened[:-1]:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+    db.get_campaign_stats()
+    
+    db.close()
+    assert not db._connections
+
+
+def save(db, keys: np.ndarray, send_at: datetime, cap=None) -> int:
+    return db.save_campaign("테스트", send_at, FilterSpec(), len(keys), keys, 'A', '테스트 문자', '', cap)
+
+
+def test_target_file_is_written_outside_write_lock(db, monkeypatch):
+    save_keys = target_store.save_keys
+    in_transaction = []
+    
+    def recording_save_keys(targets_dir, customer_keys):
+        in_transaction.append(db.conn.in_transaction)
+        return save_keys(targets_dir, customer_keys)
+    monkeypatch.setattr(target_store, 'save_keys', recording_save_keys)
+    
+    send_at = datetime.now() + timedelta(days=1)
+    save(db, np.arange(100, dtype=np.int32), send_at)
+    save(db, np.arange(100, 200, dtype=np.int32), send_at, FrequencyCap(max_messages=1))
+    assert in_transaction == [False, False]
+
+
+def test_capped_save_rechecks_cap_inside_transaction(db, monkeypatch):
+    cap = FrequencyCap(max_messages=1, window_days=7)
+    send_at = datetime.now() + timedelta(days=1)
+    keys = np.arange(100, dtype=np.int32)
+    save_keys = target_store.save_keys
+    main_calls = []
+    
+    def racing_save_keys(targets_dir, customer_keys):
+        if threading.current_thread() is threading.main_thread():
+            main_calls.append(db.conn.in_transaction)
+            if len(main_calls) == 1:
+                # 미리 저장하는 사이 다른 세션이 앞 30명에게 먼저 예약
+                other = threading.Thread(target=save, args=(db, keys[:30], send_at, cap))
+                other.start()
+                other.join()
+        return save_keys(targets_dir, customer_keys)
+    monkeypatch.setattr(target_store, 'save_keys', racing_save_keys)
+    
+    campaign_id = save(db, keys, send_at, cap)
+    
+    # 잠금 안에서 다시 계산해 이미 찬 30명 제외, 바뀐 타겟만 다시 저장
+    assert main_calls == [False, True]
+    assert db.get_campaign(campaign_id).total_count == 70
+    np.testing.assert_array_equal(db.get_target_keys(campaign_id), keys[30:])
+    day = campaign_db_module.to_day_number(send_at.date())
+    assert db.get_window_send_counts(day, cap.window_days)[keys].max() == 1
+    
+    # 먼저 저장했던 100명 타겟 파일은 참조가 없어 정리 대상 (최근 파일은 남겨 둠)
+    orphan = target_store.object_path(db.targets_dir, target_store.keys_hash(keys))
+    assert orphan.exists()
+    assert db.gc_targets() == 0
+    assert db.gc_targets(min_age_seconds=0) == 1
+    assert not orphan.exists()
+    for campaign in db.get_all_campaigns():
+        assert db.get_target_keys(campaign.id) is not None
+
+
+def test_gc_keeps_reused_target_files(db):
+    send_at = datetime.now() + timedelta(days=1)
+    keys = np.arange(50, dtype=np.int32)
+    campaign_id = save(db, keys, send_at)
+    path = db.get_campaign(campaign_id).targets_path
+    assert db.delete_campaign(campaign_id)
+    assert not target_store.object_path(db.targets_dir, target_store.keys_hash(keys)).exists()
+    
+    # 참조 등록 전(트랜잭션 전) 파일은 최근 수정 시각으로 보호
+    target_store.save_keys(db.targets_dir, keys)
+    assert db.gc_targets() == 0
+    campaign_id = save(db, keys, send_at)
+    assert db.get_campaign(campaign_id).targets_path == path
+    assert db.gc_targets(min_age_seconds=0) == 0
+    np.testing.assert_array_equal(db.get_target_keys(campaign_id), keys)
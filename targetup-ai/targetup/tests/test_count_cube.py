@@ -0,0 +1,115 @@
+"""
+TargetUP AI - 고객 수 큐브 테스트
+큐브 모수 == 전체 비트맵 평가, 큐브로 답할 수 없는 조건은 None (비트맵으로 폴백)
+
+실행: python -m pytest tests
+"""
+import importlib
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from dateutil.relativedelta import relativedelta
+
+bitmap = importlib.import_module('core.bitmap')
+count_cube = importlib.import_module('core.count_cube')
+filter_plan = importlib.import_module('core.filter_plan')
+query_engine = importlib.import_module('core.query_engine')
+from core.models import FilterSpec
+
+# 월말 기준일 (3/31 - 1개월 = 2/28 같은 월 경계 확인)
+REFERENCE_DATE = date(2026, 3, 31)
+CURRENT_YEAR = 2026
+
+
+@pytest.fixture
+def edge_arrays(cache):
+    """
+    경계값을 심은 필터 배열 복사본
+    
+    - 최근 구매일: 버킷 경계(기준일 - m개월)와 그 전후 하루, 미구매
+    - 알 수 없는 성별/지역 코드
+    """
+    arrays = {name: np.array(values) for name, values in cache.arrays.items()}
+    edges = [filter_plan.NO_ORDER_DAY]
+    for months in (0, 1, 3, 12, count_cube.RECENCY_MONTHS, count_cube.RECENCY_MONTHS + 1):
+        cutoff = filter_plan.to_day_number(REFERENCE_DATE - relativedelta(months=months))
+        edges.extend([cutoff - 1, cutoff, cutoff + 1])
+    last_order_day = arrays['last_order_day']
+    last_order_day[:len(edges) * 10] = np.repeat(np.array(edges, dtype=last_order_day.dtype), 10)
+    arrays['gender_code'][-20:] = 200
+    arrays['region_code'][-40:-10] = 250
+    return arrays
+
+
+def plan_for(**kwargs) -> filter_plan.FilterPlan:
+    spec = FilterSpec(as_of_date=kwargs.pop('as_of_date', REFERENCE_DATE), **kwargs)
+    return filter_plan.compile_filter(spec, current_year=CURRENT_YEAR)
+
+
+CUBE_SPECS = [
+    {},
+    {'gender': 'F'},
+    {'gender': 'M', 'age_min': 20, 'age_max': 29},
+    {'age_min': 35},
+    {'regions': ['서울', '부산'], 'skin_types': ['건성']},
+    {'regions': ['없는지역']},
+    {'purchased_within_months': 1},
+    {'purchased_within_months': 3, 'gender': 'F'},
+    {'purchased_within_months': count_cube.RECENCY_MONTHS},
+    {'not_purchased_within_months': 1},
+    {'not_purchased_within_months': count_cube.RECENCY_MONTHS, 'regions': ['경기']},
+    {'purchased_within_months': 12, 'not_purchased_within_months': 3},
+    {'purchased_within_months': 3, 'not_purchased_within_months': 12},
+    {'categories': ['에센스']},
+    {'categories': ['에센스', '에센스'], 'gender': 'F', 'age_min': 30, 'age_max': 39},
+    {'categories': ['없는카테고리']},
+]
+
+
+@pytest.mark.parametrize('spec_kwargs', CUBE_SPECS)
+def test_cube_count_matches_bitmap_evaluation(cache, edge_arrays, spec_kwargs):
+    cube = count_cube.CountCube(edge_arrays, cache.category_bitmaps, reference_date=REFERENCE_DATE)
+    plan = plan_for(**spec_kwargs)
+    exact = int(plan.evaluate(edge_arrays, cache.category_bitmaps, cache.event_index).sum())
+    assert cube.count(plan) == exact
+
+
+FALLBACK_SPECS = [
+    # 카테고리별 구매 기간
+    {'category_windows': [{'category': '에센스', 'within_months': 3}]},
+    # 카테고리 2개 이상
+    {'categories': ['에센스', '선케어'], 'category_mode': 'ALL'},
+    {'categories': ['에센스', '선케어'], 'category_mode': 'ANY'},
+    # 카테고리 + 최근 구매 조건
+    {'categories': ['에센스'], 'purchased_within_months': 3},
+    # 기준일이 큐브와 달라 구매 기간 경계가 버킷과 맞지 않음
+    {'purchased_within_months': 2, 'as_of_date': REFERENCE_DATE - timedelta(days=10)},
+]
+
+
+@pytest.mark.parametrize('spec_kwargs', FALLBACK_SPECS)
+def test_cube_declines_unsupported_plans(cache, edge_arrays, spec_kwargs):
+    cube = count_cube.CountCube(edge_arrays, cache.category_bitmaps, reference_date=REFERENCE_DATE)
+    assert cube.count(plan_for(**spec_kwargs)) is None
+
+
+def test_query_engine_count_uses_cube_when_exact(cache):
+    engine = query_engine.QueryEngine()
+    today = date.today()
+    for spec in [
+        FilterSpec(gender='F', regions=['서울'], as_of_date=today),
+        FilterSpec(purchased_within_months=6, age_min=20, as_of_date=today),
+        FilterSpec(categories=['에센스'], skin_types=['지성'], as_of_date=today),
+    ]:
+        assert engine._cube_count(spec) is not None
+        plan = filter_plan.compile_filter(spec)
+        exact = int(plan.evaluate(cache.arrays, cache.category_bitmaps, cache.event_index).sum())
+        assert engine.count(spec) == exact
+    
+    # 폴백 경로도 같은 결과
+    spec = FilterSpec(categories=['에센스', '선케어'], category_mode='ALL', as_of_date=today)
+    assert engine._cube_count(spec) is None
+    assert engine.count(spec) == bitmap.popcount(bitmap.and_all(
+        [cache.category_bitmaps['에센스'], cache.category_bitmaps['선케어']]
+    ))
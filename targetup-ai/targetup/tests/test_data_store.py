@@ -0,0 +1,73 @@
+"""
+TargetUP AI - 증분 구매 반영 테스트
+전체 재생성과 증분 반영(append_purchases) 결과 비교
+
+실행: python -m pytest tests
+"""
+import importlib
+
+import numpy as np
+import pandas as pd
+
+data_store = importlib.import_module('core.data_store')
+column_store = importlib.import_module('core.column_store')
+
+
+def make_batch(customers_df: pd.DataFrame, purchases_df: pd.DataFrame, seed: int) -> pd.DataFrame:
+    """기존 구매와 같은 날짜/배치 안 같은 날짜가 섞인 신규 구매 배치"""
+    rng = np.random.default_rng(seed)
+    n = 3_000
+    # 절반은 기존 구매일 재사용 (동률 처리 확인), 나머지는 이후 날짜
+    reused = purchases_df['purchased_at'].sample(n // 2, replace=True, random_state=seed).to_numpy()
+    later = purchases_df['purchased_at'].max() + pd.to_timedelta(rng.integers(0, 5, n - n // 2), unit='D')
+    return pd.DataFrame({
+        'purchase_id': [f"B{seed}_{i:06d}" for i in range(n)],
+        'customer_id': customers_df['customer_id'].sample(n, replace=True, random_state=seed).to_numpy(),
+        'purchased_at': np.concatenate([reused, later.to_numpy()]),
+        'category': rng.choice(data_store.CATEGORIES, n),
+        'product': '테스트상품',
+        'amount': rng.integers(1, 100, n) * 1000,
+    })
+
+
+def test_incremental_matches_full_rebuild(store):
+    customers_df, purchases_df = store
+    batches = [make_batch(customers_df, purchases_df, seed) for seed in (2, 3)]
+    for batch_df in batches:
+        data_store.append_purchases(batch_df)
+    
+    all_purchases = pd.concat([purchases_df] + batches, ignore_index=True)
+    expected = data_store.build_customer_stats(customers_df, all_purchases)
+    actual = pd.read_parquet(data_store.CUSTOMER_STATS_PATH)
+    pd.testing.assert_frame_equal(
+        actual.reset_index(drop=True), expected.reset_index(drop=True), check_dtype=False
+    )
+    
+    expected_pairs = set(map(tuple, data_store.build_customer_categories(all_purchases).astype(str).to_numpy()))
+    actual_df = pd.read_parquet(data_store.CUSTOMER_CATEGORIES_PATH).astype(str)
+    assert not actual_df.duplicated().any()
+    assert set(map(tuple, actual_df.to_numpy())) == expected_pairs
+
+
+def test_reapply_batch_is_idempotent(store):
+    customers_df, purchases_df = store
+    batch_df = make_batch(customers_df, purchases_df, seed=4)
+    data_store.append_purchases(batch_df)
+    
+    def snapshot():
+        columns = column_store.open_column_store()
+        return (
+            pd.read_parquet(data_store.CUSTOMER_STATS_PATH),
+            pd.read_parquet(data_store.CUSTOMER_CATEGORIES_PATH),
+            {name: np.array(columns[name]) for name in data_store.EVENT_COLUMNS + ['category_bitmaps']},
+        )
+    
+    before = snapshot()
+    # 워터마크 기록 직전 중단 후 재시작한 것처럼 같은 배치 재적용
+    data_store._apply_purchase_batch(pd.read_parquet(data_store.list_purchase_batches()[0]), 1)
+    after = snapshot()
+    
+    pd.testing.assert_frame_equal(before[0], after[0])
+    pd.testing.assert_frame_equal(before[1], after[1])
+    for name, array in before[2].items():
+        np.testing.assert_array_equal(array, after[2][name])
@@ -0,0 +1,157 @@
+"""
+TargetUP AI - LLM 클라이언트 테스트
+로컬 fake Messages API 서버로 재시도/동시성/속도 제한/타임아웃/동기 파사드 확인
+
+실행: python -m pytest tests
+"""
+import sys
+import time
+import asyncio
+import importlib
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from fake_anthropic_server import FakeAnthropicServer
+
+# core/__init__이 같은 이름의 인스턴스를 내보내므로 모듈은 import_module로
+llm_client = importlib.import_module('core.llm_client')
+LLMConfig = llm_client.LLMConfig
+LLMError = llm_client.LLMError
+AsyncClaudeClient = llm_client.AsyncClaudeClient
+AsyncRateLimiter = llm_client.AsyncRateLimiter
+ClaudeClient = llm_client.ClaudeClient
+
+
+@pytest.fixture
+def fake_server():
+    """임시 포트에서 fake 서버 시작 (설정은 인자로), 테스트 종료 시 정리"""
+    servers = []
+    
+    def start(**kwargs) -> FakeAnthropicServer:
+        server = FakeAnthropicServer(port=0, **kwargs).start()
+        servers.append(server)
+        return server
+    
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def make_config(server: FakeAnthropicServer, **kwargs) -> LLMConfig:
+    defaults = dict(api_key='sk-ant-fake', base_url=server.base_url, timeout=5.0,
+                    max_retries=4, retry_base_seconds=0.05, max_concurrency=4,
+                    requests_per_minute=0)
+    defaults.update(kwargs)
+    return LLMConfig(**defaults)
+
+
+def gather_chats(client: AsyncClaudeClient, n: int) -> list:
+    async def run():
+        try:
+            return await asyncio.gather(*[
+                client.chat([{"role": "user", "content": f"질문 {i}"}]) for i in range(n)
+            ])
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize('status, retry_after', [(429, 0.1), (529, 0.0)])
+def test_retries_overload_then_succeeds(fake_server, status, retry_after):
+    server = fake_server(fail_first=2, fail_status=status, retry_after=retry_after)
+    start = time.monotonic()
+    assert gather_chats(AsyncClaudeClient(make_config(server)), 1) == ["echo: 질문 0"]
+    assert server.requests == 3
+    if retry_after:
+        # retry-after 헤더를 따라 대기
+        assert time.monotonic() - start >= 2 * retry_after
+
+
+def test_non_retryable_error_fails_immediately(fake_server):
+    server = fake_server(fail_first=100, fail_status=400)
+    with pytest.raises(LLMError) as excinfo:
+        gather_chats(AsyncClaudeClient(make_config(server)), 1)
+    assert excinfo.value.status == 400
+    assert server.requests == 1
+
+
+def test_gives_up_after_max_retries(fake_server):
+    server = fake_server(fail_first=100, fail_status=503)
+    with pytest.raises(LLMError) as excinfo:
+        gather_chats(AsyncClaudeClient(make_config(server, max_retries=2)), 1)
+    assert excinfo.value.status == 503
+    assert server.requests == 1 + 2
+
+
+def test_concurrency_is_bounded(fake_server):
+    server = fake_server(latency=0.1)
+    texts = gather_chats(AsyncClaudeClient(make_config(server, max_concurrency=3)), 12)
+    assert texts == [f"echo: 질문 {i}" for i in range(12)]
+    assert 1 < server.max_in_flight <= 3
+
+
+def test_requests_per_minute_limit(fake_server):
+    server = fake_server()
+    start = time.monotonic()
+    gather_chats(AsyncClaudeClient(make_config(server, max_concurrency=2, requests_per_minute=600)), 6)
+    # burst 2개 후 0.1초에 1개씩
+    assert time.monotonic() - start >= 0.35
+    assert server.requests == 6
+
+
+def test_async_rate_limiter_paces_acquires():
+    async def run(rate):
+        limiter = AsyncRateLimiter(rate, burst=3)
+        start = time.monotonic()
+        for _ in range(3 + 5):
+            await limiter.acquire()
+        return time.monotonic() - start
+    # burst 3개 후 나머지 5개는 0.05초 간격
+    assert asyncio.run(run(20.0)) >= 0.24
+    # rate <= 0이면 제한 없음
+    assert asyncio.run(run(0.0)) < 0.05
+
+
+def test_timeout_is_retried_then_fails(fake_server):
+    server = fake_server(latency=0.5)
+    client = AsyncClaudeClient(make_config(server, max_retries=1))
+    
+    async def run():
+        try:
+            return await client.chat([{"role": "user", "content": "느림"}], timeout=0.1)
+        finally:
+            await client.aclose()
+    with pytest.raises(LLMError) as excinfo:
+        asyncio.run(run())
+    assert excinfo.value.status is None
+    assert server.requests == 2
+
+
+def test_sync_facade_shares_one_loop_across_threads(fake_server):
+    server = fake_server(latency=0.05, fail_rate=0.2, retry_after=0.05)
+    client = ClaudeClient(make_config(server, max_concurrency=2))
+    results = [None] * 8
+    
+    def worker(i):
+        results[i] = client.chat([{"role": "user", "content": f"스레드 {i}"}])
+    try:
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert results == [f"echo: 스레드 {i}" for i in range(8)]
+        assert server.max_in_flight <= 2
+        
+        server.fail_rate = 0.0
+        # 응답 앞 "echo: "는 무시하고 코드 블록만 파싱
+        parsed = client.chat_json([{"role": "user", "content": '```json\n{"ok": true}\n```'}])
+        assert parsed == {"ok": True}
+    finally:
+        client.close()
@@ -0,0 +1,65 @@
+"""
+TargetUP AI - 규칙 기반 파서/필터 테스트
+카테고리별 구매 기간 조건의 ALL/ANY 조합
+
+실행: python -m pytest tests
+"""
+import importlib
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from dateutil.relativedelta import relativedelta
+
+bitmap = importlib.import_module('core.bitmap')
+filter_plan = importlib.import_module('core.filter_plan')
+query_engine = importlib.import_module('core.query_engine')
+result_cache = importlib.import_module('core.result_cache')
+from core.models import FilterSpec
+
+
+def expected_mask(customers_df, purchases_df, category, as_of, window_category, months, mode):
+    """원본 구매로 직접 계산한 기대 결과 (category 구매 이력 ∧/∨ window_category 최근 months개월 구매)"""
+    days = pd.to_datetime(purchases_df['purchased_at']).dt.date
+    ever = set(purchases_df.loc[purchases_df['category'] == category, 'customer_id'])
+    in_window = (purchases_df['category'] == window_category) & \
+        (days >= as_of - relativedelta(months=months)) & (days <= as_of)
+    recent = set(purchases_df.loc[in_window, 'customer_id'])
+    ids = customers_df['customer_id']
+    if mode == 'ALL':
+        return ids.isin(ever & recent).to_numpy()
+    return ids.isin(ever | recent).to_numpy()
+
+
+@pytest.mark.parametrize('prompt, mode', [
+    ("최근 3개월 눈가케어 구매 또는 에센스 구매 고객", 'ANY'),
+    ("최근 3개월 내 눈가케어 구매하고 에센스 구매이력 있는 고객", 'ALL'),
+])
+def test_category_window_follows_category_mode(store, cache, prompt, mode):
+    customers_df, purchases_df = store
+    base_date = pd.to_datetime(purchases_df['purchased_at']).max().date() + timedelta(days=1)
+    spec, _ = query_engine.QueryParser().parse(prompt, base_date)
+    
+    # 기간이 붙은 카테고리는 구매 이력에서 빠지고, 조합은 category_mode를 따름
+    assert spec.category_mode == mode
+    assert spec.categories == ['에센스']
+    assert spec.category_windows == [{'category': '눈가케어', 'within_months': 3}]
+    
+    expected = expected_mask(customers_df, purchases_df, '에센스', spec.as_of_date, '눈가케어', 3, mode)
+    plan = filter_plan.compile_filter(spec)
+    mask = plan.evaluate(cache.arrays, cache.category_bitmaps, cache.event_index)
+    np.testing.assert_array_equal(mask, expected)
+    assert 0 < mask.sum() < len(mask)
+    
+    # 여러 계획 일괄 평가도 같은 결과
+    other = filter_plan.compile_filter(FilterSpec(categories=['에센스'], category_mode=mode))
+    bitmaps = filter_plan.evaluate_many([plan, other], cache.arrays, cache.category_bitmaps, cache.event_index)
+    np.testing.assert_array_equal(bitmap.to_mask(bitmaps[0], len(mask)), expected)
+
+
+def test_category_mode_is_part_of_cache_key_with_windows():
+    spec, _ = query_engine.QueryParser().parse("최근 3개월 눈가케어 구매 또는 에센스 구매 고객")
+    any_key = result_cache.spec_cache_key(spec, 1)
+    spec.category_mode = 'ALL'
+    assert result_cache.spec_cache_key(spec, 1) != any_key
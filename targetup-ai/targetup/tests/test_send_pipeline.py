@@ -0,0 +1,138 @@
+"""
+TargetUP AI - 발송 파이프라인 테스트
+스텁 게이트웨이(실패 주입)와 임시 캠페인 DB로 청크 분할/재시도/실패 청크 이어 보내기/진행 현황 확인
+
+실행: python -m pytest tests
+"""
+import time
+import importlib
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+campaign_db_module = importlib.import_module('core.campaign_db')
+send_pipeline_module = importlib.import_module('core.send_pipeline')
+from core.gateway import StubGateway
+from core.models import FilterSpec
+
+SendPipeline = send_pipeline_module.SendPipeline
+RateLimiter = send_pipeline_module.RateLimiter
+
+
+@pytest.fixture
+def db(cache, tmp_path, monkeypatch):
+    """임시 캠페인 DB (발송 파이프라인도 이 DB 사용)"""
+    db = campaign_db_module.CampaignDB(db_path=tmp_path / "campaigns.db", targets_dir=tmp_path / "targets")
+    monkeypatch.setattr(send_pipeline_module, 'campaign_db', db)
+    yield db
+    db.close()
+
+
+def start_campaign(db, n_keys: int, chunk_size: int) -> int:
+    """캠페인 저장 후 즉시 발송으로 선점 (청크 작업 생성)"""
+    keys = np.arange(n_keys, dtype=np.int32)
+    campaign_id = db.save_campaign(
+        "테스트", datetime.now(), FilterSpec(), len(keys), keys, 'A', '테스트 문자', ''
+    )
+    assert db.claim_due_campaigns(campaign_id=campaign_id, due_only=False, chunk_size=chunk_size)
+    return campaign_id
+
+
+def make_pipeline(gateway, **kwargs) -> SendPipeline:
+    defaults = dict(rate_limiter=RateLimiter(0), max_in_flight=4, max_retries=3,
+                    retry_base_seconds=0.01, lease_seconds=5.0, max_attempts=3, owner='test-worker')
+    defaults.update(kwargs)
+    return SendPipeline(gateway, **defaults)
+
+
+def test_targets_are_split_into_chunks(db):
+    gateway = StubGateway(latency=0.0, seed=0)
+    campaign_id = start_campaign(db, 1_050, chunk_size=100)
+    
+    chunks = db.get_send_chunks(campaign_id)
+    assert [c['chunk_index'] for c in chunks] == list(range(11))
+    assert {c['status'] for c in chunks} == {'pending'}
+    
+    assert make_pipeline(gateway).run(db.get_campaign(campaign_id)) == 'sent'
+    chunks = db.get_send_chunks(campaign_id)
+    assert [c['n_messages'] for c in chunks] == [100] * 10 + [50]
+    assert all(c['status'] == 'done' and c['attempts'] == 1 for c in chunks)
+    assert gateway.delivered[campaign_id] == 1_050
+
+
+def test_transient_failures_are_retried_with_jittered_backoff(db, monkeypatch):
+    delays = []
+    monkeypatch.setattr(send_pipeline_module, 'time', SimpleNamespace(
+        sleep=delays.append, time=time.time, monotonic=time.monotonic
+    ))
+    gateway = StubGateway(latency=0.0, failure_rate=0.3, seed=3)
+    pipeline = make_pipeline(gateway, max_retries=5, retry_base_seconds=0.01)
+    campaign_id = start_campaign(db, 2_000, chunk_size=100)
+    
+    assert pipeline.run(db.get_campaign(campaign_id)) == 'sent'
+    assert gateway.delivered[campaign_id] == 2_000
+    
+    # 재시도 대기 = base × 2^(k-1) × [0.5, 1.5)
+    assert delays
+    assert all(
+        any(0.5 * 0.01 * 2 ** k <= d < 1.5 * 0.01 * 2 ** k for k in range(5)) for d in delays
+    )
+    assert len(set(delays)) > 1
+
+
+def test_retry_campaign_resends_only_failed_chunks(db, monkeypatch):
+    gateway = StubGateway(latency=0.0, failure_rate=0.5, seed=11)
+    pipeline = make_pipeline(gateway, max_retries=0, max_attempts=1)
+    campaign_id = start_campaign(db, 1_000, chunk_size=100)
+    
+    assert pipeline.run(db.get_campaign(campaign_id)) == 'failed'
+    chunks = db.get_send_chunks(campaign_id)
+    done = {c['chunk_index']: c['finished_at'] for c in chunks if c['status'] == 'done'}
+    failed = {c['chunk_index'] for c in chunks if c['status'] == 'failed'}
+    assert done and failed
+    assert gateway.delivered[campaign_id] == 100 * len(done)
+    
+    batches = []
+    send_batch = gateway.send_batch
+    
+    def recording_send_batch(campaign_id, batch_id, customer_ids, text):
+        batches.append(batch_id)
+        return send_batch(campaign_id, batch_id, customer_ids, text)
+    monkeypatch.setattr(gateway, 'send_batch', recording_send_batch)
+    gateway.failure_rate = 0.0
+    
+    assert db.retry_campaign(campaign_id)
+    assert pipeline.run(db.get_campaign(campaign_id)) == 'sent'
+    assert sorted(batches) == sorted(f"{campaign_id}-{i}" for i in failed)
+    
+    chunks = db.get_send_chunks(campaign_id)
+    assert all(c['status'] == 'done' for c in chunks)
+    assert {i: chunks[i]['finished_at'] for i in done} == done
+    assert gateway.delivered[campaign_id] == 1_000
+    
+    # 발송 완료 캠페인은 다시 대기시키지 않음
+    assert not db.retry_campaign(campaign_id)
+
+
+def test_progress_and_throughput(db, capsys):
+    gateway = StubGateway(latency=0.02, seed=0)
+    pipeline = make_pipeline(gateway, max_in_flight=2)
+    campaign_id = start_campaign(db, 1_000, chunk_size=100)
+    
+    progress = db.get_send_progress(campaign_id)
+    assert (progress['sent'], progress['remaining_chunks'], progress['throughput']) == (0, 10, 0.0)
+    
+    # 한 번에 max_in_flight × 2개 청크 리스
+    assert pipeline.process_round(campaign_id) == 4
+    progress = db.get_send_progress(campaign_id)
+    assert (progress['sent'], progress['done_chunks'], progress['remaining_chunks']) == (400, 4, 6)
+    
+    assert pipeline.run(db.get_campaign(campaign_id)) == 'sent'
+    progress = db.get_send_progress(campaign_id)
+    assert (progress['sent'], progress['done_chunks'], progress['failed_chunks']) == (1_000, 10, 0)
+    assert progress['remaining_chunks'] == 0
+    assert progress['elapsed'] > 0
+    assert progress['throughput'] == pytest.approx(1_000 / progress['elapsed'])
+    assert f"[발송 완료] Campaign #{campaign_id}: 1,000명에게 발송" in capsys.readouterr().out
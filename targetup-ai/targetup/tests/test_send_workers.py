@@ -0,0 +1,140 @@
+"""
+TargetUP AI - 멀티 프로세스 발송 테스트
+워커 프로세스 여러 개가 임시 DB의 청크 작업을 나눠 처리할 때
+청크 중복 발송 없음 / 만료 리스 회수 / 마지막 반납 워커의 캠페인 마무리 확인
+
+실행: python -m pytest tests
+"""
+import time
+import queue
+import importlib
+import multiprocessing
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+campaign_db_module = importlib.import_module('core.campaign_db')
+send_pipeline_module = importlib.import_module('core.send_pipeline')
+from core.gateway import StubGateway
+from core.models import FilterSpec
+
+N_WORKERS = 3
+LEASE_SECONDS = 2.0
+MAX_ATTEMPTS = send_pipeline_module.SEND_MAX_ATTEMPTS
+
+
+def run_worker(db_path, targets_dir, owner, events):
+    """
+    워커 프로세스 (fork - 부모가 로드한 임시 데이터 캐시 공유)
+    
+    자기 DB 연결로 남은 청크가 없을 때까지 발송하고, 완료 반납/캠페인 마무리를 events에 기록
+    """
+    db = campaign_db_module.CampaignDB(db_path=db_path, targets_dir=targets_dir)
+    send_pipeline_module.campaign_db = db
+    release = db.release_send_chunk
+    
+    def recording_release(owner, campaign_id, chunk_index, n_messages, max_attempts,
+                          error=None, retryable=True):
+        released, final_status = release(owner, campaign_id, chunk_index, n_messages,
+                                         max_attempts, error, retryable)
+        if released and error is None:
+            events.put(('done', campaign_id, chunk_index, owner))
+        if final_status:
+            events.put(('final', campaign_id, final_status, owner))
+        return released, final_status
+    db.release_send_chunk = recording_release
+    
+    pipeline = send_pipeline_module.SendPipeline(
+        StubGateway(latency=0.02), send_pipeline_module.RateLimiter(0),
+        max_in_flight=2, max_retries=1, retry_base_seconds=0.01,
+        lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS, owner=owner
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if pipeline.process_round():
+            continue
+        remaining = db.conn.execute(
+            "SELECT COUNT(*) FROM send_chunks WHERE status IN ('pending', 'leased')"
+        ).fetchone()[0]
+        if not remaining:
+            break
+        time.sleep(0.05)
+    db.close()
+
+
+def start_campaign(db, n_keys: int, chunk_size: int) -> int:
+    keys = np.arange(n_keys, dtype=np.int32)
+    campaign_id = db.save_campaign(
+        "멀티 워커", datetime.now(), FilterSpec(), len(keys), keys, 'A', '테스트 문자', ''
+    )
+    assert db.claim_due_campaigns(campaign_id=campaign_id, due_only=False, chunk_size=chunk_size)
+    return campaign_id
+
+
+def expire_lease(db, campaign_id: int, chunk_index: int, attempts: int):
+    """멈춘 워커가 리스한 채 만료된 청크로 만듦"""
+    with db.transaction() as conn:
+        conn.execute("""
+            UPDATE send_chunks
+            SET status = 'leased', owner = 'dead-worker', attempts = ?, lease_expires_at = ?
+            WHERE campaign_id = ? AND chunk_index = ?
+        """, (attempts, time.time() - 1, campaign_id, chunk_index))
+
+
+def test_workers_share_chunks(cache, tmp_path):
+    db_path, targets_dir = tmp_path / "campaigns.db", tmp_path / "targets"
+    db = campaign_db_module.CampaignDB(db_path=db_path, targets_dir=targets_dir)
+    sent_id = start_campaign(db, 2_000, chunk_size=50)
+    failed_id = start_campaign(db, 100, chunk_size=50)
+    expire_lease(db, sent_id, 0, attempts=1)
+    expire_lease(db, failed_id, 0, attempts=MAX_ATTEMPTS)
+    
+    context = multiprocessing.get_context('fork')
+    events = context.Queue()
+    owners = [f"worker-{i}" for i in range(N_WORKERS)]
+    workers = [
+        context.Process(target=run_worker, args=(db_path, targets_dir, owner, events))
+        for owner in owners
+    ]
+    for worker in workers:
+        worker.start()
+    
+    # 워커가 끝날 때까지 이벤트 수집 (큐를 비워야 워커가 종료됨)
+    collected = []
+    while any(w.is_alive() for w in workers) or not events.empty():
+        try:
+            collected.append(events.get(timeout=0.1))
+        except queue.Empty:
+            pass
+    for worker in workers:
+        worker.join(timeout=10)
+        assert worker.exitcode == 0
+    
+    # 모든 청크가 정확히 한 번 done
+    chunks = db.get_send_chunks(sent_id)
+    done = Counter((e[1], e[2]) for e in collected if e[0] == 'done' and e[1] == sent_id)
+    assert len(chunks) == 40
+    assert done == Counter((sent_id, c['chunk_index']) for c in chunks)
+    assert all(c['status'] == 'done' for c in chunks)
+    assert len({c['owner'] for c in chunks}) > 1
+    
+    # 만료 리스는 다른 워커가 회수 (시도 횟수에 포함)
+    assert chunks[0]['owner'] in owners
+    assert chunks[0]['attempts'] == 2
+    
+    # 시도 횟수를 다 쓴 만료 리스는 failed → 캠페인 failed
+    stuck = db.get_send_chunks(failed_id)[0]
+    assert (stuck['status'], stuck['attempts']) == ('failed', MAX_ATTEMPTS)
+    assert stuck['error'] == '리스 만료 (시도 횟수 초과)'
+    assert db.get_campaign(failed_id).status == 'failed'
+    
+    # 마지막 청크를 반납한 워커가 한 번만 마무리
+    finals = [e for e in collected if e[0] == 'final' and e[1] == sent_id]
+    last_chunk = max(chunks, key=lambda c: c['finished_at'])
+    assert finals == [('final', sent_id, 'sent', last_chunk['owner'])]
+    campaign = db.get_campaign(sent_id)
+    assert campaign.status == 'sent'
+    assert campaign.sent_at.timestamp() >= last_chunk['finished_at'] - 1e-3
+    db.close()
+